@@ -1,35 +1,80 @@
+import click
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
-from flask_restful import Api
-from flask_migrate import Migrate
+from flask_babel import Babel
 from config import Config
+from app.cache import QuizCache, FragmentCache
+from app.database import RoutingSession, init_engines
+from app.submissions import SubmissionQueue
+from app.instrumentation import Instrumentation
+from app.passwords import PasswordHasher
+from app.ratelimit import RateLimiter
+from app.identity import IdentityCache
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 login_manager = LoginManager()
-login_manager.login_view = 'main.login'
+babel = Babel()
+quiz_cache = QuizCache()
+fragment_cache = FragmentCache()
+submission_queue = SubmissionQueue()
+instrumentation = Instrumentation()
+password_hasher = PasswordHasher()
+rate_limiter = RateLimiter()
+identity_cache = IdentityCache()
 
 def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
+    if app.config['TRUSTED_PROXIES']:
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['TRUSTED_PROXIES'])
 
     # Initialize extensions
     db.init_app(app)
+    init_engines(app, db)
+    instrumentation.init_app(app)
     login_manager.init_app(app)
-    migrate = Migrate(app, db)
+    identity_cache.init_app(app)
+    password_hasher.init_app(app)
+    rate_limiter.init_app(app)
+    from app.i18n import get_locale
+    from app.startup import init_template_cache, preload
+    babel.init_app(app, locale_selector=get_locale)
+    init_template_cache(app)
+    quiz_cache.init_app(app)
+    fragment_cache.init_app(app)
+    submission_queue.init_app(app)
+    if not app.config['LAZY_STARTUP']:
+        preload(app, babel)
 
-    # Import and register blueprints
-    from app.routes import main_bp, api_bp, QuizQuestionsAPI, AddQuestionAPI
-    api = Api(api_bp)
-    api.add_resource(QuizQuestionsAPI, '/quiz/<int:quiz_set_id>/questions', endpoint='quiz_questions')
-    api.add_resource(AddQuestionAPI, '/add_question', endpoint='add_question')
+    # Alembic is only needed by `flask db ...`; lazy workers skip importing it
+    if not app.config['LAZY_STARTUP'] or click.get_current_context(silent=True) is not None:
+        from flask_migrate import Migrate
+        Migrate(app, db)
 
-    app.register_blueprint(main_bp)
-    app.register_blueprint(api_bp, url_prefix='/api')
+    # Import and register blueprints. Without the pages there is no login
+    # page to redirect to, so unauthenticated API requests get a 401.
+    blueprints = app.config['BLUEPRINTS']
+    login_manager.login_view = 'main.login' if 'main' in blueprints else None
+    if 'main' in blueprints:
+        from app.routes import main_bp
+        app.register_blueprint(main_bp)
+    if 'api' in blueprints:
+        from app.api import api_bp
+        app.register_blueprint(api_bp, url_prefix='/api')
+
+    # Register CLI commands
+    from app.commands import stats_cli, questions_cli, submissions_cli, analytics_cli, search_cli, templates_cli
+    app.cli.add_command(stats_cli)
+    app.cli.add_command(questions_cli)
+    app.cli.add_command(submissions_cli)
+    app.cli.add_command(analytics_cli)
+    app.cli.add_command(search_cli)
+    app.cli.add_command(templates_cli)
 
     return app
 
 @login_manager.user_loader
 def load_user(user_id):
-    from app.models import User
-    return User.query.get(int(user_id))
+    return identity_cache.load(int(user_id))
@@ -0,0 +1,246 @@
+from datetime import datetime
+import numpy as np
+from sqlalchemy import delete, false, func, insert, select, update
+from app import db
+from app.database import upsert
+from app.models import AnswerSheet, ItemAnalysis, ItemStats, Option, OptionStats, Question
+
+# Answer sheets folded into the running sums per round trip
+BATCH_SIZE = 20000
+# Sheet ids marked as analysed per UPDATE (keeps under SQLite's bound parameter limit)
+MARK_CHUNK = 500
+
+SUM_COLUMNS = ('responses', 'skipped', 'correct', 'rest_sum', 'rest_squares', 'correct_rest_sum')
+
+
+# Option ids of a quiz set, sorted, with each option's question and whether it is correct
+def _answer_key(quiz_set_id):
+    rows = db.session.execute(
+        select(Option.id, Option.question_id, Option.is_correct)
+        .join(Question, Question.id == Option.question_id)
+        .where(Question.quiz_set_id == quiz_set_id)
+        .order_by(Option.id)
+    ).all()
+    if not rows:
+        return np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0, bool)
+    option_ids, question_ids, correct = zip(*rows)
+    return np.array(option_ids, np.int64), np.array(question_ids, np.int64), np.array(correct, bool)
+
+
+# Per-question sums and per-option pick counts for a batch of answer sheets,
+# computed over the flattened answers of the whole batch at once
+def _batch_sums(sheets, key):
+    option_ids, option_questions, option_correct = key
+    questions = [np.frombuffer(sheet.question_ids, '<i4') for sheet in sheets]
+    lengths = np.array([len(q) for q in questions])
+    question = np.concatenate(questions).astype(np.int64)
+    chosen = np.concatenate([np.frombuffer(sheet.option_ids, '<i4') for sheet in sheets]).astype(np.int64)
+    attempt = np.repeat(np.arange(len(sheets)), lengths)
+
+    # Look every chosen option up in the answer key; an option that no longer
+    # exists or belongs to another question counts as a wrong answer
+    index = np.clip(np.searchsorted(option_ids, chosen), 0, max(len(option_ids) - 1, 0))
+    known = (chosen != 0) & (option_ids[index] == chosen) & (option_questions[index] == question) \
+        if len(option_ids) else np.zeros(len(chosen), bool)
+    correct = known & option_correct[index] if len(option_ids) else known
+    x = correct.astype(np.int64)
+    # Rest score: the attempt's score on every other question
+    y = np.bincount(attempt, weights=x, minlength=len(sheets)).astype(np.int64)[attempt] - x
+
+    question_ids, slot = np.unique(question, return_inverse=True)
+
+    def per_question(weights):
+        return np.bincount(slot, weights=weights, minlength=len(question_ids)).astype(np.int64)
+
+    sums = {
+        'responses': np.bincount(slot, minlength=len(question_ids)),
+        'skipped': per_question(chosen == 0),
+        'correct': per_question(x),
+        'rest_sum': per_question(y),
+        'rest_squares': per_question(y * y),
+        'correct_rest_sum': per_question(x * y),
+    }
+    picks = np.bincount(index[known], minlength=len(option_ids))
+    return question_ids, sums, picks
+
+
+# Difficulty (share correct) and point-biserial discrimination from the sums
+def _derived(n, sx, sy, syy, sxy):
+    n, sx, sy, syy, sxy = (np.asarray(v, np.float64) for v in (n, sx, sy, syy, sxy))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        difficulty = np.where(n > 0, sx / n, np.nan)
+        denominator = np.sqrt((n * sx - sx * sx) * (n * syy - sy * sy))
+        discrimination = np.where(denominator > 0, (n * sxy - sx * sy) / denominator, np.nan)
+    return difficulty, discrimination
+
+
+def _optional(value):
+    return None if np.isnan(value) else round(float(value), 4)
+
+
+# Add one batch's sums to item_stats / option_stats (bulk UPDATE by primary
+# key for rows that exist, bulk INSERT for the rest)
+def _merge(quiz_set_id, question_ids, sums, picks, key):
+    existing = {row.question_id: row for row in db.session.execute(
+        select(ItemStats.question_id, *(getattr(ItemStats, c) for c in SUM_COLUMNS))
+        .where(ItemStats.question_id.in_(question_ids.tolist()))
+    )}
+    totals = {c: sums[c] + np.array([getattr(existing[q], c) if q in existing else 0
+                                     for q in question_ids.tolist()], np.int64)
+              for c in SUM_COLUMNS}
+    difficulty, discrimination = _derived(totals['responses'], totals['correct'], totals['rest_sum'],
+                                          totals['rest_squares'], totals['correct_rest_sum'])
+    updates, inserts = [], []
+    for i, question_id in enumerate(question_ids.tolist()):
+        row = {c: int(totals[c][i]) for c in SUM_COLUMNS}
+        row.update(question_id=question_id, difficulty=_optional(difficulty[i]),
+                   discrimination=_optional(discrimination[i]))
+        (updates if question_id in existing else inserts).append(row)
+    if updates:
+        db.session.execute(update(ItemStats), updates)
+    if inserts:
+        db.session.execute(insert(ItemStats), [dict(row, quiz_set_id=quiz_set_id) for row in inserts])
+
+    option_ids, option_questions, _ = key
+    picked = np.nonzero(picks)[0]
+    if len(picked):
+        ids = option_ids[picked].tolist()
+        known = dict(db.session.execute(
+            select(OptionStats.option_id, OptionStats.picks).where(OptionStats.option_id.in_(ids))).all())
+        rows = [{'option_id': option_id, 'question_id': int(option_questions[i]),
+                 'picks': known.get(option_id, 0) + int(picks[i])}
+                for i, option_id in zip(picked.tolist(), ids)]
+        if known:
+            db.session.execute(update(OptionStats), [r for r in rows if r['option_id'] in known])
+        if len(known) < len(rows):
+            db.session.execute(insert(OptionStats), [r for r in rows if r['option_id'] not in known])
+
+
+# Lock a quiz set's analysis row until the transaction ends, creating it on
+# first use. On SQLite the insert already takes the database write lock.
+def _lock(quiz_set_id):
+    upsert(db.session, ItemAnalysis, {'quiz_set_id': quiz_set_id, 'attempts': 0})
+    return db.session.execute(
+        select(ItemAnalysis).where(ItemAnalysis.quiz_set_id == quiz_set_id)
+        .with_for_update().execution_options(populate_existing=True)
+    ).scalar_one()
+
+
+# Fold the answer sheets of a quiz set that are not analysed yet into its
+# item statistics, marking each sheet as it is read. With `full`, start
+# again from the first sheet. Returns the number of sheets read.
+def analyse(quiz_set_id, full=False):
+    state = _lock(quiz_set_id)
+    if full:
+        question_ids = select(Question.id).where(Question.quiz_set_id == quiz_set_id)
+        db.session.execute(delete(OptionStats).where(OptionStats.question_id.in_(question_ids)))
+        db.session.execute(delete(ItemStats).where(ItemStats.quiz_set_id == quiz_set_id))
+        db.session.execute(update(AnswerSheet).where(AnswerSheet.quiz_set_id == quiz_set_id)
+                           .values(analysed=False).execution_options(synchronize_session=False))
+        state.attempts = 0
+
+    key = _answer_key(quiz_set_id)
+    read = 0
+    while True:
+        sheets = db.session.execute(
+            select(AnswerSheet.result_id, AnswerSheet.question_ids, AnswerSheet.option_ids)
+            .where(AnswerSheet.quiz_set_id == quiz_set_id, AnswerSheet.analysed == false())
+            .order_by(AnswerSheet.result_id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not sheets:
+            break
+        question_ids, sums, picks = _batch_sums(sheets, key)
+        _merge(quiz_set_id, question_ids, sums, picks, key)
+        # By id, so a sheet committed meanwhile is left for the next run
+        result_ids = [sheet.result_id for sheet in sheets]
+        for i in range(0, len(result_ids), MARK_CHUNK):
+            db.session.execute(update(AnswerSheet).where(AnswerSheet.result_id.in_(result_ids[i:i + MARK_CHUNK]))
+                               .values(analysed=True).execution_options(synchronize_session=False))
+        read += len(sheets)
+    state.attempts += read
+    state.analysed_at = datetime.utcnow()
+    db.session.commit()
+    return read
+
+
+# Answer sheets of a quiz set that are not in its statistics yet
+def pending(quiz_set_id):
+    return db.session.execute(
+        select(func.count()).select_from(AnswerSheet)
+        .where(AnswerSheet.quiz_set_id == quiz_set_id, AnswerSheet.analysed == false())
+    ).scalar()
+
+
+# Quiz sets with answer sheets that item analysis has not seen yet
+def stale_quiz_sets():
+    return list(db.session.scalars(
+        select(AnswerSheet.quiz_set_id).where(AnswerSheet.analysed == false()).distinct()
+    ))
+
+
+# Analyse every quiz set with new answers (or all of them, with `full`)
+def recompute(full=False):
+    from app.models import QuizSet
+    quiz_set_ids = list(db.session.scalars(select(QuizSet.id))) if full else stale_quiz_sets()
+    return {quiz_set_id: analyse(quiz_set_id, full=full) for quiz_set_id in quiz_set_ids}
+
+
+ORDERINGS = {
+    'difficulty': ItemStats.difficulty,  # hardest first
+    'discrimination': ItemStats.discrimination,  # least discriminating first
+    'position': Question.position,
+}
+
+
+# Item statistics for a quiz set with each question's option pick shares, as
+# last stored by analyse(); `pending` counts the answers not included yet.
+# Questions whose discrimination is negative, or where a distractor is picked
+# more often than the correct answer, are flagged for review.
+def report(quiz_set_id, order='difficulty', limit=50):
+    items = db.session.execute(
+        select(ItemStats, Question.text, Question.position)
+        .join(Question, Question.id == ItemStats.question_id)
+        .where(ItemStats.quiz_set_id == quiz_set_id)
+        .order_by(ORDERINGS[order].is_(None), ORDERINGS[order], Question.position)
+        .limit(limit)
+    ).all()
+    question_ids = [stats.question_id for stats, _, _ in items]
+    options = {}
+    for option_id, question_id, text, is_correct, picks in db.session.execute(
+            select(Option.id, Option.question_id, Option.text, Option.is_correct, OptionStats.picks)
+            .outerjoin(OptionStats, OptionStats.option_id == Option.id)
+            .where(Option.question_id.in_(question_ids))
+            .order_by(Option.question_id, Option.position)):
+        options.setdefault(question_id, []).append(
+            {'id': option_id, 'text': text, 'is_correct': is_correct, 'picks': picks or 0})
+
+    state = db.session.get(ItemAnalysis, quiz_set_id)
+    rows = []
+    for stats, text, position in items:
+        question_options = options.get(stats.question_id, [])
+        for option in question_options:
+            option['share'] = round(option['picks'] / stats.responses, 4) if stats.responses else None
+        correct_picks = max((o['picks'] for o in question_options if o['is_correct']), default=0)
+        rows.append({
+            'question_id': stats.question_id,
+            'position': position,
+            'text': text,
+            'responses': stats.responses,
+            'skipped': stats.skipped,
+            'difficulty': stats.difficulty,
+            'discrimination': stats.discrimination,
+            'flagged': (stats.discrimination is not None and stats.discrimination < 0)
+                       or any(o['picks'] > correct_picks for o in question_options if not o['is_correct']),
+            'options': question_options,
+        })
+    waiting = pending(quiz_set_id)
+    return {
+        'quiz_set_id': quiz_set_id,
+        'analysed_at': state.analysed_at.isoformat() if state and state.analysed_at else None,
+        'attempts': state.attempts if state else 0,
+        'pending': waiting,
+        'stale': waiting > 0,
+        'order': order,
+        'items': rows,
+    }
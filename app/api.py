@@ -0,0 +1,179 @@
+from flask import Blueprint, Response, jsonify, request
+from flask_login import current_user, login_required
+from flask_restful import Api, Resource
+from app import db, quiz_cache, submission_queue
+from app.cache import invalidate_content, quiz_etag
+from app.models import Question, QuizResult, QuizSet
+from app import i18n, leaderboard, sampling, search, submissions
+
+# Blueprint for the JSON API, registered under /api. Separate from the pages
+# in app/routes.py so an API-only worker (BLUEPRINTS=api) never imports them.
+api_bp = Blueprint('api', __name__)
+api = Api(api_bp)
+
+# API to get quiz questions
+class QuizQuestionsAPI(Resource):
+    def get(self, quiz_set_id):
+        quiz_set = db.session.get(QuizSet, quiz_set_id)
+        if quiz_set is None:
+            return jsonify([])
+        locale = i18n.content_locale()
+        if quiz_set.sample_size:
+            # A fresh draw on every call; post the token back as `attempt`
+            question_ids = sampling.draw(quiz_set)
+            response = jsonify(sampling.sample_payload(question_ids, locale)['questions'])
+            response.headers['X-Quiz-Attempt'] = sampling.attempt_token(quiz_set.id, question_ids)
+            response.cache_control.no_store = True
+            return response
+        # Clients holding the current version get a 304 without touching the cache
+        etag = quiz_etag(quiz_set, locale)
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            response = Response(quiz_cache.get_quiz(quiz_set, locale)['json'], mimetype='application/json')
+        response.set_etag(etag)
+        response.vary.add('Accept-Language')
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response
+
+# API to store translations of a quiz set's content (Admin only)
+class TranslationsAPI(Resource):
+    @login_required
+    def put(self, quiz_set_id, locale):
+        if current_user.role != 'admin':
+            return {'message': 'Unauthorized'}, 403
+        if db.session.get(QuizSet, quiz_set_id) is None:
+            return {'message': 'Quiz set not found'}, 404
+        payload = request.get_json()
+        if not isinstance(payload, dict):
+            return {'message': 'Expected a JSON object'}, 400
+        try:
+            saved = i18n.save_translations(quiz_set_id, locale, payload)
+        except ValueError as e:
+            db.session.rollback()
+            return {'message': str(e)}, 400
+        db.session.commit()
+        invalidate_content(quiz_set_id)
+        return {'message': 'Translations saved', 'saved': saved}
+
+# API to get the leaderboard, score histogram and the caller's rank for a quiz set
+class LeaderboardAPI(Resource):
+    @login_required
+    def get(self, quiz_set_id):
+        if db.session.get(QuizSet, quiz_set_id) is None:
+            return {'message': 'Quiz set not found'}, 404
+        limit = min(request.args.get('limit', 10, type=int), 100)
+        return leaderboard.standings(quiz_set_id, user_id=current_user.id, limit=max(limit, 1))
+
+# API to get item analysis for a quiz set (Admin only)
+class QuizAnalysisAPI(Resource):
+    @login_required
+    def get(self, quiz_set_id):
+        from app import analytics
+        if current_user.role != 'admin':
+            return {'message': 'Unauthorized'}, 403
+        if db.session.get(QuizSet, quiz_set_id) is None:
+            return {'message': 'Quiz set not found'}, 404
+        order = request.args.get('order', 'difficulty')
+        if order not in analytics.ORDERINGS:
+            return {'message': f'Unsupported order: {order}'}, 400
+        limit = min(max(request.args.get('limit', 50, type=int), 1), 500)
+        return analytics.report(quiz_set_id, order, limit)
+
+# API to list clusters of near-duplicate questions in a quiz set (Admin only)
+class DuplicatesAPI(Resource):
+    @login_required
+    def get(self, quiz_set_id):
+        from app import duplicates
+        if current_user.role != 'admin':
+            return {'message': 'Unauthorized'}, 403
+        if db.session.get(QuizSet, quiz_set_id) is None:
+            return {'message': 'Quiz set not found'}, 404
+        return duplicates.clusters(quiz_set_id)
+
+# API to search the question bank, best match first (Admin only)
+class SearchQuestionsAPI(Resource):
+    @login_required
+    def get(self):
+        if current_user.role != 'admin':
+            return {'message': 'Unauthorized'}, 403
+        return search.search(request.args.get('q', ''), quiz_set_id=request.args.get('quiz_set_id', type=int),
+                             page=request.args.get('page', 1, type=int),
+                             per_page=request.args.get('per_page', 20, type=int))
+
+# API to add a new question (Admin only)
+class AddQuestionAPI(Resource):
+    @login_required
+    def post(self):
+        from app import duplicates
+        if current_user.role != 'admin':
+            return {'message': 'Unauthorized'}, 403
+        data = request.get_json()
+        # Add question to the database
+        question = Question(
+            text=data['text'],
+            quiz_set_id=data['quiz_set_id'],
+            user_id=current_user.id
+        )
+        try:
+            question.set_options(data['options'], data['correct_option'])
+            similar = duplicates.check(question)
+            if similar and not data.get('allow_duplicate'):
+                return {'message': 'Similar questions already exist in this quiz set', 'similar': similar}, 409
+            question.position = QuizSet.record_questions_added(data['quiz_set_id'])
+        except ValueError as e:
+            db.session.rollback()
+            return {'message': str(e)}, 400
+        db.session.add(question)
+        db.session.flush()
+        search.index_questions([question.id])
+        duplicates.index_question(question)
+        db.session.commit()
+        invalidate_content(data['quiz_set_id'])
+        return {'message': 'Question added successfully'}, 201
+
+# API to bulk import questions from JSON Lines or CSV (Admin only)
+class BulkQuestionsAPI(Resource):
+    @login_required
+    def post(self):
+        from app import importer
+        if current_user.role != 'admin':
+            return {'message': 'Unauthorized'}, 403
+        fmt = request.args.get('format') or ('csv' if request.mimetype == 'text/csv' else 'jsonl')
+        if fmt not in importer.FORMATS:
+            return {'message': f'Unsupported format: {fmt}'}, 400
+        chunk_size = request.args.get('chunk_size', 1000, type=int)
+        # Decode the body line by line instead of buffering the whole upload
+        lines = (line.decode('utf-8-sig') for line in request.stream)
+        report = importer.import_questions(lines, fmt, current_user.id, chunk_size=max(chunk_size, 1),
+                                           allow_duplicates=request.args.get('allow_duplicates', type=int) == 1)
+        invalidate_content()
+        return report.to_dict(), 201 if report.inserted else 200
+
+# API to poll whether an asynchronous quiz submission has been saved
+class SubmissionStatusAPI(Resource):
+    @login_required
+    def get(self, submission_id):
+        submission = submission_queue.journal.get(submission_id) if submission_queue.enabled else None
+        if submission is None:
+            # Journal entries are pruned once saved; fall back to the result itself
+            result = QuizResult.query.filter_by(submission_id=submission_id).first()
+            if result is None or (result.user_id != current_user.id and current_user.role != 'admin'):
+                return {'message': 'Submission not found'}, 404
+            return {'id': submission_id, 'status': submissions.PERSISTED, 'result_id': result.id}
+        if submission['user_id'] != current_user.id and current_user.role != 'admin':
+            return {'message': 'Submission not found'}, 404
+        return {'id': submission_id, 'status': submission['status'], 'result_id': submission['result_id'],
+                'score': submission['score']}
+
+
+api.add_resource(QuizQuestionsAPI, '/quiz/<int:quiz_set_id>/questions', endpoint='quiz_questions')
+api.add_resource(LeaderboardAPI, '/quiz/<int:quiz_set_id>/leaderboard', endpoint='leaderboard')
+api.add_resource(QuizAnalysisAPI, '/quiz/<int:quiz_set_id>/analysis', endpoint='quiz_analysis')
+api.add_resource(DuplicatesAPI, '/quiz/<int:quiz_set_id>/duplicates', endpoint='duplicates')
+api.add_resource(TranslationsAPI, '/quiz/<int:quiz_set_id>/translations/<locale>', endpoint='translations')
+api.add_resource(AddQuestionAPI, '/add_question', endpoint='add_question')
+api.add_resource(BulkQuestionsAPI, '/questions/bulk', endpoint='bulk_questions')
+api.add_resource(SearchQuestionsAPI, '/questions/search', endpoint='search_questions')
+api.add_resource(SubmissionStatusAPI, '/submissions/<submission_id>', endpoint='submission_status')
@@ -0,0 +1,246 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from itertools import groupby
+from werkzeug.utils import import_string
+
+
+# In-process LRU store with per-entry expiry
+class MemoryBackend:
+    def __init__(self, max_entries=256, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if self.ttl and expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete_prefix(self, prefix):
+        with self._lock:
+            for key in [k for k in self._entries if k[:len(prefix)] == prefix]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Backend that never stores anything (QUIZ_CACHE_BACKEND = 'null')
+class NullBackend:
+    def __init__(self, max_entries=0, ttl=0):
+        pass
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value):
+        pass
+
+    def delete_prefix(self, prefix):
+        pass
+
+    def clear(self):
+        pass
+
+
+BACKENDS = {'memory': MemoryBackend, 'null': NullBackend}
+
+
+# Build the backend named by <prefix>_BACKEND, sized by <prefix>_SIZE/_TTL
+def make_backend(app, prefix):
+    name = app.config.get(f'{prefix}_BACKEND', 'memory')
+    backend_class = BACKENDS[name] if name in BACKENDS else import_string(name)
+    return backend_class(
+        max_entries=app.config.get(f'{prefix}_SIZE', 256),
+        ttl=app.config.get(f'{prefix}_TTL', 300),
+    )
+
+
+# Parsed quiz payloads keyed by (quiz_set_id, content_version, locale).
+# The version lives on the QuizSet row and is bumped by every write, so a
+# stale entry is simply never looked up again and ages out of the LRU.
+class QuizCache:
+    def __init__(self, app=None):
+        self.backend = NullBackend()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.backend = make_backend(app, 'QUIZ_CACHE')
+        app.extensions['quiz_cache'] = self
+
+    # `locale` is None for content as stored, else the language to translate into
+    def get_quiz(self, quiz_set, locale=None):
+        key = (quiz_set.id, quiz_set.content_version, locale)
+        payload = self.backend.get(key)
+        if payload is None:
+            payload = build_payload(quiz_set, locale)
+            self.backend.set(key, payload)
+        return payload
+
+    def invalidate(self, quiz_set_id):
+        self.backend.delete_prefix((quiz_set_id,))
+
+
+# Rendered template fragments keyed by (name, locale, catalog version). The
+# catalog version changes whenever a quiz set is added or its questions
+# change, so fragments never outlive the content they show.
+class FragmentCache:
+    def __init__(self, app=None):
+        self.backend = NullBackend()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.backend = make_backend(app, 'FRAGMENT_CACHE')
+        self.release = app.config.get('RELEASE') or _templates_digest(app)
+        app.extensions['fragment_cache'] = self
+
+    # `load` returns the template context; it only runs on a cache miss
+    def render(self, name, template, version, locale, load):
+        from flask import render_template
+        from markupsafe import Markup
+        key = (name, locale, version)
+        html = self.backend.get(key)
+        if html is None:
+            html = Markup(render_template(template, **load()))
+            self.backend.set(key, html)
+        return html
+
+    def clear(self):
+        self.backend.clear()
+
+
+# Fingerprint of the template files, so ETags change when a deploy changes markup
+def _templates_digest(app):
+    digest = hashlib.sha1()
+    folder = os.path.join(app.root_path, app.template_folder)
+    for root, _, files in sorted(os.walk(folder)):
+        for name in sorted(files):
+            stat = os.stat(os.path.join(root, name))
+            digest.update(f'{name}:{stat.st_size}:{stat.st_mtime_ns};'.encode())
+    return digest.hexdigest()[:12]
+
+
+# Version of everything the listing pages show: the number of quiz sets and
+# the sum of their content versions (both only ever grow)
+def catalog_version():
+    from sqlalchemy import func, select
+    from app import db
+    from app.models import QuizSet
+    count, versions = db.session.execute(
+        select(func.count(QuizSet.id), func.coalesce(func.sum(QuizSet.content_version), 0))
+    ).one()
+    return f'{count}.{versions}'
+
+
+# Bump when the payload layout changes so clients drop copies in the old shape
+PAYLOAD_FORMAT = 2
+
+
+def quiz_etag(quiz_set, locale=None):
+    return f'quiz-{quiz_set.id}-v{quiz_set.content_version}-f{PAYLOAD_FORMAT}-{locale or "base"}'
+
+
+# Questions (with their options and correct option id) matching `criteria`,
+# with text in `locale` wherever a translation exists
+def load_questions(*criteria, locale=None):
+    from sqlalchemy import and_, func, select
+    from app import db
+    from app.models import Option, OptionTranslation, Question, QuestionTranslation
+    query = select(Question.id, Question.text, Option.id, Option.text, Option.is_correct) \
+        .outerjoin(Option, Option.question_id == Question.id)
+    if locale:
+        query = select(Question.id, func.coalesce(QuestionTranslation.text, Question.text),
+                       Option.id, func.coalesce(OptionTranslation.text, Option.text), Option.is_correct) \
+            .outerjoin(Option, Option.question_id == Question.id) \
+            .outerjoin(QuestionTranslation, and_(QuestionTranslation.question_id == Question.id,
+                                                 QuestionTranslation.locale == locale)) \
+            .outerjoin(OptionTranslation, and_(OptionTranslation.option_id == Option.id,
+                                               OptionTranslation.locale == locale))
+    rows = db.session.execute(query.where(*criteria).order_by(Question.id, Option.position))
+    questions = []
+    for (question_id, text), options in groupby(rows, key=lambda row: (row[0], row[1])):
+        question = {'id': question_id, 'text': text, 'options': [], 'correct_option_id': None}
+        for _, _, option_id, option_text, is_correct in options:
+            if option_id is None:
+                continue
+            question['options'].append({'id': option_id, 'text': option_text})
+            if is_correct:
+                question['correct_option_id'] = option_id
+        questions.append(question)
+    return questions
+
+
+# Load a quiz set's questions and options once and keep them ready to
+# render, serve and grade against
+def build_payload(quiz_set, locale=None):
+    from app.i18n import quiz_set_title
+    from app.models import Question
+    questions = load_questions(Question.quiz_set_id == quiz_set.id, locale=locale)
+    return {
+        'id': quiz_set.id,
+        'title': quiz_set_title(quiz_set, locale),
+        'questions': questions,
+        'answer_key': {question['id']: question['correct_option_id'] for question in questions},
+        'json': json.dumps(questions),
+    }
+
+
+# Drop cached content after an admin write in this process. Other processes
+# notice the new content_version / catalog version on their next lookup.
+def invalidate_content(quiz_set_id=None):
+    from app import fragment_cache, quiz_cache
+    if quiz_set_id is not None:
+        quiz_cache.invalidate(quiz_set_id)
+    fragment_cache.clear()
+
+
+# ETag for a listing page: what it shows (catalog version, locale) and who is
+# viewing it, since the navigation bar depends on the logged-in user
+def listing_etag(page, version, locale):
+    from flask_login import current_user
+    from app import fragment_cache
+    viewer = f'{current_user.id}:{current_user.role}' if current_user.is_authenticated else 'anonymous'
+    key = f'{fragment_cache.release}:{page}:{version}:{locale}:{viewer}'
+    return hashlib.sha1(key.encode()).hexdigest()[:20]
+
+
+# True when the client already has this version (and no flash message is queued)
+def not_modified(etag):
+    from flask import request, session
+    return '_flashes' not in session and request.if_none_match.contains(etag)
+
+
+# Add validators and Cache-Control. Public responses may be stored by a shared
+# proxy for `max_age` seconds; private ones must be revalidated by the browser.
+def cacheable(response, etag, public=False, max_age=0):
+    response.set_etag(etag)
+    response.vary.update(('Accept-Language', 'Cookie'))
+    if public:
+        response.cache_control.public = True
+        response.cache_control.max_age = max_age
+    else:
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+    return response
@@ -0,0 +1,131 @@
+import click
+from flask.cli import AppGroup
+
+# `flask stats ...` commands for the summary tables
+stats_cli = AppGroup('stats', help='Manage the quiz statistics summary tables.')
+
+# `flask questions ...` commands for the question bank
+questions_cli = AppGroup('questions', help='Manage the question bank.')
+
+# `flask submissions ...` commands for the asynchronous submission journal
+submissions_cli = AppGroup('submissions', help='Manage the asynchronous quiz submission journal.')
+
+# `flask analytics ...` commands for item analysis
+analytics_cli = AppGroup('analytics', help='Manage per-question item analysis.')
+
+# `flask search ...` commands for the question full-text index
+search_cli = AppGroup('search', help='Manage the question full-text search index.')
+
+# `flask templates ...` commands for the compiled template cache
+templates_cli = AppGroup('templates', help='Manage the compiled template cache.')
+
+
+@stats_cli.command('rebuild')
+def rebuild_stats():
+    """Backfill the summary and leaderboard tables from existing quiz results."""
+    from app import stats
+    students = stats.rebuild()
+    click.echo(f'Rebuilt statistics and leaderboards for {students} students.')
+
+
+@questions_cli.command('import')
+@click.argument('source', type=click.File('r', encoding='utf-8-sig'))
+@click.option('--format', 'fmt', type=click.Choice(['jsonl', 'csv']),
+              help='Input format (default: guessed from the file extension).')
+@click.option('--author', required=True, help='Email of the admin recorded as the questions\' author.')
+@click.option('--chunk-size', default=1000, show_default=True, help='Rows per transaction.')
+@click.option('--allow-duplicates', is_flag=True, help='Import rows that nearly duplicate existing questions.')
+def import_questions(source, fmt, author, chunk_size, allow_duplicates):
+    """Bulk import questions from a JSON Lines or CSV file ('-' for stdin)."""
+    from app import importer
+    from app.models import User
+    user = User.find_by_email(author)
+    if user is None:
+        raise click.BadParameter(f'no user with email {author}', param_hint='--author')
+    if fmt is None:
+        fmt = 'csv' if source.name.endswith('.csv') else 'jsonl'
+    report = importer.import_questions(source, fmt, user.id, chunk_size=max(chunk_size, 1),
+                                       allow_duplicates=allow_duplicates)
+    for error in report.errors:
+        click.echo(f"row {error['row']}: {error['error']}", err=True)
+    if report.failed > len(report.errors):
+        click.echo(f'... and {report.failed - len(report.errors)} more errors', err=True)
+    click.echo(f'Imported {report.inserted} of {report.rows} rows ({report.failed} failed) '
+               f'in {report.seconds:.2f}s, {report.rows_per_second} rows/s.')
+
+
+@questions_cli.command('rebuild-signatures')
+def rebuild_signatures():
+    """Recompute the near-duplicate signatures and bucket index of every question."""
+    from app import db, duplicates
+    indexed = duplicates.rebuild()
+    db.session.commit()
+    click.echo(f'Signed {indexed} questions.')
+
+
+@questions_cli.command('duplicates')
+@click.argument('quiz_set_id', type=int)
+def list_duplicates(quiz_set_id):
+    """List clusters of near-duplicate questions in a quiz set."""
+    from app import duplicates
+    report = duplicates.clusters(quiz_set_id)
+    for cluster in report['clusters']:
+        click.echo(f"{len(cluster['questions'])} questions, at least {cluster['similarity']:.0%} similar:")
+        for question in cluster['questions']:
+            click.echo(f"  #{question['id']}: {question['text']}")
+    click.echo(f"{len(report['clusters'])} clusters among {report['questions']} signed questions.")
+
+
+@submissions_cli.command('drain')
+@click.option('--follow', is_flag=True, help='Keep draining new submissions until interrupted.')
+def drain_submissions(follow):
+    """Save journaled quiz submissions to the database."""
+    import time
+    from flask import current_app
+    from app import submission_queue, submissions
+    if not submission_queue.enabled:
+        raise click.UsageError("SUBMISSION_MODE is not 'async'; there is no journal to drain.")
+    batch_size = current_app.config['SUBMISSION_BATCH_SIZE']
+    total = 0
+    while True:
+        drained = submissions.drain(submission_queue.journal, batch_size)
+        total += drained
+        if drained < batch_size:
+            if not follow:
+                break
+            time.sleep(current_app.config['SUBMISSION_DRAIN_INTERVAL'])
+    journal = submission_queue.journal
+    click.echo(f'Drained {total} submissions; {journal.pending_count()} still pending, '
+               f'{journal.count(submissions.FAILED)} failed.')
+
+
+@analytics_cli.command('recompute')
+@click.option('--full', is_flag=True, help='Discard the stored statistics and re-read every answer sheet.')
+def recompute_analytics(full):
+    """Update item statistics for quiz sets that received new answers."""
+    from app import analytics
+    analysed = analytics.recompute(full=full)
+    click.echo(f'Analysed {sum(analysed.values())} answer sheets across {len(analysed)} quiz sets.')
+
+
+@search_cli.command('rebuild')
+def rebuild_search():
+    """Recreate the full-text index from the question bank."""
+    from app import db, search
+    indexed = search.rebuild()
+    if indexed is None:
+        click.echo('Full-text search needs SQLite FTS5; questions are searched with LIKE instead.')
+        return
+    db.session.commit()
+    click.echo(f'Indexed {indexed} questions.')
+
+
+@templates_cli.command('compile')
+def compile_templates():
+    """Compile every template into the bytecode cache, e.g. before starting workers."""
+    from flask import current_app
+    from app import startup
+    if current_app.jinja_env.bytecode_cache is None:
+        raise click.ClickException('Set TEMPLATE_CACHE_DIR to cache compiled templates.')
+    compiled = startup.compile_templates(current_app)
+    click.echo(f'Compiled {compiled} templates.')
@@ -0,0 +1,77 @@
+from sqlalchemy import event, inspect, insert, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.sql import Select
+from flask_sqlalchemy.session import Session
+
+
+# Session that sends plain SELECTs to the 'read' bind when one is configured.
+# Once a transaction has written anything, it stays on the primary until it
+# ends so it always reads its own writes.
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self.info.get('wrote'):
+            read_engine = self._db.engines.get('read')
+            if read_engine is not None:
+                if not self._flushing and isinstance(clause, Select) and clause._for_update_arg is None:
+                    return read_engine
+                self.info['wrote'] = True
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, 'after_transaction_end')
+def _reset_routing(session, transaction):
+    if transaction.parent is None:
+        session.info.pop('wrote', None)
+
+
+# Per-connection SQLite settings: WAL lets readers run alongside a writer,
+# busy_timeout waits for the write lock instead of failing with
+# "database is locked", and synchronous=NORMAL is safe under WAL
+def _sqlite_pragmas(config):
+    synchronous = config['SQLITE_SYNCHRONOUS'].upper()
+    if synchronous not in ('OFF', 'NORMAL', 'FULL', 'EXTRA'):
+        raise ValueError(f'Invalid SQLITE_SYNCHRONOUS: {synchronous}')
+
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if config['SQLITE_WAL']:
+            cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute(f"PRAGMA busy_timeout={int(config['SQLITE_BUSY_TIMEOUT'])}")
+        cursor.execute(f'PRAGMA synchronous={synchronous}')
+        cursor.close()
+    return set_pragmas
+
+
+def init_engines(app, db):
+    with app.app_context():
+        for engine in db.engines.values():
+            if engine.dialect.name == 'sqlite':
+                event.listen(engine, 'connect', _sqlite_pragmas(app.config))
+
+
+# Insert a row, or when one with the same primary key exists apply the
+# `on_conflict` column updates to it (None: leave it alone), as a single
+# atomic INSERT ... ON CONFLICT on SQLite and PostgreSQL. Elsewhere the INSERT
+# is tried in a savepoint and followed by an UPDATE if it hits the key.
+# Returns 0 when the row existed and was left alone.
+def upsert(session, model, values, on_conflict=None):
+    table = model.__table__
+    keys = [column.name for column in table.primary_key]
+    dialect = session.get_bind(mapper=inspect(model)).dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        statement = (sqlite if dialect == 'sqlite' else postgresql).insert(table).values(**values)
+        if on_conflict:
+            statement = statement.on_conflict_do_update(index_elements=keys, set_=on_conflict)
+        else:
+            statement = statement.on_conflict_do_nothing(index_elements=keys)
+        return session.execute(statement).rowcount
+    try:
+        with session.begin_nested():
+            session.execute(insert(table).values(**values))
+        return 1
+    except IntegrityError:
+        if not on_conflict:
+            return 0
+        return session.execute(
+            update(table).where(*(table.c[key] == values[key] for key in keys)).values(**on_conflict)).rowcount
@@ -0,0 +1,293 @@
+import hashlib
+import re
+import unicodedata
+import zlib
+import numpy as np
+from flask import current_app
+from sqlalchemy import bindparam, insert, select, update
+from app import db
+from app.models import Option, Question, QuestionBucket
+
+# MinHash signatures of NUM_HASHES values, split into BANDS bands of ROWS
+# values for LSH. Two questions whose shingle sets have Jaccard similarity s
+# share at least one bucket with probability 1 - (1 - s**ROWS)**BANDS:
+# about 0.99 at s = 0.7, 0.64 at 0.5 and 0.12 at 0.3.
+NUM_HASHES = 64
+BANDS = 16
+ROWS = NUM_HASHES // BANDS
+SHINGLE = 5
+# Questions hashed per numpy pass (each pass holds NUM_HASHES x shingles values)
+SIGNATURE_BATCH = 256
+REBUILD_BATCH = 5000
+# Bound parameters per lookup query
+LOOKUP_BATCH = 900
+
+# Hash functions h(x) = (a * x + b) mod PRIME over 32-bit shingle hashes.
+# The coefficients are derived from fixed strings so stored signatures stay
+# comparable across processes and numpy versions.
+PRIME = np.uint64(2 ** 31 - 1)
+_A, _B = (np.array([int.from_bytes(hashlib.blake2b(f'{name}{i}'.encode(), digest_size=8).digest(), 'little')
+                    % (2 ** 31 - 2) + 1 for i in range(NUM_HASHES)], np.uint64) for name in ('a', 'b'))
+
+
+_NON_WORD = re.compile(r'[\W_]+')
+
+
+# Lowercase, strip accents and punctuation, collapse whitespace
+def normalize(text):
+    text = text.lower()
+    if not text.isascii():
+        text = ''.join(c for c in unicodedata.normalize('NFKD', text) if not unicodedata.combining(c))
+    return ' '.join(_NON_WORD.sub(' ', text).split())
+
+
+# Character shingles of the question text and of its options, sorted so that
+# option order does not matter
+def shingles(text, options):
+    parts = [normalize(text)] + sorted(normalize(option) for option in options)
+    result = set()
+    for part in parts:
+        if len(part) <= SHINGLE:
+            result.add(part)
+        else:
+            result.update(part[i:i + SHINGLE] for i in range(len(part) - SHINGLE + 1))
+    return result or {''}
+
+
+# MinHash signatures, shape (len(items), NUM_HASHES), of (text, options) pairs
+def signatures(items):
+    result = np.empty((len(items), NUM_HASHES), np.uint32)
+    for start in range(0, len(items), SIGNATURE_BATCH):
+        hashed = [np.fromiter(map(zlib.crc32, (s.encode() for s in shingles(text, options))), np.uint64)
+                  for text, options in items[start:start + SIGNATURE_BATCH]]
+        offsets = np.cumsum([0] + [len(h) for h in hashed[:-1]])
+        values = (_A[:, None] * np.concatenate(hashed)[None, :] + _B[:, None]) % PRIME
+        result[start:start + len(hashed)] = np.minimum.reduceat(values, offsets, axis=1).T
+    return result
+
+
+def pack(signature):
+    return signature.astype('<u4').tobytes()
+
+
+def unpack(data):
+    return np.frombuffer(data, '<u4')
+
+
+# One 64-bit bucket key per band, shape (n, BANDS), mixing in the band number
+# so a single index on (quiz_set_id, bucket) serves every band
+def band_keys(signatures):
+    bands = signatures.reshape(len(signatures), BANDS, ROWS).astype(np.uint64)
+    with np.errstate(over='ignore'):
+        keys = np.broadcast_to(np.arange(1, BANDS + 1, dtype=np.uint64), bands.shape[:2]).copy()
+        for row in range(ROWS):
+            keys = keys * np.uint64(0x100000001b3) + bands[:, :, row]
+        keys ^= keys >> np.uint64(33)
+        keys *= np.uint64(0xff51afd7ed558ccd)
+        keys ^= keys >> np.uint64(33)
+    return keys.view(np.int64)
+
+
+# Estimated Jaccard similarity: the share of hash functions that agree
+def similarity(a, b):
+    return (a == b).mean(axis=-1)
+
+
+def threshold():
+    return current_app.config['DUPLICATE_THRESHOLD']
+
+
+# For each (quiz_set_id, signature), the existing questions of that quiz set
+# at least `threshold()` similar, as [(question_id, similarity)], most
+# similar first. Candidates come from the bucket index; only they are compared.
+def find_similar(quiz_set_ids, signatures):
+    matches = [[] for _ in quiz_set_ids]
+    if not len(quiz_set_ids):
+        return matches
+    keys = band_keys(signatures)
+    candidates = {}
+    for quiz_set_id in set(quiz_set_ids):
+        wanted = sorted({key for i, q in enumerate(quiz_set_ids) if q == quiz_set_id for key in keys[i].tolist()})
+        for start in range(0, len(wanted), LOOKUP_BATCH):
+            for bucket, question_id in db.session.execute(
+                    select(QuestionBucket.bucket, QuestionBucket.question_id)
+                    .where(QuestionBucket.quiz_set_id == quiz_set_id,
+                           QuestionBucket.bucket.in_(wanted[start:start + LOOKUP_BATCH]))):
+                candidates.setdefault((quiz_set_id, bucket), []).append(question_id)
+    if not candidates:
+        return matches
+    candidate_ids = sorted({question_id for ids in candidates.values() for question_id in ids})
+    stored = {}
+    for start in range(0, len(candidate_ids), LOOKUP_BATCH):
+        stored.update(db.session.execute(
+            select(Question.id, Question.minhash)
+            .where(Question.id.in_(candidate_ids[start:start + LOOKUP_BATCH]))).all())
+    limit = threshold()
+    for i, quiz_set_id in enumerate(quiz_set_ids):
+        ids = sorted({question_id for key in keys[i].tolist()
+                      for question_id in candidates.get((quiz_set_id, key), ())})
+        if not ids:
+            continue
+        scores = similarity(np.stack([unpack(stored[question_id]) for question_id in ids]), signatures[i])
+        matches[i] = sorted(((question_id, round(float(score), 3)) for question_id, score in zip(ids, scores)
+                             if score >= limit), key=lambda match: -match[1])
+    return matches
+
+
+# For each row of a batch that is about to be inserted, the index of an
+# earlier row in the same batch and quiz set it duplicates, else None
+def find_repeats(quiz_set_ids, signatures):
+    keys = band_keys(signatures)
+    seen = {}
+    repeats = []
+    limit = threshold()
+    for i, quiz_set_id in enumerate(quiz_set_ids):
+        earlier = {seen[(quiz_set_id, key)] for key in keys[i].tolist() if (quiz_set_id, key) in seen}
+        repeat = next((j for j in sorted(earlier) if similarity(signatures[j], signatures[i]) >= limit), None)
+        repeats.append(repeat)
+        if repeat is None:
+            for key in keys[i].tolist():
+                seen.setdefault((quiz_set_id, key), i)
+    return repeats
+
+
+# Add inserted questions to the bucket index; `signatures` were stored with
+# the rows. Runs in the caller's transaction, as a Core executemany (sixteen
+# rows per question is enough for ORM bulk insert overhead to show), in key
+# order so consecutive rows land on nearby pages.
+def index(question_ids, quiz_set_ids, signatures, connection=None):
+    if not question_ids:
+        return
+    keys = band_keys(signatures)
+    rows = sorted({(quiz_set_id, bucket, question_id)
+                   for question_id, quiz_set_id, row in zip(question_ids, quiz_set_ids, keys)
+                   for bucket in row.tolist()})
+    (connection or db.session).execute(insert(QuestionBucket.__table__), [
+        {'quiz_set_id': quiz_set_id, 'bucket': bucket, 'question_id': question_id}
+        for quiz_set_id, bucket, question_id in rows
+    ])
+
+
+# Sign a new, unsaved question (the signature is stored with it) and return
+# the existing questions of its quiz set it nearly duplicates, if checking
+# is enabled
+def check(question):
+    signature = signatures([(question.text, [option.text for option in question.options])])
+    question.minhash = pack(signature[0])
+    if not current_app.config['DUPLICATE_CHECK']:
+        return []
+    return describe(find_similar([question.quiz_set_id], signature)[0])
+
+
+# Add a flushed question, signed by check(), to the bucket index
+def index_question(question):
+    index([question.id], [question.quiz_set_id], unpack(question.minhash)[None, :])
+
+
+# [(question_id, similarity)] -> dicts with each question's position and text
+def describe(matches):
+    if not matches:
+        return []
+    questions = {row.id: row for row in db.session.execute(
+        select(Question.id, Question.position, Question.text)
+        .where(Question.id.in_([question_id for question_id, _ in matches])))}
+    return [{'id': question_id, 'position': questions[question_id].position,
+             'text': questions[question_id].text, 'similarity': score}
+            for question_id, score in matches]
+
+
+def _options_by_question(question_ids, connection):
+    options = {}
+    for question_id, text in connection.execute(
+            select(Option.question_id, Option.text).where(Option.question_id.in_(question_ids))):
+        options.setdefault(question_id, []).append(text)
+    return options
+
+
+# Recompute every signature and the bucket index, in batches of questions;
+# the caller commits. Runs on the app session, or on `connection` (as in the
+# migration that adds the signatures). Returns the number of questions indexed.
+def rebuild(connection=None):
+    connection = connection or db.session
+    questions = Question.__table__
+    connection.execute(QuestionBucket.__table__.delete())
+    last_id, total = 0, 0
+    while True:
+        rows = connection.execute(
+            select(questions.c.id, questions.c.quiz_set_id, questions.c.text)
+            .where(questions.c.id > last_id).order_by(questions.c.id).limit(REBUILD_BATCH)).all()
+        if not rows:
+            return total
+        options = _options_by_question([row.id for row in rows], connection)
+        computed = signatures([(row.text, options.get(row.id, [])) for row in rows])
+        connection.execute(
+            update(questions).where(questions.c.id == bindparam('question_id')).values(minhash=bindparam('signature')),
+            [{'question_id': row.id, 'signature': pack(signature)} for row, signature in zip(rows, computed)])
+        index([row.id for row in rows], [row.quiz_set_id for row in rows], computed, connection)
+        last_id = rows[-1].id
+        total += len(rows)
+
+
+# Groups of near-duplicate questions in a quiz set, largest first. Signatures
+# are read in batches; bucket keys for the whole set are computed in one numpy
+# pass, every bucket links its members to its first question when their
+# signatures agree, and linked questions are merged into clusters.
+def clusters(quiz_set_id):
+    ids, chunks, last_id = [], [], 0
+    while True:
+        rows = db.session.execute(
+            select(Question.id, Question.minhash)
+            .where(Question.quiz_set_id == quiz_set_id, Question.minhash.is_not(None), Question.id > last_id)
+            .order_by(Question.id).limit(REBUILD_BATCH)).all()
+        if not rows:
+            break
+        ids.extend(row.id for row in rows)
+        chunks.append(np.stack([unpack(row.minhash) for row in rows]))
+        last_id = rows[-1].id
+    report = {'quiz_set_id': quiz_set_id, 'threshold': threshold(), 'questions': len(ids), 'clusters': []}
+    if not ids:
+        return report
+    sigs = np.concatenate(chunks)
+    ids = np.array(ids)
+
+    # Members of each bucket, paired with the bucket's first member
+    keys = band_keys(sigs).ravel()
+    members = np.repeat(np.arange(len(ids)), BANDS)
+    order = np.lexsort((members, keys))
+    keys, members = keys[order], members[order]
+    first = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    leaders = np.repeat(members[first], np.diff(np.r_[first, len(keys)]))
+    pairs = np.unique(np.stack([leaders, members], axis=1)[leaders != members], axis=0)
+    if not len(pairs):
+        return report
+    scores = similarity(sigs[pairs[:, 0]], sigs[pairs[:, 1]])
+    keep = scores >= threshold()
+    pairs, scores = pairs[keep], scores[keep]
+
+    parent = list(range(len(ids)))
+
+    def root(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for a, b in pairs.tolist():
+        parent[root(b)] = root(a)
+    groups = {}
+    for i in np.unique(pairs).tolist():
+        groups.setdefault(root(i), []).append(int(ids[i]))
+    lowest = {}
+    for (a, _), score in zip(pairs.tolist(), scores.tolist()):
+        group = root(a)
+        lowest[group] = min(lowest.get(group, 1.0), score)
+
+    questions = {row.id: row for row in db.session.execute(
+        select(Question.id, Question.position, Question.text)
+        .where(Question.id.in_([question_id for group in groups.values() for question_id in group])))}
+    report['clusters'] = sorted(({
+        'similarity': round(lowest[group], 3),
+        'questions': [{'id': question_id, 'position': questions[question_id].position,
+                       'text': questions[question_id].text} for question_id in sorted(members)],
+    } for group, members in groups.items()), key=lambda cluster: (-len(cluster['questions']), -cluster['similarity']))
+    return report
@@ -0,0 +1,61 @@
+import csv
+import io
+import json
+from sqlalchemy import func, select
+from app import db
+from app.models import QuizResult, QuizSet, User
+
+COLUMNS = ['result_id', 'user_id', 'username', 'quiz_set_id', 'quiz_set_title',
+           'score', 'question_count', 'date_taken']
+
+
+# Stream quiz results joined with their student and quiz set, fetching
+# `batch_size` rows at a time from a server-side cursor
+def result_rows(quiz_set_id=None, start=None, end=None, batch_size=1000):
+    stmt = select(
+        QuizResult.id, QuizResult.user_id, User.username, QuizResult.quiz_set_id,
+        QuizSet.title, QuizResult.score,
+        # Questions in the attempt (a sample, for sampled quizzes); older rows use the set's count
+        func.coalesce(QuizResult.question_count, QuizSet.question_count), QuizResult.date_taken
+    ).join(User, User.id == QuizResult.user_id) \
+     .join(QuizSet, QuizSet.id == QuizResult.quiz_set_id) \
+     .order_by(QuizResult.id)
+    if quiz_set_id is not None:
+        stmt = stmt.where(QuizResult.quiz_set_id == quiz_set_id)
+    if start is not None:
+        stmt = stmt.where(QuizResult.date_taken >= start)
+    if end is not None:
+        stmt = stmt.where(QuizResult.date_taken < end)
+    result = db.session.execute(stmt.execution_options(yield_per=batch_size))
+    for partition in result.partitions():
+        yield partition
+
+
+def _record(row):
+    record = dict(zip(COLUMNS, row))
+    if record['date_taken'] is not None:
+        record['date_taken'] = record['date_taken'].isoformat()
+    return record
+
+
+def to_csv(partitions):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMNS)
+    for partition in partitions:
+        writer.writerows(_record(row).values() for row in partition)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def to_ndjson(partitions):
+    for partition in partitions:
+        yield ''.join(json.dumps(_record(row)) + '\n' for row in partition)
+
+
+FORMATS = {
+    'csv': (to_csv, 'text/csv'),
+    'ndjson': (to_ndjson, 'application/x-ndjson'),
+}
@@ -1,6 +1,6 @@
 from flask_wtf import FlaskForm
 from wtforms import StringField, PasswordField, BooleanField, SubmitField, SelectField
-from wtforms.validators import DataRequired, Email, EqualTo
+from wtforms.validators import DataRequired, Email, EqualTo, ValidationError
 
 class RegistrationForm(FlaskForm):
     username = StringField('Username', validators=[DataRequired()])
@@ -10,6 +10,16 @@ class RegistrationForm(FlaskForm):
     role = SelectField('Role', choices=[('student', 'Student'), ('admin', 'Admin')], validators=[DataRequired()])
     submit = SubmitField('Register')
 
+    def validate_username(self, username):
+        from app.models import User
+        if User.query.filter_by(username=username.data).first() is not None:
+            raise ValidationError('That username is taken.')
+
+    def validate_email(self, email):
+        from app.models import User
+        if User.find_by_email(email.data) is not None:
+            raise ValidationError('An account with that email already exists.')
+
 class LoginForm(FlaskForm):
     email = StringField('Email', validators=[DataRequired(), Email()])
     password = PasswordField('Password', validators=[DataRequired()])
@@ -0,0 +1,10 @@
+# Submitted option id per question, read from fields named question_<id>
+def read_answers(form, question_ids):
+    return {question_id: form.get(f'question_{question_id}', type=int) for question_id in question_ids}
+
+
+# Number of questions whose submitted option id matches the answer key
+# ({question_id: correct_option_id})
+def grade(answer_key, answers):
+    return sum(1 for question_id, option_id in answer_key.items()
+               if option_id is not None and answers.get(question_id) == option_id)
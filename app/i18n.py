@@ -0,0 +1,101 @@
+from functools import lru_cache
+from flask import current_app, request
+from werkzeug.datastructures import LanguageAccept
+from werkzeug.http import parse_accept_header
+
+
+# Negotiation result per distinct Accept-Language header. Browsers send a
+# handful of distinct headers, so this is parsed once per header, not per request.
+@lru_cache(maxsize=512)
+def negotiate(header, languages):
+    return parse_accept_header(header, LanguageAccept).best_match(languages)
+
+
+# Pick the best supported language from the Accept-Language header
+def get_locale():
+    return negotiate(request.headers.get('Accept-Language', ''), tuple(current_app.config['LANGUAGES']))
+
+
+# Load every compiled message catalog now, so the first request in each
+# language does not read .mo files from disk
+def preload_catalogs(app, babel):
+    from flask_babel import force_locale
+    with app.test_request_context():
+        for locale in app.config['LANGUAGES']:
+            with force_locale(locale):
+                babel.domain_instance.get_translations()
+
+
+# Locale to translate quiz content into for this request, or None when the
+# content can be served as stored (the default locale)
+def content_locale():
+    from flask_babel import get_locale as negotiated_locale
+    locale = str(negotiated_locale())
+    return None if locale == current_app.config['BABEL_DEFAULT_LOCALE'] else locale
+
+
+# (id, title) rows for every quiz set, titles translated where available
+def quiz_set_titles(locale=None):
+    from sqlalchemy import and_, func, select
+    from app import db
+    from app.models import QuizSet, QuizSetTranslation
+    query = select(QuizSet.id, QuizSet.title).order_by(QuizSet.id)
+    if locale:
+        query = select(QuizSet.id, func.coalesce(QuizSetTranslation.title, QuizSet.title).label('title')) \
+            .outerjoin(QuizSetTranslation, and_(QuizSetTranslation.quiz_set_id == QuizSet.id,
+                                                QuizSetTranslation.locale == locale)) \
+            .order_by(QuizSet.id)
+    return db.session.execute(query).all()
+
+
+def quiz_set_title(quiz_set, locale=None):
+    from app import db
+    from app.models import QuizSetTranslation
+    translation = db.session.get(QuizSetTranslation, (quiz_set.id, locale)) if locale else None
+    return translation.title if translation else quiz_set.title
+
+
+# Store translations of a quiz set's title, questions and options:
+#   {'title': ..., 'questions': [{'id': ..., 'text': ..., 'options': [{'id': ..., 'text': ...}]}]}
+# Ids that do not belong to the quiz set are rejected. The caller commits.
+def save_translations(quiz_set_id, locale, data):
+    from sqlalchemy import select
+    from app import db
+    from app.models import Option, OptionTranslation, Question, QuestionTranslation, QuizSet, QuizSetTranslation
+    if locale not in current_app.config['LANGUAGES'] or locale == current_app.config['BABEL_DEFAULT_LOCALE']:
+        raise ValueError(f'unsupported locale: {locale}')
+    questions = data.get('questions') or []
+    if not isinstance(questions, list) or not all(isinstance(question, dict) for question in questions):
+        raise ValueError('questions must be a list of objects')
+    for question in questions:
+        options = question.get('options') or []
+        if not isinstance(options, list) or not all(isinstance(option, dict) for option in options):
+            raise ValueError('options must be a list of objects')
+        if not all(isinstance(item.get('id'), int) for item in [question] + options):
+            raise ValueError('question and option ids must be integers')
+    question_ids = {question.get('id') for question in questions}
+    known_questions = set(db.session.scalars(
+        select(Question.id).where(Question.quiz_set_id == quiz_set_id, Question.id.in_(question_ids))))
+    option_ids = {option.get('id') for question in questions for option in question.get('options') or []}
+    known_options = dict(db.session.execute(
+        select(Option.id, Option.question_id).where(Option.id.in_(option_ids))).all())
+
+    rows = []
+    if data.get('title'):
+        rows.append(QuizSetTranslation(quiz_set_id=quiz_set_id, locale=locale, title=str(data['title'])[:128]))
+    for question in questions:
+        if question.get('id') not in known_questions:
+            raise ValueError(f"question {question.get('id')} is not in quiz set {quiz_set_id}")
+        if question.get('text'):
+            rows.append(QuestionTranslation(question_id=question['id'], locale=locale, text=str(question['text'])))
+        for option in question.get('options') or []:
+            if known_options.get(option.get('id')) != question['id']:
+                raise ValueError(f"option {option.get('id')} does not belong to question {question['id']}")
+            if option.get('text'):
+                rows.append(OptionTranslation(option_id=option['id'], locale=locale, text=str(option['text'])))
+    if any(len(getattr(row, 'text', '')) > 256 for row in rows):
+        raise ValueError('translations are limited to 256 characters')
+    for row in rows:
+        db.session.merge(row)
+    QuizSet.record_content_changed(quiz_set_id)
+    return len(rows)
@@ -0,0 +1,153 @@
+import threading
+import time
+from collections import OrderedDict
+from flask import session
+from sqlalchemy import event
+from sqlalchemy.orm import make_transient_to_detached, object_session
+from app.cache import NullBackend, make_backend
+from app.database import RoutingSession
+
+# User columns kept per identity: enough for authentication and role checks.
+# Anything else (password_hash, relationships) loads on first access.
+FIELDS = ('id', 'username', 'email', 'role')
+SESSION_KEY = '_identity'
+
+
+# Users for the login_manager user_loader, keyed by id, so an authenticated
+# request does not start with a primary-key lookup. Entries are dropped when
+# the user row is updated or deleted; other processes only find out when
+# their entry expires, so IDENTITY_CACHE_TTL bounds how long a role change
+# takes to apply everywhere.
+#
+# With IDENTITY_SESSION_CLAIMS the same fields also ride in the signed
+# session cookie and are trusted for IDENTITY_CLAIM_MAX_AGE seconds, or until
+# this process sees the user change.
+class IdentityCache:
+    def __init__(self, app=None):
+        self.backend = NullBackend()
+        self.claims = False
+        self.counts = {'session': 0, 'cache': 0, 'database': 0, 'invalidations': 0}
+        # user id -> wall-clock time it was last invalidated
+        self._changed = OrderedDict()
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        from app.models import User
+        self.backend = make_backend(app, 'IDENTITY_CACHE')
+        self.claims = app.config['IDENTITY_SESSION_CLAIMS']
+        self.claim_max_age = app.config['IDENTITY_CLAIM_MAX_AGE']
+        self.horizon = max(app.config['IDENTITY_CACHE_TTL'], self.claim_max_age)
+        for target, name, listener in ((User, 'after_update', self._user_changed),
+                                       (User, 'after_delete', self._user_changed),
+                                       (RoutingSession, 'after_commit', self._after_commit)):
+            if not event.contains(target, name, listener):
+                event.listen(target, name, listener)
+        app.extensions['identity_cache'] = self
+        app.extensions['instrumentation'].register_collector('identity_cache', self.metrics)
+
+    # The user for an authenticated request, attached to the current session
+    # so lazy attributes and relationships still load
+    def load(self, user_id):
+        from app import db
+        from app.models import User
+        current = db.session.identity_map.get(db.session.identity_key(User, user_id))
+        if current is not None:
+            return current
+        fields = self._from_claims(user_id)
+        if fields is not None:
+            self._count('session')
+        else:
+            fields = self.backend.get((user_id,))
+            if fields is None:
+                self._count('database')
+                started = time.time()
+                user = db.session.get(User, user_id)
+                if user is not None:
+                    self.remember(user, since=started)
+                return user
+            self._count('cache')
+            self._issue_claims(fields)
+        user = User(**fields)
+        make_transient_to_detached(user)
+        db.session.add(user)
+        return user
+
+    # Cache `user` (and hand it out as session claims). `since` is when its
+    # row was read; a change recorded after that makes the copy stale.
+    def remember(self, user, since=None):
+        fields = {name: getattr(user, name) for name in FIELDS}
+        if since is not None and self._changed_since(user.id, since):
+            return
+        self.backend.set((user.id,), fields)
+        self._issue_claims(fields)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._changed[user_id] = time.time()
+            self._changed.move_to_end(user_id)
+            # Changes older than any entry or claim can be forgotten
+            cutoff = time.time() - self.horizon
+            while self._changed and next(iter(self._changed.values())) < cutoff:
+                self._changed.popitem(last=False)
+            self.counts['invalidations'] += 1
+        self.backend.delete_prefix((user_id,))
+
+    def forget_session(self):
+        session.pop(SESSION_KEY, None)
+
+    def _from_claims(self, user_id):
+        if not self.claims:
+            return None
+        claims = session.get(SESSION_KEY)
+        if not isinstance(claims, dict) or claims.get('id') != user_id:
+            return None
+        issued = claims.get('issued', 0)
+        if time.time() - issued > self.claim_max_age or self._changed_since(user_id, issued):
+            return None
+        return {name: claims[name] for name in FIELDS}
+
+    def _issue_claims(self, fields):
+        if self.claims:
+            # Whole seconds, rounded down: a claim issued in the same second as
+            # a change counts as older than it
+            session[SESSION_KEY] = dict(fields, issued=int(time.time()))
+
+    def _changed_since(self, user_id, when):
+        with self._lock:
+            return self._changed.get(user_id, 0) >= when
+
+    def _count(self, source):
+        with self._lock:
+            self.counts[source] += 1
+
+    # Invalidate at flush, and again once the change is committed, so a
+    # request that re-read the old row in between cannot keep it cached
+    def _user_changed(self, mapper, connection, user):
+        self.invalidate(user.id)
+        session = object_session(user)
+        if session is not None:
+            session.info.setdefault('identity_changed', set()).add(user.id)
+
+    def _after_commit(self, session):
+        for user_id in session.info.pop('identity_changed', ()):
+            self.invalidate(user_id)
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self.counts)
+        lookups = counts['session'] + counts['cache'] + counts['database']
+        counts['hit_ratio'] = round((counts['session'] + counts['cache']) / lookups, 4) if lookups else None
+        return counts
+
+    def metrics(self):
+        counts = self.stats()
+        lines = ['# HELP quiz_app_identity_lookups_total Users loaded for authenticated requests, by source.',
+                 '# TYPE quiz_app_identity_lookups_total counter']
+        for source in ('session', 'cache', 'database'):
+            lines.append(f'quiz_app_identity_lookups_total{{source="{source}"}} {counts[source]}')
+        lines.append('# HELP quiz_app_identity_invalidations_total Cached users dropped because the user changed.')
+        lines.append('# TYPE quiz_app_identity_invalidations_total counter')
+        lines.append(f'quiz_app_identity_invalidations_total {counts["invalidations"]}')
+        return lines
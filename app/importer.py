@@ -0,0 +1,186 @@
+import csv
+import json
+import time
+from flask import current_app
+from collections import Counter
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
+from app import db, duplicates, search
+from app.models import Option, Question, QuizSet, option_rows
+
+FORMATS = ('jsonl', 'csv')
+CSV_FIELDS = ['text', 'options', 'correct_option', 'quiz_set_id']
+OPTION_SEPARATOR = '|'
+MAX_REPORTED_ERRORS = 1000
+
+
+# Outcome of a bulk import: counts, per-row errors and throughput
+class ImportReport:
+    def __init__(self):
+        self.rows = 0
+        self.inserted = 0
+        self.failed = 0
+        self.errors = []
+        self.started = time.perf_counter()
+        self.finished = None
+
+    def add_error(self, row_number, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': row_number, 'error': message})
+
+    @property
+    def seconds(self):
+        return (self.finished or time.perf_counter()) - self.started
+
+    @property
+    def rows_per_second(self):
+        return round(self.rows / self.seconds, 1) if self.seconds else 0.0
+
+    def to_dict(self):
+        return {
+            'rows': self.rows,
+            'inserted': self.inserted,
+            'failed': self.failed,
+            'errors': self.errors,
+            'seconds': round(self.seconds, 3),
+            'rows_per_second': self.rows_per_second,
+        }
+
+
+# Yield (row_number, row, error) from an iterable of text lines
+def read_rows(lines, fmt):
+    if fmt == 'csv':
+        reader = csv.DictReader(lines)
+        missing = set(CSV_FIELDS) - set(reader.fieldnames or [])
+        if missing:
+            yield 1, None, f"missing CSV columns: {', '.join(sorted(missing))}"
+            return
+        for row in reader:
+            yield reader.line_num, row, None
+        return
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield number, None, f'invalid JSON: {e}'
+            continue
+        if not isinstance(row, dict):
+            yield number, None, 'expected a JSON object'
+            continue
+        yield number, row, None
+
+
+# Check one row and turn it into Question column values plus its Option rows.
+# CSV cells (and JSON strings) list options separated by '|'.
+def validate_row(row, known_quiz_sets):
+    text = (row.get('text') or '').strip()
+    options = row.get('options')
+    if isinstance(options, str):
+        options = options.split(OPTION_SEPARATOR)
+    if not isinstance(options, list):
+        raise ValueError(f"options must be a list or a '{OPTION_SEPARATOR}'-separated string")
+    try:
+        quiz_set_id = int(row.get('quiz_set_id'))
+    except (TypeError, ValueError):
+        raise ValueError('quiz_set_id must be an integer')
+
+    if not text:
+        raise ValueError('text is required')
+    if len(text) > 256:
+        raise ValueError('text is longer than 256 characters')
+    if quiz_set_id not in known_quiz_sets:
+        raise ValueError(f'quiz set {quiz_set_id} does not exist')
+    options = option_rows(options, row.get('correct_option'))
+    return {'text': text, 'quiz_set_id': quiz_set_id}, options
+
+
+# Sign a chunk's questions and, unless duplicates are allowed, report and
+# drop rows that nearly duplicate an existing question of their quiz set or
+# an earlier row of the chunk. Returns the kept rows and their signatures.
+def _drop_duplicates(values, options, row_numbers, report, allow_duplicates):
+    signatures = duplicates.signatures([
+        (value['text'], [option['text'] for option in question_options])
+        for value, question_options in zip(values, options)])
+    if allow_duplicates or not current_app.config['DUPLICATE_CHECK']:
+        return values, options, row_numbers, signatures
+    quiz_set_ids = [value['quiz_set_id'] for value in values]
+    similar = duplicates.find_similar(quiz_set_ids, signatures)
+    repeats = duplicates.find_repeats(quiz_set_ids, signatures)
+    keep = []
+    for i, number in enumerate(row_numbers):
+        if similar[i]:
+            question_id, score = similar[i][0]
+            report.add_error(number, f'near-duplicate of question {question_id} ({score:.0%} similar)')
+        elif repeats[i] is not None:
+            report.add_error(number, f'near-duplicate of row {row_numbers[repeats[i]]}')
+        else:
+            keep.append(i)
+    return ([values[i] for i in keep], [options[i] for i in keep], [row_numbers[i] for i in keep],
+            signatures[keep])
+
+
+# Insert one validated chunk in a single transaction
+def _insert_chunk(values, options, row_numbers, report, allow_duplicates=False):
+    try:
+        values, options, row_numbers, signatures = _drop_duplicates(
+            values, options, row_numbers, report, allow_duplicates)
+        if not values:
+            return
+        # Reserve each quiz set's next positions, then number the rows in order
+        positions = {quiz_set_id: QuizSet.record_questions_added(quiz_set_id, count)
+                     for quiz_set_id, count in Counter(v['quiz_set_id'] for v in values).items()}
+        for value, signature in zip(values, signatures):
+            value['position'] = positions[value['quiz_set_id']]
+            value['minhash'] = duplicates.pack(signature)
+            positions[value['quiz_set_id']] += 1
+        question_ids = db.session.scalars(
+            insert(Question).returning(Question.id, sort_by_parameter_order=True), values).all()
+        db.session.execute(insert(Option), [
+            dict(option, question_id=question_id)
+            for question_id, question_options in zip(question_ids, options)
+            for option in question_options
+        ])
+        search.index_questions(question_ids)
+        duplicates.index(question_ids, [value['quiz_set_id'] for value in values], signatures)
+        db.session.commit()
+        report.inserted += len(values)
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        for number in row_numbers:
+            report.add_error(number, f'database error: {e.__class__.__name__}')
+
+
+# Stream rows from `lines` into the question table in batched transactions.
+# Invalid rows, and near-duplicates unless `allow_duplicates`, are reported
+# and skipped; the rest of the job carries on.
+def import_questions(lines, fmt, user_id, chunk_size=1000, allow_duplicates=False):
+    if fmt not in FORMATS:
+        raise ValueError(f'unsupported format: {fmt}')
+    report = ImportReport()
+    known_quiz_sets = {quiz_set_id for (quiz_set_id,) in db.session.query(QuizSet.id)}
+    values, options, row_numbers = [], [], []
+    for number, row, error in read_rows(lines, fmt):
+        report.rows += 1
+        if error is None:
+            try:
+                value, question_options = validate_row(row, known_quiz_sets)
+            except ValueError as e:
+                error = str(e)
+        if error is not None:
+            report.add_error(number, error)
+            continue
+        value['user_id'] = user_id
+        values.append(value)
+        options.append(question_options)
+        row_numbers.append(number)
+        if len(values) >= chunk_size:
+            _insert_chunk(values, options, row_numbers, report, allow_duplicates)
+            values, options, row_numbers = [], [], []
+    if values:
+        _insert_chunk(values, options, row_numbers, report, allow_duplicates)
+    report.finished = time.perf_counter()
+    return report
@@ -0,0 +1,172 @@
+import json
+import logging
+import threading
+import time
+from flask import Response, g, has_app_context, request
+from flask.signals import before_render_template, template_rendered
+from sqlalchemy import event
+
+logger = logging.getLogger('app.instrumentation')
+
+# Request duration histogram buckets, in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+MAX_STATEMENTS = 100
+
+
+# Running totals for one (endpoint, method) pair
+class EndpointStats:
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.slow = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.template_seconds = 0.0
+        self.response_bytes = 0
+        self.buckets = [0] * len(BUCKETS)
+
+
+# Opt-in (INSTRUMENTATION_ENABLED) per-request SQL and timing collection.
+# When disabled, init_app registers nothing, so requests pay no cost.
+class Instrumentation:
+    def __init__(self, app=None):
+        self.enabled = False
+        self._endpoints = {}
+        self._lock = threading.Lock()
+        self._collectors = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions['instrumentation'] = self
+        if not app.config.get('INSTRUMENTATION_ENABLED'):
+            return
+        self.enabled = True
+        self.slow_request_seconds = app.config['SLOW_REQUEST_MS'] / 1000
+
+        from app import db
+        with app.app_context():
+            for engine in db.engines.values():
+                event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+                event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+        before_render_template.connect(self._before_render, app)
+        template_rendered.connect(self._after_render, app)
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        app.add_url_rule('/metrics', 'metrics', self.metrics_view)
+
+    # Other modules can add lines to /metrics (callable returning text lines).
+    # Keyed by name, so registering again from another create_app replaces it.
+    def register_collector(self, name, collector):
+        self._collectors[name] = collector
+
+    def _current(self):
+        return g.get('_instrumentation') if has_app_context() else None
+
+    def _start_request(self):
+        g._instrumentation = {
+            'started': time.perf_counter(), 'queries': 0, 'sql_seconds': 0.0,
+            'template_seconds': 0.0, 'template_started': None, 'statements': [],
+        }
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        # Kept on the execution context, so a statement that raises leaves nothing behind
+        context._query_start = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._query_start
+        current = self._current()
+        if current is None:
+            return
+        current['queries'] += 1
+        current['sql_seconds'] += elapsed
+        if len(current['statements']) < MAX_STATEMENTS:
+            current['statements'].append((elapsed, statement))
+
+    def _before_render(self, sender, template, context, **extra):
+        current = self._current()
+        if current is not None:
+            current['template_started'] = time.perf_counter()
+
+    def _after_render(self, sender, template, context, **extra):
+        current = self._current()
+        if current is not None and current['template_started'] is not None:
+            current['template_seconds'] += time.perf_counter() - current['template_started']
+            current['template_started'] = None
+
+    def _finish_request(self, response):
+        current = g.pop('_instrumentation', None)
+        if current is None:
+            return response
+        seconds = time.perf_counter() - current['started']
+        size = None if response.is_streamed else response.calculate_content_length()
+        slow = seconds >= self.slow_request_seconds
+        endpoint = request.endpoint or 'unmatched'
+        with self._lock:
+            stats = self._endpoints.setdefault((endpoint, request.method), EndpointStats())
+            stats.requests += 1
+            stats.errors += response.status_code >= 500
+            stats.slow += slow
+            stats.seconds += seconds
+            stats.max_seconds = max(stats.max_seconds, seconds)
+            stats.queries += current['queries']
+            stats.sql_seconds += current['sql_seconds']
+            stats.template_seconds += current['template_seconds']
+            stats.response_bytes += size or 0
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    stats.buckets[i] += 1
+
+        record = {
+            'endpoint': endpoint, 'method': request.method, 'path': request.path,
+            'status': response.status_code, 'duration_ms': round(seconds * 1000, 2),
+            'queries': current['queries'], 'sql_ms': round(current['sql_seconds'] * 1000, 2),
+            'template_ms': round(current['template_seconds'] * 1000, 2), 'bytes': size,
+        }
+        if slow:
+            slowest = sorted(current['statements'], key=lambda s: s[0], reverse=True)
+            record['slow'] = True
+            record['statements'] = [{'ms': round(elapsed * 1000, 2), 'sql': statement[:500]}
+                                    for elapsed, statement in slowest]
+            logger.warning(json.dumps(record))
+        else:
+            logger.info(json.dumps(record))
+        return response
+
+    def metrics(self):
+        with self._lock:
+            endpoints = sorted(self._endpoints.items())
+            lines = []
+            for name, kind, help_text, value in (
+                ('requests_total', 'counter', 'Requests handled.', lambda s: s.requests),
+                ('request_errors_total', 'counter', 'Requests that returned a 5xx status.', lambda s: s.errors),
+                ('slow_requests_total', 'counter', 'Requests slower than SLOW_REQUEST_MS.', lambda s: s.slow),
+                ('request_seconds_max', 'gauge', 'Slowest request seen.', lambda s: s.max_seconds),
+                ('sql_queries_total', 'counter', 'SQL statements executed.', lambda s: s.queries),
+                ('sql_seconds_total', 'counter', 'Time spent executing SQL.', lambda s: s.sql_seconds),
+                ('template_seconds_total', 'counter', 'Time spent rendering templates.', lambda s: s.template_seconds),
+                ('response_bytes_total', 'counter', 'Response body bytes (unstreamed responses).',
+                 lambda s: s.response_bytes),
+            ):
+                lines.append(f'# HELP quiz_app_{name} {help_text}')
+                lines.append(f'# TYPE quiz_app_{name} {kind}')
+                for (endpoint, method), stats in endpoints:
+                    lines.append(f'quiz_app_{name}{{endpoint="{endpoint}",method="{method}"}} {value(stats)}')
+
+            lines.append('# HELP quiz_app_request_seconds Request duration.')
+            lines.append('# TYPE quiz_app_request_seconds histogram')
+            for (endpoint, method), stats in endpoints:
+                labels = f'endpoint="{endpoint}",method="{method}"'
+                for bound, count in zip(BUCKETS, stats.buckets):
+                    lines.append(f'quiz_app_request_seconds_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f'quiz_app_request_seconds_bucket{{{labels},le="+Inf"}} {stats.requests}')
+                lines.append(f'quiz_app_request_seconds_sum{{{labels}}} {stats.seconds}')
+                lines.append(f'quiz_app_request_seconds_count{{{labels}}} {stats.requests}')
+        for collector in self._collectors.values():
+            lines.extend(collector())
+        return '\n'.join(lines) + '\n'
+
+    def metrics_view(self):
+        return Response(self.metrics(), mimetype='text/plain; version=0.0.4')
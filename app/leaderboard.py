@@ -0,0 +1,118 @@
+from sqlalchemy import and_, func, insert, select, update
+from app import db
+from app.database import upsert
+from app.models import LeaderboardEntry, QuizResult, ScoreBucket, User
+
+
+# Add to the per-score counters of a quiz set, creating the row on first use
+# (one upsert, so concurrent first attempts cannot both insert it)
+def _count(quiz_set_id, score, attempts=0, students=0):
+    upsert(db.session, ScoreBucket,
+           {'quiz_set_id': quiz_set_id, 'score': score, 'attempts': attempts, 'students': students},
+           {'attempts': ScoreBucket.attempts + attempts, 'students': ScoreBucket.students + students})
+
+
+# Fold a new QuizResult into the leaderboard (same transaction as the result).
+# Only a new personal best moves the student, from one score bucket to another.
+def record(result):
+    quiz_set_id, user_id, score = result.quiz_set_id, result.user_id, result.score
+    _count(quiz_set_id, score, attempts=1)
+    # Insert-if-absent: exactly one of two concurrent first attempts creates the entry
+    if upsert(db.session, LeaderboardEntry, {'quiz_set_id': quiz_set_id, 'user_id': user_id,
+                                             'best_score': score, 'achieved_at': result.date_taken}):
+        _count(quiz_set_id, score, students=1)
+        return
+    # Locked until commit, so a concurrent improvement waits and then compares
+    # against this one's score (on SQLite the writes above already hold the lock)
+    best = db.session.execute(
+        select(LeaderboardEntry.best_score)
+        .where(LeaderboardEntry.quiz_set_id == quiz_set_id, LeaderboardEntry.user_id == user_id)
+        .with_for_update()
+    ).scalar()
+    if score > best:
+        db.session.execute(
+            update(LeaderboardEntry)
+            .where(LeaderboardEntry.quiz_set_id == quiz_set_id, LeaderboardEntry.user_id == user_id)
+            .values(best_score=score, achieved_at=result.date_taken)
+            .execution_options(synchronize_session=False)
+        )
+        _count(quiz_set_id, best, students=-1)
+        _count(quiz_set_id, score, students=1)
+
+
+# Top `limit` students, the histogram and, given `user_id`, that student's
+# rank and percentile. Ranks come from the per-score counters (one row per
+# distinct score), so no query grows with the number of attempts.
+def standings(quiz_set_id, user_id=None, limit=10):
+    buckets = db.session.execute(
+        select(ScoreBucket.score, ScoreBucket.attempts, ScoreBucket.students)
+        .where(ScoreBucket.quiz_set_id == quiz_set_id)
+        .order_by(ScoreBucket.score.desc())
+    ).all()
+    # Students with a strictly higher best score than each score
+    above = {}
+    students = 0
+    for score, _, count in buckets:
+        above[score] = students
+        students += count
+
+    def ranked(best_score):
+        return {
+            'rank': above.get(best_score, 0) + 1,
+            'percentile': round(100 * (students - above.get(best_score, 0)) / students, 1) if students else None,
+        }
+
+    top = db.session.execute(
+        select(LeaderboardEntry.user_id, User.username, LeaderboardEntry.best_score, LeaderboardEntry.achieved_at)
+        .join(User, User.id == LeaderboardEntry.user_id)
+        .where(LeaderboardEntry.quiz_set_id == quiz_set_id)
+        .order_by(LeaderboardEntry.best_score.desc(), LeaderboardEntry.achieved_at)
+        .limit(limit)
+    ).all()
+    mine = db.session.get(LeaderboardEntry, (quiz_set_id, user_id)) if user_id is not None else None
+    return {
+        'quiz_set_id': quiz_set_id,
+        'students': students,
+        'attempts': sum(attempts for _, attempts, _ in buckets),
+        'top': [dict(ranked(best_score), user_id=entry_user_id, username=username, best_score=best_score,
+                     achieved_at=achieved_at.isoformat() if achieved_at else None)
+                for entry_user_id, username, best_score, achieved_at in top],
+        'me': dict(ranked(mine.best_score), best_score=mine.best_score) if mine else None,
+        'histogram': [{'score': score, 'attempts': attempts, 'students': count}
+                      for score, attempts, count in reversed(buckets)],
+    }
+
+
+# Recompute both leaderboard tables from quiz_result (the caller commits)
+def rebuild():
+    db.session.execute(LeaderboardEntry.__table__.delete())
+    db.session.execute(ScoreBucket.__table__.delete())
+    best = (
+        select(QuizResult.quiz_set_id, QuizResult.user_id, func.max(QuizResult.score).label('best_score'))
+        .group_by(QuizResult.quiz_set_id, QuizResult.user_id)
+        .subquery()
+    )
+    db.session.execute(
+        insert(LeaderboardEntry).from_select(
+            ['quiz_set_id', 'user_id', 'best_score', 'achieved_at'],
+            select(best.c.quiz_set_id, best.c.user_id, best.c.best_score, func.min(QuizResult.date_taken))
+            .join(QuizResult, and_(QuizResult.quiz_set_id == best.c.quiz_set_id,
+                                   QuizResult.user_id == best.c.user_id,
+                                   QuizResult.score == best.c.best_score))
+            .group_by(best.c.quiz_set_id, best.c.user_id, best.c.best_score),
+        )
+    )
+    students = (
+        select(func.count())
+        .where(LeaderboardEntry.quiz_set_id == QuizResult.quiz_set_id,
+               LeaderboardEntry.best_score == QuizResult.score)
+        .correlate(QuizResult)
+        .scalar_subquery()
+    )
+    db.session.execute(
+        insert(ScoreBucket).from_select(
+            ['quiz_set_id', 'score', 'attempts', 'students'],
+            select(QuizResult.quiz_set_id, QuizResult.score, func.count(QuizResult.id), students)
+            .group_by(QuizResult.quiz_set_id, QuizResult.score),
+        )
+    )
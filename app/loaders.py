@@ -0,0 +1,24 @@
+from sqlalchemy.orm import joinedload, selectinload
+from app.models import QuizResult, QuizSet, User
+
+# Named eager-loading strategies so each view loads the relationships it
+# renders in a fixed number of queries, however many results there are
+PROFILES = {
+    # Student dashboard: each result with its quiz set title and size
+    'dashboard': (
+        joinedload(QuizResult.quiz_set).load_only(QuizSet.id, QuizSet.title, QuizSet.question_count),
+    ),
+    # Admin review of a single student: same shape as the dashboard
+    'review': (
+        joinedload(QuizResult.quiz_set).load_only(QuizSet.id, QuizSet.title, QuizSet.question_count),
+    ),
+    # Admin feedback list: results across many students, few distinct users
+    'feedback': (
+        selectinload(QuizResult.user).load_only(User.id, User.username),
+        joinedload(QuizResult.quiz_set).load_only(QuizSet.id, QuizSet.title, QuizSet.question_count),
+    ),
+}
+
+
+def profile(name):
+    return PROFILES[name]
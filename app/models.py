@@ -1,53 +1,294 @@
 from app import db
 from flask_login import UserMixin
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
+from struct import pack, unpack
+from sqlalchemy import func, update
 
 
 class User(db.Model, UserMixin):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(64), unique=True, nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
-    password_hash = db.Column(db.String(128), nullable=False)
-    role = db.Column(db.String(64), nullable=False)
+    password_hash = db.Column(db.String(256), nullable=False)
+    role = db.Column(db.String(64), nullable=False, index=True)
     questions = db.relationship('Question', backref='author', lazy=True)
     quiz_results = db.relationship('QuizResult', backref='user', lazy=True)
 
+    # Case-insensitive login lookups (see find_by_email); also keeps addresses
+    # that differ only in case from registering twice
+    __table_args__ = (db.Index('ix_user_email_lower', func.lower(email), unique=True),)
+
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        from app import password_hasher
+        self.password_hash = password_hasher.hash(password)
 
+    # On success, also re-hashes with the current parameters when they have
+    # changed since the hash was stored; the caller commits
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        from app import password_hasher
+        if not password_hasher.verify(self.password_hash, password):
+            return False
+        if password_hasher.needs_rehash(self.password_hash):
+            self.set_password(password)
+        return True
+
+    @classmethod
+    def find_by_email(cls, email):
+        return cls.query.filter(func.lower(cls.email) == email.strip().lower()).first()
 
 
 class Question(db.Model):
+    # Dense 0-based position within the quiz set, so a random sample can be
+    # drawn as positions and fetched through this index (see app/sampling.py)
+    __table_args__ = (
+        db.Index('ix_question_quiz_set_id_position', 'quiz_set_id', 'position', unique=True),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     text = db.Column(db.String(256), nullable=False)
-    options = db.Column(db.String(256), nullable=False)
-    correct_option = db.Column(db.String(64), nullable=False)
     quiz_set_id = db.Column(db.Integer, db.ForeignKey('quiz_set.id'), nullable=False)
+    position = db.Column(db.Integer, nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    # MinHash signature of the normalized text and options (app/duplicates.py);
+    # deferred, as only duplicate detection reads it
+    minhash = db.deferred(db.Column(db.LargeBinary))
     feedbacks = db.relationship('Feedback', backref='question', lazy=True)
+    options = db.relationship('Option', backref='question', lazy=True,
+                              order_by='Option.position', cascade='all, delete-orphan')
+
+    def set_options(self, options, correct_option):
+        self.options = [Option(**row) for row in option_rows(options, correct_option)]
+
+
+class Option(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    question_id = db.Column(db.Integer, db.ForeignKey('question.id'), nullable=False, index=True)
+    position = db.Column(db.Integer, nullable=False)
+    text = db.Column(db.String(256), nullable=False)
+    is_correct = db.Column(db.Boolean, nullable=False, default=False)
+
+
+# Option column values for a question; exactly one option is marked correct
+def option_rows(options, correct_option):
+    if not isinstance(options, (list, tuple)):
+        raise ValueError('options must be a list')
+    options = [str(option).strip() for option in options if str(option).strip()]
+    correct_option = str(correct_option or '').strip()
+    if len(options) < 2:
+        raise ValueError('at least two options are required')
+    if any(len(option) > 256 for option in options):
+        raise ValueError('options are limited to 256 characters')
+    if correct_option not in options:
+        raise ValueError('correct_option must be one of the options')
+    correct_position = options.index(correct_option)
+    return [{'position': position, 'text': option, 'is_correct': position == correct_position}
+            for position, option in enumerate(options)]
 
 
 class QuizSet(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(128), nullable=False)
+    question_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    content_version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    # Questions drawn per attempt (None: all of them), optionally one per
+    # equal slice of the bank instead of uniformly
+    sample_size = db.Column(db.Integer)
+    sample_stratified = db.Column(db.Boolean, nullable=False, default=False, server_default='0')
     questions = db.relationship('Question', backref='quiz_set', lazy=True)
     quiz_results = db.relationship('QuizResult', backref='related_quiz_set', lazy=True)  # Renamed backref
 
+    # Bump content_version after an edit that leaves question_count alone
+    # (e.g. new translations), so cached copies of the quiz are no longer used
+    @staticmethod
+    def record_content_changed(quiz_set_id):
+        db.session.execute(
+            update(QuizSet)
+            .where(QuizSet.id == quiz_set_id)
+            .values(content_version=QuizSet.content_version + 1)
+            .execution_options(synchronize_session=False)
+        )
+
+    # Keep question_count in step with questions added to a quiz set and
+    # bump content_version so cached copies of the quiz are no longer used.
+    # Returns the first of the `count` positions reserved for the new questions.
+    @staticmethod
+    def record_questions_added(quiz_set_id, count=1):
+        question_count = db.session.execute(
+            update(QuizSet)
+            .where(QuizSet.id == quiz_set_id)
+            .values(question_count=QuizSet.question_count + count,
+                    content_version=QuizSet.content_version + 1)
+            .returning(QuizSet.question_count)
+            .execution_options(synchronize_session=False)
+        ).scalar()
+        if question_count is None:
+            raise ValueError(f'quiz set {quiz_set_id} does not exist')
+        return question_count - count
+
+
+# Translated content, one row per (item, locale). Anything without a row for
+# the requested locale falls back to the text on the item itself.
+class QuizSetTranslation(db.Model):
+    quiz_set_id = db.Column(db.Integer, db.ForeignKey('quiz_set.id'), primary_key=True, autoincrement=False)
+    locale = db.Column(db.String(16), primary_key=True)
+    title = db.Column(db.String(128), nullable=False)
+
+
+class QuestionTranslation(db.Model):
+    question_id = db.Column(db.Integer, db.ForeignKey('question.id'), primary_key=True, autoincrement=False)
+    locale = db.Column(db.String(16), primary_key=True)
+    text = db.Column(db.String(256), nullable=False)
+
+
+class OptionTranslation(db.Model):
+    option_id = db.Column(db.Integer, db.ForeignKey('option.id'), primary_key=True, autoincrement=False)
+    locale = db.Column(db.String(16), primary_key=True)
+    text = db.Column(db.String(256), nullable=False)
+
 
 class QuizResult(db.Model):
+    # quiz_set_id lookups use the leading column of the (quiz_set_id, score) index
+    __table_args__ = (
+        db.Index('ix_quiz_result_user_id_date_taken', 'user_id', 'date_taken'),
+        db.Index('ix_quiz_result_quiz_set_id_score', 'quiz_set_id', 'score'),
+        db.UniqueConstraint('submission_id', name='uq_quiz_result_submission_id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
     quiz_set_id = db.Column(db.Integer, db.ForeignKey('quiz_set.id'), nullable=False)
     score = db.Column(db.Integer, nullable=False)
     date_taken = db.Column(db.DateTime, default=datetime.utcnow)
+    submission_id = db.Column(db.String(32))  # Set for results written from the submission journal
+    question_ids = db.Column(db.JSON)  # Questions drawn for a sampled attempt (None: the whole set)
+    question_count = db.Column(db.Integer)  # Questions in the attempt
     quiz_set = db.relationship('QuizSet', backref='results')  # Keep this backref
 
 
+# The answers of one attempt, packed into two parallel little-endian int32
+# arrays (question ids and chosen option ids, 0 = unanswered): one row per
+# attempt instead of one per answer. Read back with numpy in app/analytics.py.
+# `analysed` is set once the sheet has been folded into the item statistics.
+class AnswerSheet(db.Model):
+    __table_args__ = (
+        db.Index('ix_answer_sheet_quiz_set_id_analysed', 'quiz_set_id', 'analysed', 'result_id'),
+    )
+
+    result_id = db.Column(db.Integer, db.ForeignKey('quiz_result.id'), primary_key=True, autoincrement=False)
+    quiz_set_id = db.Column(db.Integer, db.ForeignKey('quiz_set.id'), nullable=False)
+    question_ids = db.Column(db.LargeBinary, nullable=False)
+    option_ids = db.Column(db.LargeBinary, nullable=False)
+    analysed = db.Column(db.Boolean, nullable=False, default=False, server_default='0')
+    result = db.relationship('QuizResult', backref=db.backref('answer_sheet', uselist=False, lazy=True))
+
+    # `answers` is a list of (question_id, option_id or None) pairs
+    @classmethod
+    def from_answers(cls, result, answers):
+        question_ids = [question_id for question_id, _ in answers]
+        option_ids = [option_id or 0 for _, option_id in answers]
+        return cls(result=result, quiz_set_id=result.quiz_set_id,
+                   question_ids=pack(f'<{len(question_ids)}i', *question_ids),
+                   option_ids=pack(f'<{len(option_ids)}i', *option_ids))
+
+    @property
+    def answers(self):
+        count = len(self.question_ids) // 4
+        return list(zip(unpack(f'<{count}i', self.question_ids), unpack(f'<{count}i', self.option_ids)))
+
+
 class Feedback(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    question_id = db.Column(db.Integer, db.ForeignKey('question.id'), nullable=False)
+    question_id = db.Column(db.Integer, db.ForeignKey('question.id'), nullable=False, index=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     comment = db.Column(db.String(256), nullable=False)
+
+
+# LSH buckets of each question's MinHash signature, one row per band, scoped
+# to the question's quiz set. Questions sharing a bucket are candidate
+# near-duplicates (see app/duplicates.py).
+class QuestionBucket(db.Model):
+    # The primary key is the only lookup path, so on SQLite it is the table
+    __table_args__ = {'sqlite_with_rowid': False}
+
+    quiz_set_id = db.Column(db.Integer, db.ForeignKey('quiz_set.id'), primary_key=True, autoincrement=False)
+    bucket = db.Column(db.BigInteger, primary_key=True, autoincrement=False)
+    question_id = db.Column(db.Integer, db.ForeignKey('question.id'), primary_key=True, autoincrement=False)
+
+
+# Summary tables kept up to date on every quiz submission (see app/stats.py)
+class StudentStats(db.Model):
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    total_score = db.Column(db.Integer, nullable=False, default=0)
+    last_attempt = db.Column(db.DateTime)
+    user = db.relationship('User', backref=db.backref('stats', uselist=False, lazy=True))
+
+    @property
+    def average_score(self):
+        return self.total_score / self.attempts if self.attempts else 0
+
+
+class QuizSetStats(db.Model):
+    quiz_set_id = db.Column(db.Integer, db.ForeignKey('quiz_set.id'), primary_key=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    total_score = db.Column(db.Integer, nullable=False, default=0)
+    last_attempt = db.Column(db.DateTime)
+    quiz_set = db.relationship('QuizSet', backref=db.backref('stats', uselist=False, lazy=True))
+
+    @property
+    def average_score(self):
+        return self.total_score / self.attempts if self.attempts else 0
+
+
+# Leaderboard summary (see app/leaderboard.py): each student's best score per
+# quiz set, plus per-score counts that turn rank lookups into a short sum
+class LeaderboardEntry(db.Model):
+    quiz_set_id = db.Column(db.Integer, db.ForeignKey('quiz_set.id'), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    best_score = db.Column(db.Integer, nullable=False)
+    achieved_at = db.Column(db.DateTime)
+    user = db.relationship('User')
+
+
+# Matches the top-N ordering: best score first, earliest to reach it first
+db.Index('ix_leaderboard_entry_ranking', LeaderboardEntry.quiz_set_id,
+         LeaderboardEntry.best_score.desc(), LeaderboardEntry.achieved_at)
+
+
+class ScoreBucket(db.Model):
+    quiz_set_id = db.Column(db.Integer, db.ForeignKey('quiz_set.id'), primary_key=True)
+    score = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    attempts = db.Column(db.Integer, nullable=False, default=0)  # attempts that scored this
+    students = db.Column(db.Integer, nullable=False, default=0)  # students whose best score this is
+
+
+# Item analysis (see app/analytics.py). Each row keeps running sums over every
+# analysed response, so new answers are added without rereading old ones;
+# difficulty and discrimination are derived from the sums.
+class ItemStats(db.Model):
+    question_id = db.Column(db.Integer, db.ForeignKey('question.id'), primary_key=True, autoincrement=False)
+    quiz_set_id = db.Column(db.Integer, db.ForeignKey('quiz_set.id'), nullable=False, index=True)
+    responses = db.Column(db.Integer, nullable=False, default=0)
+    skipped = db.Column(db.Integer, nullable=False, default=0)
+    correct = db.Column(db.Integer, nullable=False, default=0)
+    rest_sum = db.Column(db.BigInteger, nullable=False, default=0)  # score on the other questions
+    rest_squares = db.Column(db.BigInteger, nullable=False, default=0)
+    correct_rest_sum = db.Column(db.BigInteger, nullable=False, default=0)
+    difficulty = db.Column(db.Float)  # share of responses that were correct
+    discrimination = db.Column(db.Float)  # point-biserial correlation with the rest score
+    question = db.relationship('Question')
+
+
+class OptionStats(db.Model):
+    option_id = db.Column(db.Integer, db.ForeignKey('option.id'), primary_key=True, autoincrement=False)
+    question_id = db.Column(db.Integer, db.ForeignKey('question.id'), nullable=False, index=True)
+    picks = db.Column(db.Integer, nullable=False, default=0)
+
+
+# Item analysis state for a quiz set: how many answer sheets have been folded
+# in and when. Analysers lock this row, so one quiz set is analysed by one
+# process at a time.
+class ItemAnalysis(db.Model):
+    quiz_set_id = db.Column(db.Integer, db.ForeignKey('quiz_set.id'), primary_key=True, autoincrement=False)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    analysed_at = db.Column(db.DateTime)
@@ -0,0 +1,22 @@
+# Keyset (cursor) pagination: newest rows first, continuing below the last
+# id seen, so deep pages cost the same as the first one
+class KeysetPage:
+    def __init__(self, items, next_cursor, cursor):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.cursor = cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+def keyset_paginate(query, column, before=None, per_page=50):
+    if before is not None:
+        query = query.filter(column < before)
+    items = query.order_by(column.desc()).limit(per_page + 1).all()
+    next_cursor = None
+    if len(items) > per_page:
+        items = items[:per_page]
+        next_cursor = getattr(items[-1], column.key)
+    return KeysetPage(items, next_cursor, before)
@@ -0,0 +1,52 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+# Raised when too many hashes are already queued; callers answer 503
+class HasherBusy(Exception):
+    pass
+
+
+# Password hashing on a small, bounded worker pool. The hash functions release
+# the GIL, so a burst of logins uses at most PASSWORD_HASH_WORKERS cores and
+# request threads serving quizzes keep running. Once PASSWORD_HASH_QUEUE hashes
+# are waiting, further attempts fail fast instead of piling up.
+class PasswordHasher:
+    def __init__(self, app=None):
+        self.method = 'scrypt:32768:8:1'
+        self.salt_length = 16
+        self._pool = None
+        self._slots = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.method = app.config['PASSWORD_HASH_METHOD']
+        self.salt_length = app.config['PASSWORD_SALT_LENGTH']
+        workers = app.config['PASSWORD_HASH_WORKERS']
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+        self._slots = threading.BoundedSemaphore(workers + app.config['PASSWORD_HASH_QUEUE'])
+        app.extensions['password_hasher'] = self
+
+    def _run(self, function, *args):
+        if self._pool is None:
+            return function(*args)
+        if not self._slots.acquire(blocking=False):
+            raise HasherBusy()
+        try:
+            return self._pool.submit(function, *args).result()
+        finally:
+            self._slots.release()
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method, self.salt_length)
+
+    def verify(self, password_hash, password):
+        return self._run(check_password_hash, password_hash, password)
+
+    # True when a stored hash was made with other parameters than the configured ones
+    def needs_rehash(self, password_hash):
+        method, _, rest = password_hash.partition('$')
+        salt, _, _ = rest.partition('$')
+        return method != self.method or len(salt) != self.salt_length
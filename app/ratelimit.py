@@ -0,0 +1,78 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+
+
+# Classic token bucket: holds up to `capacity` tokens, refilled at `rate` per second
+class TokenBucket:
+    __slots__ = ('tokens', 'updated')
+
+    def __init__(self, capacity, now):
+        self.tokens = capacity
+        self.updated = now
+
+    def take(self, capacity, rate, now, consume=True):
+        self.tokens = min(capacity, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+        if self.tokens >= 1:
+            if consume:
+                self.tokens -= 1
+            return 0
+        # Seconds until the next token is available
+        return math.ceil((1 - self.tokens) / rate)
+
+
+# In-memory token buckets keyed by (scope, key), e.g. ('ip', '10.0.0.1').
+# Buckets live in an LRU of `max_keys` entries so a flood of distinct keys
+# cannot grow memory without bound. Limits are per process.
+class RateLimiter:
+    def __init__(self, app=None):
+        self.enabled = False
+        self.limits = {}
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config['LOGIN_RATE_LIMIT']
+        self.max_keys = app.config['LOGIN_RATE_LIMIT_KEYS']
+        # scope: (burst, tokens per second)
+        self.limits = {
+            'ip': (app.config['LOGIN_IP_BURST'], app.config['LOGIN_IP_PER_MINUTE'] / 60),
+            'account': (app.config['LOGIN_ACCOUNT_BURST'], app.config['LOGIN_ACCOUNT_PER_MINUTE'] / 60),
+        }
+        app.extensions['rate_limiter'] = self
+
+    # Take one token from every given bucket. Returns 0 when allowed, otherwise
+    # the number of seconds to wait (for a Retry-After header).
+    def hit(self, **keys):
+        return self._take(keys, consume=True)
+
+    # Like hit(), but only checks: no token is taken
+    def wait(self, **keys):
+        return self._take(keys, consume=False)
+
+    def _take(self, keys, consume):
+        if not self.enabled:
+            return 0
+        now = time.monotonic()
+        wait = 0
+        with self._lock:
+            for scope, key in keys.items():
+                capacity, rate = self.limits[scope]
+                bucket = self._buckets.get((scope, key))
+                if bucket is None:
+                    bucket = self._buckets[(scope, key)] = TokenBucket(capacity, now)
+                    while len(self._buckets) > self.max_keys:
+                        self._buckets.popitem(last=False)
+                else:
+                    self._buckets.move_to_end((scope, key))
+                wait = max(wait, bucket.take(capacity, rate, now, consume))
+        return wait
+
+    def reset(self, **keys):
+        with self._lock:
+            for scope, key in keys.items():
+                self._buckets.pop((scope, key), None)
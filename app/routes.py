@@ -1,31 +1,54 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
+from datetime import datetime, timedelta
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, Response, abort, \
+    make_response, session, stream_with_context
 from flask_login import login_user, current_user, logout_user, login_required
-from app import db
-from app.models import User, Question, QuizResult, QuizSet, Feedback
-from app.forms import RegistrationForm, LoginForm
-from flask_restful import Api, Resource
+from flask_babel import get_locale
+from sqlalchemy.exc import IntegrityError
+from app import db, fragment_cache, identity_cache, quiz_cache, rate_limiter, submission_queue
+from app.cache import cacheable, catalog_version, invalidate_content, listing_etag, not_modified
+from app.passwords import HasherBusy
+from app.models import User, Question, QuizResult, QuizSet, Feedback, StudentStats
+from app import export, grading, i18n, leaderboard, loaders, sampling, search, stats, submissions
+from app.pagination import keyset_paginate
 
-# Blueprint for main routes and API routes
+# Blueprint for the pages; the JSON API lives in app/api.py. Forms and the
+# numpy-backed modules (analytics, duplicates) are imported in the views that
+# use them, so a lazily started worker only loads them on first use.
 main_bp = Blueprint('main', __name__)
-api_bp = Blueprint('api', __name__)
-api = Api(api_bp)
 
 # Home page route
 @main_bp.route("/")
 def index():
-    return render_template('index.html')
+    # Anonymous visitors all get the same page, so shared caches may keep it
+    etag = listing_etag('index', '', str(get_locale()))
+    if not_modified(etag):
+        return cacheable(Response(status=304), etag)
+    shared = not current_user.is_authenticated and '_flashes' not in session
+    response = make_response(render_template('index.html'))
+    return cacheable(response, etag, public=shared, max_age=60)
 
 # Registration route
 @main_bp.route("/register", methods=['GET', 'POST'])
 def register():
+    from app.forms import RegistrationForm
     form = RegistrationForm()
     if form.validate_on_submit():
         # Create new user and add to the database
-        user = User(username=form.username.data, email=form.email.data)
-        user.set_password(form.password.data)
+        user = User(username=form.username.data, email=form.email.data.strip().lower())
+        try:
+            user.set_password(form.password.data)
+        except HasherBusy:
+            flash('The server is busy. Please try again in a moment.', 'warning')
+            return render_template('register.html', form=form), 503
         user.role = form.role.data
         db.session.add(user)
-        db.session.commit()
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Registered by a concurrent request since the form was validated
+            db.session.rollback()
+            flash('An account with that username or email already exists.', 'danger')
+            return render_template('register.html', form=form)
         flash('Account created successfully!', 'success')
         return redirect(url_for('main.login'))
     return render_template('register.html', form=form)
@@ -33,17 +56,34 @@ def register():
 # Login route
 @main_bp.route("/login", methods=['GET', 'POST'])
 def login():
+    from app.forms import LoginForm
     form = LoginForm()
     if form.validate_on_submit():
-        user = User.query.filter_by(email=form.email.data).first()
-        if user and user.check_password(form.password.data):
+        email = form.email.data.strip().lower()
+        # Every attempt counts against the account; only failures count
+        # against the address, so a class behind one NAT can all log in
+        retry_after = max(rate_limiter.wait(ip=request.remote_addr), rate_limiter.hit(account=email))
+        if retry_after:
+            flash('Too many login attempts. Please try again later.', 'danger')
+            return render_template('login.html', form=form), 429, {'Retry-After': str(retry_after)}
+        user = User.find_by_email(email)
+        try:
+            valid = user is not None and user.check_password(form.password.data)
+        except HasherBusy:
+            flash('The server is busy. Please try again in a moment.', 'warning')
+            return render_template('login.html', form=form), 503, {'Retry-After': '1'}
+        if valid:
+            db.session.commit()  # saves a re-hashed password, if any
+            rate_limiter.reset(account=email)
             login_user(user, remember=form.remember.data)
+            identity_cache.remember(user)
             # Redirect based on user role
             if user.role == 'admin':
                 return redirect(url_for('main.admin_dashboard'))
             else:
                 return redirect(url_for('main.student_dashboard'))
         else:
+            rate_limiter.hit(ip=request.remote_addr)
             flash('Login unsuccessful. Please check email and password.', 'danger')
     return render_template('login.html', form=form)
 
@@ -52,16 +92,20 @@ def login():
 @login_required
 def student_dashboard():
     # Get user's quiz results and calculate total score
-    user_results = QuizResult.query.filter_by(user_id=current_user.id).all()
-    total_questions = sum(len(result.quiz_set.questions) for result in user_results)
+    user_results = QuizResult.query.options(*loaders.profile('dashboard')) \
+        .filter_by(user_id=current_user.id).all()
+    total_questions = sum(result.question_count or result.quiz_set.question_count for result in user_results)
     total_score = sum(result.score for result in user_results)
-    quiz_sets = QuizSet.query.all()  # Get all quiz sets
+    # Quiz set list is the same for every student; render it from the fragment cache
+    quiz_sets = fragment_cache.render(
+        'quiz_set_list', '_quiz_set_list.html', catalog_version(), str(get_locale()),
+        lambda: {'quiz_sets': i18n.quiz_set_titles(i18n.content_locale())})
     return render_template(
         'student_dashboard.html', 
         total_questions=total_questions, 
         total_score=total_score, 
         results=user_results,
-        quiz_sets=quiz_sets  # Pass quiz sets to template
+        quiz_sets=quiz_sets  # Pass rendered quiz set list to template
     )
 
 # Admin dashboard route
@@ -70,30 +114,66 @@ def student_dashboard():
 def admin_dashboard():
     if current_user.role != 'admin':
         return redirect(url_for('main.login'))
-    # Get all students and their quiz result count
-    students = User.query.filter_by(role='student').all()
-    for student in students:
-        student.completed_quizzes_count = QuizResult.query.filter_by(user_id=student.id).count()
-    return render_template('admin_dashboard.html', students=students)
+    # Get one page of students together with their summary stats
+    page = request.args.get('page', 1, type=int)
+    students = db.session.query(User, StudentStats) \
+        .outerjoin(StudentStats, StudentStats.user_id == User.id) \
+        .filter(User.role == 'student') \
+        .order_by(User.username) \
+        .paginate(page=page, per_page=50, error_out=False)
+    total_quizzes, average_score = stats.overview()
+    quiz_sets = QuizSet.query.order_by(QuizSet.id).all()
+    return render_template('admin_dashboard.html', students=students, quiz_sets=quiz_sets,
+                           total_quizzes=total_quizzes, average_score=average_score)
 
 # Quiz-taking route
 @main_bp.route("/quiz/<int:quiz_id>", methods=['GET', 'POST'])
 @login_required
 def quiz(quiz_id):
     quiz = QuizSet.query.get_or_404(quiz_id)
+    locale = i18n.content_locale()
     if request.method == 'POST':
-        score = 0
-        total = len(quiz.questions)
-        for question in quiz.questions:
-            selected_option = request.form.get(f'question_{question.id}')
-            if selected_option == question.correct_option:
-                score += 1
+        if quiz.sample_size:
+            # Grade only the questions drawn for this attempt
+            question_ids = sampling.read_attempt_token(request.form.get('attempt'), quiz.id)
+            if question_ids is None:
+                flash('This quiz attempt has expired. Please start again.', 'warning')
+                return redirect(url_for('main.quiz', quiz_id=quiz.id))
+            answer_key = sampling.sample_payload(question_ids)['answer_key']
+        else:
+            question_ids = None
+            answer_key = quiz_cache.get_quiz(quiz, locale)['answer_key']
+        total = len(answer_key)
+        answers = grading.read_answers(request.form, answer_key)
+        score = grading.grade(answer_key, answers)
+        submission = {'user_id': current_user.id, 'quiz_set_id': quiz.id, 'score': score,
+                      'date_taken': datetime.utcnow().isoformat(),
+                      'question_ids': question_ids, 'question_count': total,
+                      'answers': list(answers.items())}
+        if submission_queue.enabled:
+            # Journal the graded result; the background worker saves it
+            submission_id = submission_queue.submit(submission)
+            if request.accept_mimetypes.best == 'application/json':
+                return jsonify({
+                    'submission_id': submission_id, 'score': score, 'total': total,
+                    'status': submissions.PENDING,
+                    'status_url': url_for('api.submission_status', submission_id=submission_id)
+                }), 202
+            return redirect(url_for('main.results', score=score, total=total, quiz=quiz.id,
+                                    submission=submission_id))
         # Save quiz result
-        result = QuizResult(user_id=current_user.id, quiz_set_id=quiz.id, score=score)
-        db.session.add(result)
+        submissions.save_result(submission)
         db.session.commit()
-        return redirect(url_for('main.results', score=score, total=total))
-    return render_template('quiz.html', quiz=quiz)
+        return redirect(url_for('main.results', score=score, total=total, quiz=quiz.id))
+    if quiz.sample_size:
+        question_ids = sampling.draw(quiz)
+        questions = sampling.sample_payload(question_ids, locale)['questions']
+        title = i18n.quiz_set_title(quiz, locale)
+        attempt = sampling.attempt_token(quiz.id, question_ids)
+    else:
+        payload = quiz_cache.get_quiz(quiz, locale)
+        questions, title, attempt = payload['questions'], payload['title'], None
+    return render_template('quiz.html', quiz=quiz, title=title, questions=questions, attempt=attempt)
 
 # Display quiz results
 @main_bp.route("/results")
@@ -101,23 +181,50 @@ def quiz(quiz_id):
 def results():
     score = request.args.get('score', type=int)
     total = request.args.get('total', type=int)
-    return render_template('results.html', score=score, total=total)
+    submission_id = request.args.get('submission')
+    return render_template('results.html', score=score, total=total, submission_id=submission_id,
+                           quiz_id=request.args.get('quiz', type=int))
+
+# Leaderboard for one quiz set, with the current student's own rank
+@main_bp.route("/quiz/<int:quiz_id>/leaderboard")
+@login_required
+def quiz_leaderboard(quiz_id):
+    quiz = QuizSet.query.get_or_404(quiz_id)
+    limit = min(request.args.get('limit', 10, type=int), 100)
+    board = leaderboard.standings(quiz.id, user_id=current_user.id, limit=max(limit, 1))
+    return render_template('leaderboard.html', quiz=quiz, board=board)
 
 # Add new question (Admin only)
 @main_bp.route('/admin/add_question', methods=['GET', 'POST'])
 @login_required
 def add_question():
+    from app import duplicates
     quiz_sets = QuizSet.query.all()
     if request.method == 'POST':
         # Get question details from form
         text = request.form['text']
-        options = request.form['options']
+        options = request.form['options'].splitlines()
         correct_option = request.form['correct_option']
-        quiz_set_id = request.form['quiz_set_id']
+        quiz_set_id = int(request.form['quiz_set_id'])
         # Add new question to database
-        question = Question(text=text, options=options, correct_option=correct_option, quiz_set_id=quiz_set_id, user_id=current_user.id)
+        question = Question(text=text, quiz_set_id=quiz_set_id, user_id=current_user.id)
+        try:
+            question.set_options(options, correct_option)
+            similar = duplicates.check(question)
+            if similar and 'allow_duplicate' not in request.form:
+                flash('Similar questions already exist in this quiz set.', 'warning')
+                return render_template('add_question.html', quiz_sets=quiz_sets, similar=similar)
+            question.position = QuizSet.record_questions_added(quiz_set_id)
+        except ValueError as e:
+            db.session.rollback()
+            flash(f'Question not added: {e}.', 'danger')
+            return render_template('add_question.html', quiz_sets=quiz_sets)
         db.session.add(question)
+        db.session.flush()
+        search.index_questions([question.id])
+        duplicates.index_question(question)
         db.session.commit()
+        invalidate_content(quiz_set_id)
         return redirect(url_for('main.admin_dashboard'))
     return render_template('add_question.html', quiz_sets=quiz_sets)
 
@@ -128,9 +235,12 @@ def add_quiz_set():
     if request.method == 'POST':
         # Add new quiz set to database
         title = request.form['title']
-        quiz_set = QuizSet(title=title)
+        sample_size = request.form.get('sample_size', type=int)
+        quiz_set = QuizSet(title=title, sample_size=sample_size if sample_size and sample_size > 0 else None,
+                           sample_stratified='sample_stratified' in request.form)
         db.session.add(quiz_set)
         db.session.commit()
+        invalidate_content(quiz_set.id)
         return redirect(url_for('main.add_question'))
     return render_template('add_quiz_set.html')
 
@@ -138,8 +248,14 @@ def add_quiz_set():
 @main_bp.route("/available_tests")
 @login_required
 def available_tests():
-    quizzes = QuizSet.query.all()
-    return render_template('available_tests.html', quizzes=quizzes)
+    version, locale = catalog_version(), str(get_locale())
+    etag = listing_etag('available_tests', version, locale)
+    if not_modified(etag):
+        return cacheable(Response(status=304), etag)
+    quizzes = fragment_cache.render(
+        'quiz_set_links', '_quiz_set_links.html', version, locale,
+        lambda: {'quizzes': i18n.quiz_set_titles(i18n.content_locale())})
+    return cacheable(make_response(render_template('available_tests.html', quizzes=quizzes)), etag)
 
 # View feedback for admins
 @main_bp.route('/admin/view_feedback')
@@ -147,8 +263,70 @@ def available_tests():
 def view_feedback():
     if current_user.role != 'admin':
         return redirect(url_for('main.login'))
-    feedbacks = QuizResult.query.all()  # Get all feedbacks
-    return render_template('view_feedback.html', feedbacks=feedbacks)
+    # Get one page of results, newest first
+    feedbacks = keyset_paginate(QuizResult.query.options(*loaders.profile('feedback')),
+                                QuizResult.id, before=request.args.get('before', type=int))
+    quiz_sets = QuizSet.query.order_by(QuizSet.title).all()
+    return render_template('view_feedback.html', feedbacks=feedbacks, quiz_sets=quiz_sets)
+
+# Stream quiz results as CSV or NDJSON (Admin only)
+@main_bp.route('/admin/results/export')
+@login_required
+def export_results():
+    if current_user.role != 'admin':
+        return redirect(url_for('main.login'))
+    fmt = request.args.get('format', 'csv')
+    if fmt not in export.FORMATS:
+        abort(400)
+    # Filter by quiz set and by an inclusive YYYY-MM-DD date range
+    try:
+        start = request.args.get('start')
+        start = datetime.strptime(start, '%Y-%m-%d') if start else None
+        end = request.args.get('end')
+        end = datetime.strptime(end, '%Y-%m-%d') + timedelta(days=1) if end else None
+    except ValueError:
+        abort(400)
+    rows = export.result_rows(quiz_set_id=request.args.get('quiz_set_id', type=int), start=start, end=end)
+    serialize, mimetype = export.FORMATS[fmt]
+    response = Response(stream_with_context(serialize(rows)), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename=quiz_results.{fmt}'
+    return response
+
+# Item analysis for a quiz set: difficulty, discrimination and distractors (Admin only)
+@main_bp.route('/admin/quiz/<int:quiz_id>/analysis')
+@login_required
+def quiz_analysis(quiz_id):
+    from app import analytics
+    if current_user.role != 'admin':
+        return redirect(url_for('main.login'))
+    quiz = QuizSet.query.get_or_404(quiz_id)
+    order = request.args.get('order', 'difficulty')
+    if order not in analytics.ORDERINGS:
+        abort(400)
+    limit = min(max(request.args.get('limit', 50, type=int), 1), 500)
+    return render_template('quiz_analysis.html', quiz=quiz, analysis=analytics.report(quiz.id, order, limit))
+
+# Clusters of near-duplicate questions in a quiz set (Admin only)
+@main_bp.route('/admin/quiz/<int:quiz_id>/duplicates')
+@login_required
+def quiz_duplicates(quiz_id):
+    from app import duplicates
+    if current_user.role != 'admin':
+        return redirect(url_for('main.login'))
+    quiz = QuizSet.query.get_or_404(quiz_id)
+    return render_template('quiz_duplicates.html', quiz=quiz, report=duplicates.clusters(quiz.id))
+
+# Search the question bank (Admin only)
+@main_bp.route('/admin/questions/search')
+@login_required
+def search_questions():
+    if current_user.role != 'admin':
+        return redirect(url_for('main.login'))
+    quiz_set_id = request.args.get('quiz_set_id', type=int)
+    results = search.search(request.args.get('q', ''), quiz_set_id=quiz_set_id,
+                            page=request.args.get('page', 1, type=int))
+    return render_template('question_search.html', results=results, quiz_set_id=quiz_set_id,
+                           quiz_sets=QuizSet.query.order_by(QuizSet.id).all())
 
 # Review a specific student (Admin only)
 @main_bp.route('/admin/review_student/<int:student_id>')
@@ -157,7 +335,9 @@ def review_student(student_id):
     if current_user.role != 'admin':
         return redirect(url_for('main.login'))
     student = User.query.get_or_404(student_id)
-    quiz_results = QuizResult.query.filter_by(user_id=student.id).all()
+    quiz_results = keyset_paginate(
+        QuizResult.query.options(*loaders.profile('review')).filter_by(user_id=student.id),
+        QuizResult.id, before=request.args.get('before', type=int))
     return render_template('review_student.html', student=student, quiz_results=quiz_results)
 
 # Review a specific question (Admin only)
@@ -179,34 +359,5 @@ def review_question(result_id):
 @main_bp.route("/logout")
 def logout():
     logout_user()
+    identity_cache.forget_session()
     return redirect(url_for('main.index'))
-
-# API to get quiz questions
-class QuizQuestionsAPI(Resource):
-    def get(self, quiz_set_id):
-        questions = Question.query.filter_by(quiz_set_id=quiz_set_id).all()
-        return jsonify([{
-            'id': q.id,
-            'text': q.text,
-            'options': q.options.split(','),
-            'correct_option': q.correct_option
-        } for q in questions])
-
-# API to add a new question (Admin only)
-class AddQuestionAPI(Resource):
-    @login_required
-    def post(self):
-        if current_user.role != 'admin':
-            return jsonify({'message': 'Unauthorized'}), 403
-        data = request.get_json()
-        # Add question to the database
-        question = Question(
-            text=data['text'],
-            options=','.join(data['options']),
-            correct_option=data['correct_option'],
-            quiz_set_id=data['quiz_set_id'],
-            user_id=current_user.id
-        )
-        db.session.add(question)
-        db.session.commit()
-        return jsonify({'message': 'Question added successfully'}), 201
@@ -0,0 +1,66 @@
+import random
+from flask import current_app
+from itsdangerous import BadData, URLSafeTimedSerializer
+from sqlalchemy import select
+from app import db
+from app.cache import load_questions
+from app.models import Question
+
+_random = random.SystemRandom()
+
+
+# `size` distinct positions out of range(question_count). Stratified draws
+# take one position from each of `size` equal slices of the bank, so a bank
+# stored topic by topic yields questions from every topic.
+def draw_positions(question_count, size, stratified=False, rng=_random):
+    size = min(size, question_count)
+    if stratified:
+        return [rng.randrange(i * question_count // size, (i + 1) * question_count // size)
+                for i in range(size)]
+    return rng.sample(range(question_count), size)
+
+
+# Draw a sample for one attempt and return the question ids, in random order.
+# Only the drawn rows are read, through the (quiz_set_id, position) index.
+def draw(quiz_set):
+    positions = draw_positions(quiz_set.question_count, quiz_set.sample_size, quiz_set.sample_stratified)
+    question_ids = list(db.session.scalars(
+        select(Question.id).where(Question.quiz_set_id == quiz_set.id, Question.position.in_(positions))
+    ))
+    _random.shuffle(question_ids)
+    return question_ids
+
+
+# Questions and answer key for the drawn ids, in draw order, shaped like the
+# cached full-set payload
+def sample_payload(question_ids, locale=None):
+    by_id = {question['id']: question for question in load_questions(Question.id.in_(question_ids), locale=locale)}
+    questions = [by_id[question_id] for question_id in question_ids if question_id in by_id]
+    return {
+        'questions': questions,
+        'answer_key': {question['id']: question['correct_option_id'] for question in questions},
+    }
+
+
+def _serializer():
+    return URLSafeTimedSerializer(current_app.config['SECRET_KEY'], salt='quiz-attempt')
+
+
+# Signed token carrying the drawn question ids from the quiz page to the
+# submission, so grading reads exactly those rows and the ids cannot be swapped
+def attempt_token(quiz_set_id, question_ids):
+    return _serializer().dumps({'quiz_set_id': quiz_set_id, 'question_ids': question_ids})
+
+
+# Question ids from a token, or None if it is missing, forged, expired or
+# was issued for another quiz set
+def read_attempt_token(token, quiz_set_id):
+    if not token:
+        return None
+    try:
+        data = _serializer().loads(token, max_age=current_app.config['QUIZ_ATTEMPT_MAX_AGE'])
+    except BadData:
+        return None
+    if not isinstance(data, dict) or data.get('quiz_set_id') != quiz_set_id:
+        return None
+    return data['question_ids']
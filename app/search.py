@@ -0,0 +1,170 @@
+import re
+from collections import namedtuple
+from markupsafe import escape
+from sqlalchemy import and_, column, exists, func, insert, literal_column, or_, select, table
+from app import db
+from app.models import Option, Question
+
+# Full-text index over question and option text (SQLite FTS5), one row per
+# question with rowid = question.id. Created by a migration on SQLite and
+# kept current by index_questions() in every write path; on other databases,
+# or before the table exists, search falls back to LIKE filters.
+FTS_TABLE = 'question_fts'
+CREATE_FTS_TABLE = (
+    "CREATE VIRTUAL TABLE question_fts USING fts5("
+    "text, options, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+)
+question_fts = table(FTS_TABLE, column('rowid'), column('text'), column('options'))
+sqlite_master = table('sqlite_master', column('type'), column('name'))
+
+# bm25 column weights: a hit in the question counts more than one in an option
+TEXT_WEIGHT = 2.0
+OPTIONS_WEIGHT = 1.0
+MAX_TERMS = 10
+MAX_PER_PAGE = 100
+
+# Markers highlight() puts around matched terms, swapped for <mark> after escaping
+_START, _END = '\x02', '\x03'
+
+SearchRow = namedtuple('SearchRow', 'id quiz_set_id position highlight score')
+
+# Engines known to have the index. Only a positive answer is kept: the table
+# may be created later (by the migration or `flask search rebuild` in another
+# process), and workers should start using it without a restart.
+_available = set()
+
+
+# Looked up in the session's own transaction, not on a separate connection
+def available():
+    engine = db.engine
+    if engine in _available:
+        return True
+    if engine.dialect.name != 'sqlite' or db.session.execute(
+            select(sqlite_master.c.name)
+            .where(sqlite_master.c.type == 'table', sqlite_master.c.name == FTS_TABLE)).first() is None:
+        return False
+    _available.add(engine)
+    return True
+
+
+# Words of a search box query; a trailing '*' makes a word a prefix
+def parse_terms(query):
+    return re.findall(r'\w+\*?', query or '')[:MAX_TERMS]
+
+
+def fts_query(terms):
+    return ' '.join(f'"{term[:-1]}"*' if term.endswith('*') else f'"{term}"' for term in terms)
+
+
+# Option texts of the outer query's question, space separated
+def _options_text():
+    return select(func.coalesce(func.group_concat(Option.text, ' '), '')) \
+        .where(Option.question_id == Question.id).scalar_subquery()
+
+
+# Add or refresh the index rows of the given questions. Runs in the caller's
+# transaction, so the index commits (or rolls back) with the questions.
+def index_questions(question_ids):
+    if not question_ids or not available():
+        return
+    db.session.execute(
+        insert(question_fts).prefix_with('OR REPLACE').from_select(
+            ['rowid', 'text', 'options'],
+            select(Question.id, Question.text, _options_text()).where(Question.id.in_(question_ids))))
+
+
+# Drop and refill the index from the question bank; the caller commits.
+# Returns the number of questions indexed, or None when FTS5 is unavailable.
+def rebuild():
+    engine = db.engine
+    if engine.dialect.name != 'sqlite':
+        return None
+    db.session.execute(db.text(f'DROP TABLE IF EXISTS {FTS_TABLE}'))
+    db.session.execute(db.text(CREATE_FTS_TABLE))
+    _available.add(engine)
+    db.session.execute(insert(question_fts).from_select(
+        ['rowid', 'text', 'options'], select(Question.id, Question.text, _options_text())))
+    db.session.execute(db.text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')"))
+    return db.session.execute(select(func.count()).select_from(question_fts)).scalar()
+
+
+def _highlight(text):
+    return str(escape(text)).replace(_START, '<mark>').replace(_END, '</mark>')
+
+
+# Questions matching `query`, best match first, one page at a time. Each
+# result carries its options and an HTML-escaped copy of the text with the
+# matched words wrapped in <mark>.
+def search(query, quiz_set_id=None, page=1, per_page=20):
+    terms = parse_terms(query)
+    page, per_page = max(page, 1), min(max(per_page, 1), MAX_PER_PAGE)
+    if not terms:
+        rows = []
+    elif available():
+        rows = _fts_search(terms, quiz_set_id, page, per_page)
+    else:
+        rows = _like_search(terms, quiz_set_id, page, per_page)
+
+    has_next = len(rows) > per_page
+    rows = rows[:per_page]
+    options = {}
+    for question_id, text in db.session.execute(
+            select(Option.question_id, Option.text)
+            .where(Option.question_id.in_([row.id for row in rows]))
+            .order_by(Option.question_id, Option.position)):
+        options.setdefault(question_id, []).append(text)
+    return {
+        'query': ' '.join(terms),
+        'page': page,
+        'per_page': per_page,
+        'has_next': has_next,
+        'results': [{
+            'id': row.id,
+            'quiz_set_id': row.quiz_set_id,
+            'position': row.position,
+            'text': row.highlight.replace(_START, '').replace(_END, ''),
+            'highlight': _highlight(row.highlight),
+            'options': options.get(row.id, []),
+            'score': round(-row.score, 4) if row.score is not None else None,
+        } for row in rows],
+    }
+
+
+# Rank the matches on the index alone, then join and highlight only the rows
+# of the requested page: highlight() and the join would otherwise run for
+# every match of a common word before the sort
+def _fts_search(terms, quiz_set_id, page, per_page):
+    fts = literal_column(FTS_TABLE)
+    match = fts.op('MATCH')(fts_query(terms))
+    ranked = select(question_fts.c.rowid, func.bm25(fts, TEXT_WEIGHT, OPTIONS_WEIGHT).label('score')).where(match)
+    if quiz_set_id is not None:
+        ranked = ranked.join(Question, Question.id == question_fts.c.rowid).where(Question.quiz_set_id == quiz_set_id)
+    scores = dict(db.session.execute(
+        ranked.order_by('score').limit(per_page + 1).offset((page - 1) * per_page)).all())
+    if not scores:
+        return []
+    rows = db.session.execute(
+        select(Question.id, Question.quiz_set_id, Question.position,
+               func.highlight(fts, 0, _START, _END).label('highlight'))
+        .select_from(question_fts).join(Question, Question.id == question_fts.c.rowid)
+        .where(match, question_fts.c.rowid.in_(list(scores)))
+    ).all()
+    ranks = {question_id: rank for rank, question_id in enumerate(scores)}
+    return sorted((SearchRow(*row, scores[row.id]) for row in rows), key=lambda row: ranks[row.id])
+
+
+# Every term must appear in the question or one of its options. Scans the
+# table, so it is only meant for databases without FTS5.
+def _like_search(terms, quiz_set_id, page, per_page):
+    conditions = []
+    for term in terms:
+        pattern = '%' + term.rstrip('*').replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        conditions.append(or_(
+            Question.text.ilike(pattern, escape='\\'),
+            exists().where(and_(Option.question_id == Question.id, Option.text.ilike(pattern, escape='\\'))),
+        ))
+    statement = select(Question.id, Question.quiz_set_id, Question.position, Question.text.label('highlight'),
+                       literal_column('NULL').label('score')).where(*conditions).order_by(Question.id)
+    if quiz_set_id is not None:
+        statement = statement.where(Question.quiz_set_id == quiz_set_id)
+    return db.session.execute(statement.limit(per_page + 1).offset((page - 1) * per_page)).all()
@@ -0,0 +1,37 @@
+import importlib
+import os
+from jinja2 import FileSystemBytecodeCache
+
+# Modules only some requests need: the WTForms forms (with email-validator)
+# and the numpy-backed item analysis, duplicate detection and importer. The
+# views import them where they are used; eager workers load them at startup.
+DEFERRED_MODULES = ('app.forms', 'app.analytics', 'app.duplicates', 'app.importer')
+
+
+# Cache compiled templates as bytecode files shared by every worker, so a
+# fresh process unmarshals them instead of parsing and compiling the source
+def init_template_cache(app):
+    directory = app.config['TEMPLATE_CACHE_DIR']
+    if not directory:
+        return
+    directory = os.path.join(app.instance_path, directory)
+    os.makedirs(directory, exist_ok=True)
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(directory)
+
+
+# Load what lazy workers defer to first use: the modules above and every
+# compiled message catalog
+def preload(app, babel):
+    from app.i18n import preload_catalogs
+    for name in DEFERRED_MODULES:
+        importlib.import_module(name)
+    preload_catalogs(app, babel)
+
+
+# Compile every template (into the bytecode cache, when one is configured).
+# Returns the number of templates compiled.
+def compile_templates(app):
+    names = [name for name in app.jinja_env.list_templates() if name.endswith('.html')]
+    for name in names:
+        app.jinja_env.get_template(name)
+    return len(names)
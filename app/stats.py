@@ -0,0 +1,54 @@
+from datetime import datetime
+from sqlalchemy import case, func, insert, select
+from app import db, leaderboard
+from app.database import upsert
+from app.models import QuizResult, QuizSetStats, StudentStats
+
+
+# Add one quiz attempt to a summary row, creating the row on first use. One
+# upsert statement, so concurrent first attempts cannot both try to insert.
+def _bump(model, key_column, key, score, taken):
+    upsert(db.session, model, {key_column.key: key, 'attempts': 1, 'total_score': score, 'last_attempt': taken}, {
+        'attempts': model.attempts + 1,
+        'total_score': model.total_score + score,
+        'last_attempt': case((model.last_attempt > taken, model.last_attempt), else_=taken),
+    })
+
+
+# Update the summary tables for a newly added QuizResult (same transaction as the result)
+def record_result(result):
+    if result.date_taken is None:
+        result.date_taken = datetime.utcnow()
+    _bump(StudentStats, StudentStats.user_id, result.user_id, result.score, result.date_taken)
+    _bump(QuizSetStats, QuizSetStats.quiz_set_id, result.quiz_set_id, result.score, result.date_taken)
+    leaderboard.record(result)
+
+
+# Totals across every quiz set, read from the per-quiz-set summary rows
+def overview():
+    attempts, total_score = db.session.execute(
+        select(func.coalesce(func.sum(QuizSetStats.attempts), 0),
+               func.coalesce(func.sum(QuizSetStats.total_score), 0))
+    ).one()
+    average_score = round(total_score / attempts, 2) if attempts else 0
+    return attempts, average_score
+
+
+# Recompute every summary row (and the leaderboards) from the quiz_result table
+def rebuild():
+    db.session.execute(StudentStats.__table__.delete())
+    db.session.execute(QuizSetStats.__table__.delete())
+    for model, key_column, group_column in (
+        (StudentStats, StudentStats.user_id, QuizResult.user_id),
+        (QuizSetStats, QuizSetStats.quiz_set_id, QuizResult.quiz_set_id),
+    ):
+        db.session.execute(
+            insert(model).from_select(
+                [key_column, model.attempts, model.total_score, model.last_attempt],
+                select(group_column, func.count(QuizResult.id), func.sum(QuizResult.score),
+                       func.max(QuizResult.date_taken)).group_by(group_column),
+            )
+        )
+    leaderboard.rebuild()
+    db.session.commit()
+    return db.session.query(func.count(StudentStats.user_id)).scalar()
@@ -0,0 +1,245 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from sqlalchemy.exc import DataError, IntegrityError
+
+PENDING = 'pending'
+PERSISTED = 'persisted'
+# Could not be saved (e.g. its quiz set or user is gone); kept, with the
+# error, for an operator to look at, and never claimed again
+FAILED = 'failed'
+
+
+# Store a graded submission as a QuizResult, with its answer sheet, and update
+# the summary tables. Used directly in 'sync' mode and by the journal drain in 'async' mode.
+def save_result(submission):
+    from app import db, stats
+    from app.models import AnswerSheet, QuizResult
+    result = QuizResult(
+        user_id=submission['user_id'],
+        quiz_set_id=submission['quiz_set_id'],
+        score=submission['score'],
+        date_taken=datetime.fromisoformat(submission['date_taken']),
+        submission_id=submission.get('id'),
+        question_ids=submission.get('question_ids'),
+        question_count=submission.get('question_count'),
+    )
+    db.session.add(result)
+    if submission.get('answers'):
+        db.session.add(AnswerSheet.from_answers(result, submission['answers']))
+    stats.record_result(result)
+    return result
+
+
+# Durable local queue of graded submissions, kept in its own SQLite file so
+# appending never waits on the main database's write lock
+class SubmissionJournal:
+    def __init__(self, path, lease=60):
+        self.path = path
+        self.lease = lease
+        self._local = threading.local()
+        # Use a throwaway connection so none is inherited by forked workers
+        connection = self._open()
+        with _Transaction(connection):
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS submission ('
+                'id TEXT PRIMARY KEY, payload TEXT NOT NULL, status TEXT NOT NULL, '
+                'created_at REAL NOT NULL, claimed_at REAL, result_id INTEGER, error TEXT)'
+            )
+            # Journals created before failed submissions were recorded
+            if 'error' not in {row[1] for row in connection.execute('PRAGMA table_info(submission)')}:
+                connection.execute('ALTER TABLE submission ADD COLUMN error TEXT')
+            connection.execute('CREATE INDEX IF NOT EXISTS ix_submission_status ON submission (status, created_at)')
+        connection.close()
+
+    def _open(self):
+        connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=FULL')
+        return connection
+
+    # One connection per thread, each statement group in its own transaction
+    def _connect(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._local.connection = self._open()
+        return _Transaction(connection)
+
+    def append(self, submission):
+        submission_id = uuid.uuid4().hex
+        submission = dict(submission, id=submission_id)
+        with self._connect() as connection:
+            connection.execute(
+                'INSERT INTO submission (id, payload, status, created_at) VALUES (?, ?, ?, ?)',
+                (submission_id, json.dumps(submission), PENDING, time.time())
+            )
+        return submission_id
+
+    # Lease up to `limit` pending submissions. A lease that is not followed by
+    # mark_persisted (e.g. the worker crashed) expires and the rows are retried.
+    def claim(self, limit):
+        now = time.time()
+        with self._connect() as connection:
+            rows = connection.execute(
+                'SELECT id, payload FROM submission WHERE status = ? AND (claimed_at IS NULL OR claimed_at < ?) '
+                'ORDER BY created_at LIMIT ?', (PENDING, now - self.lease, limit)
+            ).fetchall()
+            connection.executemany('UPDATE submission SET claimed_at = ? WHERE id = ?',
+                                   [(now, submission_id) for submission_id, _ in rows])
+        return [json.loads(payload) for _, payload in rows]
+
+    def mark_persisted(self, result_ids):
+        with self._connect() as connection:
+            connection.executemany('UPDATE submission SET status = ?, result_id = ? WHERE id = ?',
+                                   [(PERSISTED, result_id, submission_id)
+                                    for submission_id, result_id in result_ids.items()])
+
+    def mark_failed(self, errors):
+        with self._connect() as connection:
+            connection.executemany('UPDATE submission SET status = ?, error = ? WHERE id = ?',
+                                   [(FAILED, error, submission_id) for submission_id, error in errors.items()])
+
+    def get(self, submission_id):
+        with self._connect() as connection:
+            row = connection.execute('SELECT payload, status, result_id, error FROM submission WHERE id = ?',
+                                     (submission_id,)).fetchone()
+        if row is None:
+            return None
+        payload, status, result_id, error = row
+        return dict(json.loads(payload), status=status, result_id=result_id, error=error)
+
+    def pending_count(self):
+        return self.count(PENDING)
+
+    def count(self, status):
+        with self._connect() as connection:
+            return connection.execute('SELECT COUNT(*) FROM submission WHERE status = ?', (status,)).fetchone()[0]
+
+    def prune(self, older_than):
+        with self._connect() as connection:
+            connection.execute('DELETE FROM submission WHERE status = ? AND created_at < ?',
+                               (PERSISTED, time.time() - older_than))
+
+
+# BEGIN IMMEDIATE ... COMMIT around a block, rolling back on error
+class _Transaction:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        self.connection.execute('BEGIN IMMEDIATE')
+        return self.connection
+
+    def __exit__(self, exc_type, exc, tb):
+        self.connection.execute('ROLLBACK' if exc_type else 'COMMIT')
+
+
+# Errors that retrying a submission will not fix: bad rows for the database
+# or a malformed payload. Anything else (e.g. the database is unreachable)
+# leaves the batch pending, to be retried when its lease expires.
+POISON_ERRORS = (IntegrityError, DataError, KeyError, TypeError, ValueError)
+
+
+# Move one batch from the journal into quiz_result. Submissions that already
+# have a QuizResult (the previous drain died before marking them) are only
+# marked, so replaying the journal never double counts. When the batch
+# cannot be committed it is retried one submission at a time, and the ones
+# that still fail are marked failed so they do not hold up the rest.
+def drain(journal, batch_size=500):
+    from flask import current_app
+    from app import db
+    from app.models import QuizResult
+    batch = journal.claim(batch_size)
+    if not batch:
+        return 0
+    existing = dict(db.session.query(QuizResult.submission_id, QuizResult.id)
+                    .filter(QuizResult.submission_id.in_([s['id'] for s in batch])))
+    pending = [s for s in batch if s['id'] not in existing]
+    try:
+        results = {s['id']: save_result(s) for s in pending}
+        db.session.commit()
+    except POISON_ERRORS:
+        db.session.rollback()
+        results, failed = {}, {}
+        for submission in pending:
+            try:
+                results[submission['id']] = save_result(submission)
+                db.session.commit()
+            except POISON_ERRORS as e:
+                db.session.rollback()
+                results.pop(submission['id'], None)
+                failed[submission['id']] = f'{e.__class__.__name__}: {e}'[:500]
+        current_app.logger.warning('Could not save %d journaled submissions: %s', len(failed), failed)
+        journal.mark_failed(failed)
+    existing.update((submission_id, result.id) for submission_id, result in results.items())
+    journal.mark_persisted(existing)
+    return len(batch)
+
+
+# Background thread that keeps draining the journal into the database
+class SubmissionWorker(threading.Thread):
+    def __init__(self, app, journal):
+        super().__init__(name='submission-worker', daemon=True)
+        self.app = app
+        self.journal = journal
+        self.stopping = threading.Event()
+
+    def run(self):
+        interval = self.app.config['SUBMISSION_DRAIN_INTERVAL']
+        batch_size = self.app.config['SUBMISSION_BATCH_SIZE']
+        last_prune = 0
+        while not self.stopping.is_set():
+            try:
+                with self.app.app_context():
+                    drained = drain(self.journal, batch_size)
+                if time.monotonic() - last_prune > 3600:
+                    self.journal.prune(self.app.config['SUBMISSION_RETENTION'])
+                    last_prune = time.monotonic()
+            except Exception:
+                self.app.logger.exception('Draining the submission journal failed')
+                drained = 0
+            if drained < batch_size:
+                self.stopping.wait(interval)
+
+    def stop(self):
+        self.stopping.set()
+
+
+# Extension that owns the journal and, when enabled, the drain worker
+class SubmissionQueue:
+    def __init__(self, app=None):
+        self.journal = None
+        self.worker = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions['submission_queue'] = self
+        if app.config.get('SUBMISSION_MODE', 'sync') != 'async':
+            return
+        path = app.config.get('SUBMISSION_JOURNAL') or os.path.join(app.instance_path, 'submissions.db')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.journal = SubmissionJournal(path, lease=app.config['SUBMISSION_LEASE'])
+        if app.config['SUBMISSION_WORKER']:
+            # Start on the first request rather than here, so the thread runs
+            # in the serving process even when the app is created before a fork
+            lock = threading.Lock()
+
+            @app.before_request
+            def start_worker():
+                if self.worker is None:
+                    with lock:
+                        if self.worker is None:
+                            self.worker = SubmissionWorker(app, self.journal)
+                            self.worker.start()
+
+    @property
+    def enabled(self):
+        return self.journal is not None
+
+    def submit(self, submission):
+        return self.journal.append(submission)
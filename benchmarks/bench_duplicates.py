@@ -0,0 +1,95 @@
+"""Measure near-duplicate checks against question banks of growing size.
+
+For each bank size, one quiz set is seeded with random sentences, every
+question is signed, and new questions are then checked through the LSH
+bucket index (one at a time, as in add_question, and as a 1000-row import
+chunk) and by comparing against every signature of the quiz set. The
+clustering report for the whole quiz set is timed as well.
+
+    python -m benchmarks.bench_duplicates --sizes 1000,10000,100000
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.bench_search import VOCABULARY, write_sentences
+from benchmarks.seed import create_benchmark_app, seed
+
+
+def sentence(rng):
+    return ' '.join(rng.choice(VOCABULARY) for _ in range(rng.randint(6, 14))) + '?'
+
+
+def median_ms(timings):
+    return round(statistics.median(timings) * 1000, 3)
+
+
+def measure(app, size, checks, rng):
+    from sqlalchemy import select
+    from app import db, duplicates
+    from app.models import Question
+    seed(app, users=10, quiz_sets=1, questions=size, results=0)
+    with app.app_context():
+        write_sentences(db, rng)
+        started = time.perf_counter()
+        duplicates.rebuild()
+        db.session.commit()
+        rebuild_seconds = time.perf_counter() - started
+
+        new = duplicates.signatures([(sentence(rng), ['alpha', 'beta', 'gamma', 'delta']) for _ in range(checks)])
+        indexed, brute, found = [], [], 0
+        for signature in new:
+            started = time.perf_counter()
+            found += bool(duplicates.find_similar([1], signature[None, :])[0])
+            indexed.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            stored = np.stack([duplicates.unpack(data) for data in db.session.scalars(
+                select(Question.minhash).where(Question.quiz_set_id == 1))])
+            np.flatnonzero(duplicates.similarity(stored, signature) >= duplicates.threshold())
+            brute.append(time.perf_counter() - started)
+
+        chunk = duplicates.signatures([(sentence(rng), ['alpha', 'beta']) for _ in range(1000)])
+        started = time.perf_counter()
+        duplicates.find_similar([1] * len(chunk), chunk)
+        duplicates.find_repeats([1] * len(chunk), chunk)
+        chunk_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        report = duplicates.clusters(1)
+        clusters_seconds = time.perf_counter() - started
+        db.session.remove()
+    return {
+        'questions': size,
+        'rebuild_seconds': round(rebuild_seconds, 3),
+        'check_indexed_ms': median_ms(indexed),
+        'check_all_pairs_ms': median_ms(brute),
+        'checks_with_matches': found,
+        'import_chunk_1000_ms': round(chunk_seconds * 1000, 3),
+        'clusters_seconds': round(clusters_seconds, 3),
+        'clusters': len(report['clusters']),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='1000,10000,100000', help='comma-separated bank sizes')
+    parser.add_argument('--checks', type=int, default=50, help='single-question checks per size')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_benchmark_app(os.path.join(tmp, 'bench.db'))
+        report = [measure(app, int(size), args.checks, rng) for size in args.sizes.split(',')]
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""Compare query plans and latency for the hot lookups with and without the
+secondary indexes declared in app/models.py.
+
+    python -m benchmarks.bench_indexes --users 20000 --results 500000
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+from benchmarks.seed import create_benchmark_app, seed
+
+QUERIES = {
+    'student_results': ('SELECT * FROM quiz_result WHERE user_id = :user_id', {'user_id': 500}),
+    'review_page': ('SELECT * FROM quiz_result WHERE user_id = :user_id ORDER BY id DESC LIMIT 51', {'user_id': 500}),
+    'recent_attempts': ('SELECT * FROM quiz_result WHERE user_id = :user_id ORDER BY date_taken DESC LIMIT 10',
+                        {'user_id': 500}),
+    'quiz_set_top_scores': ('SELECT * FROM quiz_result WHERE quiz_set_id = :quiz_set_id ORDER BY score DESC LIMIT 10',
+                            {'quiz_set_id': 3}),
+    'quiz_questions': ('SELECT * FROM question WHERE quiz_set_id = :quiz_set_id', {'quiz_set_id': 3}),
+    'question_feedback': ('SELECT * FROM feedback WHERE question_id = :question_id', {'question_id': 10}),
+    'students_by_role': ("SELECT id FROM user WHERE role = 'admin'", {}),
+}
+
+
+def measure(db, repeat):
+    report = {}
+    for name, (sql, params) in QUERIES.items():
+        plan = [row[-1] for row in db.session.execute(db.text('EXPLAIN QUERY PLAN ' + sql), params)]
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            db.session.execute(db.text(sql), params).fetchall()
+            timings.append((time.perf_counter() - started) * 1000)
+        report[name] = {'plan': plan, 'median_ms': round(statistics.median(timings), 3)}
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=5000)
+    parser.add_argument('--quiz-sets', type=int, default=50)
+    parser.add_argument('--questions', type=int, default=100)
+    parser.add_argument('--results', type=int, default=200000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_benchmark_app(os.path.join(tmp, 'bench.db'))
+        from app import db
+        sizes = seed(app, users=args.users, quiz_sets=args.quiz_sets,
+                     questions=args.questions, results=args.results)
+        with app.app_context():
+            indexes = [index for table in db.metadata.sorted_tables for index in table.indexes]
+            for index in indexes:
+                index.drop(db.engine)
+            db.session.execute(db.text('ANALYZE'))
+            before = measure(db, args.repeat)
+            for index in indexes:
+                index.create(db.engine)
+            db.session.execute(db.text('ANALYZE'))
+            after = measure(db, args.repeat)
+            db.session.remove()
+    print(json.dumps({'dataset': sizes, 'before': before, 'after': after}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""Compare render latency per locale for the pages that show quiz content.
+
+Every quiz set, question and option gets a translation in each non-default
+language; each page is then requested with an Accept-Language header per
+locale. The first request (cold caches) and the median of the rest are
+reported, alongside the cost of locale negotiation itself.
+
+    python -m benchmarks.bench_locales --quiz-sets 20 --questions 50 --repeat 50
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+from benchmarks.seed import PASSWORD, create_benchmark_app, seed
+
+HEADERS = {
+    'en': 'en-US,en;q=0.9',
+    'es': 'es-ES,es;q=0.9,en;q=0.5',
+    'sw': 'sw-KE,sw;q=0.9,en;q=0.5',
+}
+
+
+# Add a translation of every title, question and option in `locale`
+def translate_everything(db, locale):
+    from sqlalchemy import insert, select
+    from app.models import (Option, OptionTranslation, Question, QuestionTranslation, QuizSet,
+                            QuizSetTranslation)
+    db.session.execute(insert(QuizSetTranslation).from_select(
+        ['quiz_set_id', 'locale', 'title'],
+        select(QuizSet.id, db.literal(locale), QuizSet.title + f' [{locale}]')))
+    db.session.execute(insert(QuestionTranslation).from_select(
+        ['question_id', 'locale', 'text'],
+        select(Question.id, db.literal(locale), Question.text + f' [{locale}]')))
+    db.session.execute(insert(OptionTranslation).from_select(
+        ['option_id', 'locale', 'text'],
+        select(Option.id, db.literal(locale), Option.text + f' [{locale}]')))
+    db.session.commit()
+
+
+def timed(call, repeat):
+    started = time.perf_counter()
+    call()
+    cold = (time.perf_counter() - started) * 1000
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = call()
+        timings.append((time.perf_counter() - started) * 1000)
+        assert response.status_code == 200, response.status_code
+    return {'cold_ms': round(cold, 3), 'median_ms': round(statistics.median(timings), 3),
+            'p95_ms': round(sorted(timings)[int(0.95 * (len(timings) - 1))], 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--quiz-sets', type=int, default=20)
+    parser.add_argument('--questions', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_benchmark_app(os.path.join(tmp, 'bench.db'))
+        from app import db
+        from app.i18n import negotiate
+        seed(app, users=10, quiz_sets=args.quiz_sets, questions=args.questions, results=0)
+        with app.app_context():
+            for locale in app.config['LANGUAGES']:
+                if locale != app.config['BABEL_DEFAULT_LOCALE']:
+                    translate_everything(db, locale)
+            db.session.remove()
+
+        client = app.test_client()
+        client.post('/login', data={'email': 'student0@example.com', 'password': PASSWORD})
+        pages = {
+            'quiz': lambda headers: client.get('/quiz/1', headers=headers),
+            'available_tests': lambda headers: client.get('/available_tests', headers=headers),
+            'api_questions': lambda headers: client.get('/api/quiz/1/questions', headers=headers),
+        }
+        report = {}
+        for locale, header in HEADERS.items():
+            headers = {'Accept-Language': header}
+            report[locale] = {name: timed(lambda: page(headers), args.repeat) for name, page in pages.items()}
+
+        languages = tuple(app.config['LANGUAGES'])
+        negotiate.cache_clear()
+        started = time.perf_counter()
+        for _ in range(10000):
+            negotiate(HEADERS['sw'], languages)
+        report['negotiation_us'] = round((time.perf_counter() - started) * 100, 3)
+    print(json.dumps({'quiz_sets': args.quiz_sets, 'questions': args.questions, 'locales': report}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""Compare question search latency through the FTS5 index and the LIKE fallback.
+
+The question bank is seeded with random sentences drawn from a fixed
+vocabulary, the index is rebuilt, and each query is run through
+app.search.search() with the index and then with LIKE filters.
+
+    python -m benchmarks.bench_search --quiz-sets 100 --questions 1000 --repeat 20
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from benchmarks.seed import create_benchmark_app, seed
+
+VOCABULARY = ('cell energy plant light water carbon oxygen river mountain planet orbit force motion '
+              'atom molecule reaction acid base salt metal heat sound wave signal number fraction '
+              'angle triangle circle history empire trade war treaty language grammar verb noun poem '
+              'story author market price supply demand climate rain forest desert ocean island').split()
+
+QUERIES = {
+    'one_word': ({'query': 'photosynthesis'}, 1),
+    'common_word': ({'query': 'energy'}, 1),
+    'two_words': ({'query': 'planet orbit'}, 1),
+    'prefix': ({'query': 'mol*'}, 1),
+    'one_quiz_set': ({'query': 'energy', 'quiz_set_id': 7}, 1),
+    'deep_page': ({'query': 'energy'}, 50),
+    'no_match': ({'query': 'zeppelin'}, 1),
+}
+
+
+# Replace the seeded question texts with random sentences, a few of them
+# mentioning a rare word
+def write_sentences(db, rng):
+    from sqlalchemy import update
+    from app.models import Question
+    rows = [{'id': question_id,
+             'text': ' '.join(rng.choice(VOCABULARY) for _ in range(rng.randint(6, 14)))
+             + (' photosynthesis' if rng.random() < 0.001 else '') + '?'}
+            for question_id in db.session.scalars(db.select(Question.id))]
+    db.session.execute(update(Question), rows)
+    db.session.commit()
+
+
+def timed(call, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = call()
+        timings.append((time.perf_counter() - started) * 1000)
+    return {'results': len(result['results']), 'median_ms': round(statistics.median(timings), 3),
+            'p95_ms': round(sorted(timings)[int(0.95 * (len(timings) - 1))], 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--quiz-sets', type=int, default=100)
+    parser.add_argument('--questions', type=int, default=1000, help='questions per quiz set')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_benchmark_app(os.path.join(tmp, 'bench.db'))
+        from app import db, search
+        sizes = seed(app, users=10, quiz_sets=args.quiz_sets, questions=args.questions, results=0, seed=args.seed)
+        with app.app_context():
+            write_sentences(db, random.Random(args.seed))
+            started = time.perf_counter()
+            search.rebuild()
+            db.session.commit()
+            rebuild_seconds = round(time.perf_counter() - started, 3)
+
+            report = {}
+            for mode in ('fts', 'like'):
+                search._available[db.engine] = mode == 'fts'
+                report[mode] = {name: timed(lambda: search.search(page=page, **params), args.repeat)
+                                for name, (params, page) in QUERIES.items()}
+            search._available.clear()
+    print(json.dumps({'questions': sizes['questions'], 'rebuild_seconds': rebuild_seconds, 'queries': report},
+                     indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""Measure worker cold start: import, create_app() and the first request.
+
+Each scenario runs in fresh interpreter processes, as a newly scaled-up
+worker would: the time to import the app package, to build the app and to
+serve its first request are reported as medians over --repeat processes
+(after one discarded warm-up run, which also fills the template bytecode
+cache). A second pass under `python -X importtime` adds up the import cost
+per top-level package for the eager and the lazy API-only worker.
+
+    python -m benchmarks.bench_startup --repeat 10 --top 15
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.seed import create_benchmark_app, seed
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+API_PATH = '/api/quiz/1/questions'
+
+# (name, environment, first request)
+SCENARIOS = [
+    ('eager_page', {}, '/login'),
+    ('eager_api', {}, API_PATH),
+    ('lazy_page', {'LAZY_STARTUP': '1'}, '/login'),
+    ('lazy_api', {'LAZY_STARTUP': '1'}, API_PATH),
+    ('lazy_api_only', {'LAZY_STARTUP': '1', 'BLUEPRINTS': 'api'}, API_PATH),
+]
+PROFILED = ('eager_api', 'lazy_api_only')
+
+CHILD = '''
+import json, sys, time
+started = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+app = create_app()
+created = time.perf_counter()
+response = app.test_client().get(sys.argv[1])
+served = time.perf_counter()
+assert response.status_code == 200, response.status_code
+print(json.dumps({'import_ms': (imported - started) * 1000, 'create_app_ms': (created - imported) * 1000,
+                  'first_request_ms': (served - created) * 1000, 'modules': len(sys.modules)}))
+'''
+
+# "import time: self [us] | cumulative | imported package"
+IMPORT_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|\s*(\S+)')
+
+
+def run_child(env, path, importtime=False):
+    command = [sys.executable] + (['-X', 'importtime'] if importtime else []) + ['-c', CHILD, path]
+    done = subprocess.run(command, cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    return json.loads(done.stdout.strip().splitlines()[-1]), done.stderr
+
+
+# Self time per top-level package, largest first
+def import_profile(stderr, top):
+    packages = {}
+    for match in IMPORT_LINE.finditer(stderr):
+        package = match.group(3).split('.')[0]
+        packages[package] = packages.get(package, 0) + int(match.group(1))
+    total = sum(packages.values())
+    ranked = sorted(packages.items(), key=lambda item: -item[1])[:top]
+    return {'total_ms': round(total / 1000, 1),
+            'packages': [{'package': name, 'self_ms': round(us / 1000, 1)} for name, us in ranked]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--top', type=int, default=15, help='Packages listed in each import profile.')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bench.db')
+        seed(create_benchmark_app(db_path), users=10, quiz_sets=5, questions=20, results=0)
+        base = dict(os.environ, DATABASE_URL=f'sqlite:///{db_path}', TEMPLATE_CACHE_DIR='',
+                    PYTHONWARNINGS='ignore')
+
+        envs = {}
+        for name, extra, path in SCENARIOS:
+            envs[name] = dict(base, **extra)
+            if extra.get('LAZY_STARTUP'):
+                envs[name]['TEMPLATE_CACHE_DIR'] = os.path.join(tmp, 'template-cache')
+            run_child(envs[name], path)
+        # Round-robin, so drift in machine load hits every scenario alike
+        runs = {name: [] for name, _, _ in SCENARIOS}
+        for _ in range(args.repeat):
+            for name, _, path in SCENARIOS:
+                runs[name].append(run_child(envs[name], path)[0])
+
+        report = {}
+        for name, _, path in SCENARIOS:
+            result = {key: round(statistics.median(run[key] for run in runs[name]), 1)
+                      for key in ('import_ms', 'create_app_ms', 'first_request_ms')}
+            result['time_to_first_request_ms'] = round(statistics.median(
+                run['import_ms'] + run['create_app_ms'] + run['first_request_ms'] for run in runs[name]), 1)
+            result['modules'] = runs[name][-1]['modules']
+            result['first_request'] = path
+            if name in PROFILED:
+                result['import_profile'] = import_profile(run_child(envs[name], path, importtime=True)[1], args.top)
+            report[name] = result
+    print(json.dumps({'repeat': args.repeat, 'scenarios': report}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,210 @@
+"""Benchmark the core quiz flows against a seeded synthetic database.
+
+Every flow is driven through the Flask test client, first one request at a
+time and then from a pool of concurrent clients. Latency percentiles,
+throughput and SQL queries per request are written as JSON.
+
+    python -m benchmarks.harness --users 2000 --results 100000 --output run.json
+    python -m benchmarks.harness --compare run.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from benchmarks.seed import PASSWORD, create_benchmark_app, seed
+
+FLOWS = ['login', 'quiz_get', 'quiz_post', 'student_dashboard', 'admin_dashboard', 'api_questions', 'api_leaderboard']
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def summarize(samples, wall_seconds):
+    latencies = [ms for ms, _ in samples]
+    return {
+        'requests': len(samples),
+        'p50_ms': round(percentile(latencies, 0.50), 3),
+        'p95_ms': round(percentile(latencies, 0.95), 3),
+        'p99_ms': round(percentile(latencies, 0.99), 3),
+        'mean_ms': round(statistics.fmean(latencies), 3),
+        'requests_per_second': round(len(samples) / wall_seconds, 1) if wall_seconds else None,
+        'queries_per_request': round(statistics.fmean(queries for _, queries in samples), 2),
+    }
+
+
+# Counts SQL statements issued by the current thread
+class QueryCounter:
+    def __init__(self, engine):
+        from sqlalchemy import event
+        self._local = threading.local()
+        event.listen(engine, 'before_cursor_execute', self._count)
+
+    def _count(self, *args):
+        self._local.count = getattr(self._local, 'count', 0) + 1
+
+    def reset(self):
+        self._local.count = 0
+
+    @property
+    def count(self):
+        return getattr(self._local, 'count', 0)
+
+
+class Driver:
+    def __init__(self, app, counter, answer_keys, student_count, rng):
+        self.app = app
+        self.counter = counter
+        self.answer_keys = answer_keys
+        self.student_count = student_count
+        self.rng = rng
+
+    def client(self, role):
+        client = self.app.test_client()
+        email = 'admin0@example.com' if role == 'admin' else f'student{self.rng.randrange(self.student_count)}@example.com'
+        response = client.post('/login', data={'email': email, 'password': PASSWORD})
+        assert response.status_code == 302, f'login failed for {email}'
+        return client, email
+
+    def request(self, flow, client, email):
+        quiz_set_id = self.rng.choice(list(self.answer_keys))
+        if flow == 'login':
+            call = lambda: client.post('/login', data={'email': email, 'password': PASSWORD})
+        elif flow == 'quiz_get':
+            call = lambda: client.get(f'/quiz/{quiz_set_id}')
+        elif flow == 'quiz_post':
+            answers = {f'question_{question_id}': self.rng.choice(options)
+                       for question_id, options in self.answer_keys[quiz_set_id].items()}
+            call = lambda: client.post(f'/quiz/{quiz_set_id}', data=answers)
+        elif flow == 'student_dashboard':
+            call = lambda: client.get('/student_dashboard')
+        elif flow == 'admin_dashboard':
+            call = lambda: client.get('/admin_dashboard')
+        elif flow == 'api_leaderboard':
+            call = lambda: client.get(f'/api/quiz/{quiz_set_id}/leaderboard')
+        else:
+            call = lambda: client.get(f'/api/quiz/{quiz_set_id}/questions')
+        self.counter.reset()
+        started = time.perf_counter()
+        response = call()
+        elapsed = (time.perf_counter() - started) * 1000
+        assert response.status_code < 400, f'{flow} returned {response.status_code}'
+        return elapsed, self.counter.count
+
+
+def run_sequential(driver, iterations):
+    report = {}
+    for flow in FLOWS:
+        client, email = driver.client('admin' if flow == 'admin_dashboard' else 'student')
+        started = time.perf_counter()
+        samples = [driver.request(flow, client, email) for _ in range(iterations)]
+        report[flow] = summarize(samples, time.perf_counter() - started)
+    return report
+
+
+# Each worker logs in once and then replays a random mix of student flows
+def run_concurrent(driver, concurrency, requests):
+    flows = [flow for flow in FLOWS if flow != 'admin_dashboard']
+    samples = {flow: [] for flow in flows}
+    lock = threading.Lock()
+
+    def worker(count):
+        client, email = driver.client('student')
+        local = [(flow, driver.request(flow, client, email))
+                 for flow in (driver.rng.choice(flows) for _ in range(count))]
+        with lock:
+            for flow, sample in local:
+                samples[flow].append(sample)
+
+    per_worker = max(1, requests // concurrency)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, [per_worker] * concurrency))
+    wall = time.perf_counter() - started
+    report = {flow: summarize(flow_samples, wall) for flow, flow_samples in samples.items() if flow_samples}
+    report['overall'] = summarize([s for flow_samples in samples.values() for s in flow_samples], wall)
+    report['overall']['concurrency'] = concurrency
+    return report
+
+
+def compare(baseline_path, current):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    changes = {}
+    for mode in ('sequential', 'concurrent'):
+        for flow, stats in current.get(mode, {}).items():
+            before = baseline.get(mode, {}).get(flow)
+            if not before:
+                continue
+            changes[f'{mode}.{flow}'] = {
+                metric: round((stats[metric] - before[metric]) / before[metric] * 100, 1)
+                for metric in ('p50_ms', 'p95_ms', 'queries_per_request') if before.get(metric)
+            }
+    return changes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--quiz-sets', type=int, default=20)
+    parser.add_argument('--questions', type=int, default=20, help='questions per quiz set')
+    parser.add_argument('--results', type=int, default=20000)
+    parser.add_argument('--iterations', type=int, default=50, help='sequential requests per flow')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=800, help='total concurrent requests')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--database', help='write the seeded database to this file (which must not exist yet) '
+                                           'instead of a temporary one')
+    parser.add_argument('--output', help='write the JSON report here instead of stdout')
+    parser.add_argument('--compare', metavar='BASELINE', help='include %% change against an earlier report')
+    args = parser.parse_args()
+    # Seeding starts by dropping every table, so never point it at real data
+    if args.database and os.path.exists(args.database) and os.path.getsize(args.database):
+        parser.error(f'{args.database} already exists; seeding would replace its contents')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_benchmark_app(args.database or os.path.join(tmp, 'bench.db'))
+        from app import db
+        from app.models import Option, Question
+        dataset = seed(app, users=args.users, quiz_sets=args.quiz_sets, questions=args.questions,
+                       results=args.results, seed=args.seed)
+        with app.app_context():
+            counter = QueryCounter(db.engine)
+            answer_keys = {}
+            for question_id, quiz_set_id, option_id in db.session.query(
+                    Question.id, Question.quiz_set_id, Option.id).join(Option, Option.question_id == Question.id):
+                answer_keys.setdefault(quiz_set_id, {}).setdefault(question_id, []).append(option_id)
+            db.session.remove()
+        driver = Driver(app, counter, answer_keys, args.users, random.Random(args.seed))
+        report = {
+            'generated_at': datetime.utcnow().isoformat(),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'parameters': vars(args),
+            'dataset': dataset,
+            'sequential': run_sequential(driver, args.iterations),
+            'concurrent': run_concurrent(driver, args.concurrency, args.requests),
+            'identity_cache': app.extensions['identity_cache'].stats(),
+        }
+    if args.compare:
+        report['change_percent'] = compare(args.compare, report)
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+import os
+import random
+from datetime import datetime, timedelta
+
+PASSWORD = 'benchmark'
+OPTIONS = ['alpha', 'beta', 'gamma', 'delta']
+
+
+# Build an app bound to its own database file. DATABASE_URL has to be set
+# before the app package (and with it config.py) is first imported.
+def create_benchmark_app(db_path, **config):
+    os.environ['DATABASE_URL'] = f'sqlite:///{os.path.abspath(db_path)}'
+    # The harness logs the same accounts in from one address over and over
+    os.environ.setdefault('LOGIN_RATE_LIMIT', 'false')
+    from app import create_app
+    app = create_app()
+    app.config.update(WTF_CSRF_ENABLED=False, **config)
+    return app
+
+
+def _chunks(rows, size=5000):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+# Fill a fresh database with synthetic users, quiz sets, questions and results
+def seed(app, users=1000, quiz_sets=20, questions=50, results=20000, admins=1, seed=42):
+    from sqlalchemy import insert
+    from werkzeug.security import generate_password_hash
+    from app import db, stats
+    from app.models import User, QuizSet, Question, Option, QuizResult
+
+    rng = random.Random(seed)
+    # Hashing is deliberately slow, so every synthetic user shares one hash
+    password_hash = generate_password_hash(PASSWORD)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        db.session.execute(insert(User), [{
+            'username': f'{role}{i}', 'email': f'{role}{i}@example.com',
+            'password_hash': password_hash, 'role': role,
+        } for role, count in (('admin', admins), ('student', users)) for i in range(count)])
+        db.session.execute(insert(QuizSet), [
+            {'title': f'Quiz set {i}', 'question_count': questions} for i in range(quiz_sets)])
+        rows = [{'text': f'Question {q} of set {s}?', 'quiz_set_id': s + 1, 'position': q, 'user_id': 1}
+                for s in range(quiz_sets) for q in range(questions)]
+        for chunk in _chunks(rows):
+            question_ids = db.session.scalars(
+                insert(Question).returning(Question.id, sort_by_parameter_order=True), chunk).all()
+            db.session.execute(insert(Option), [
+                {'question_id': question_id, 'position': position, 'text': text, 'is_correct': position == correct}
+                for question_id, correct in zip(question_ids, (rng.randrange(4) for _ in question_ids))
+                for position, text in enumerate(OPTIONS)
+            ])
+        start = datetime(2024, 1, 1)
+        rows = [{
+            'user_id': admins + rng.randrange(users) + 1, 'quiz_set_id': rng.randrange(quiz_sets) + 1,
+            'score': rng.randint(0, questions), 'date_taken': start + timedelta(minutes=i),
+        } for i in range(results)]
+        for chunk in _chunks(rows):
+            db.session.execute(insert(QuizResult), chunk)
+        db.session.commit()
+        stats.rebuild()
+    return {'users': users + admins, 'quiz_sets': quiz_sets,
+            'questions': quiz_sets * questions, 'results': results}
@@ -4,9 +4,117 @@ from dotenv import load_dotenv
 basedir = os.path.abspath(os.path.dirname(__file__))
 load_dotenv(os.path.join(basedir, '.env'))
 
+
+def env_bool(name, default=False):
+    value = os.environ.get(name)
+    if value is None or value == '':
+        return default
+    return value.lower() in ('1', 'true', 'yes', 'on')
+
+
+# Engine options shared by the primary and read pools. Pool sizing does not
+# apply to in-memory SQLite, which always uses a single static connection.
+def engine_options(uri):
+    options = {
+        'pool_pre_ping': env_bool('DB_POOL_PRE_PING', True),
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE') or 1800),
+    }
+    if not (uri.startswith('sqlite') and (':memory:' in uri or uri.rstrip('/') in ('sqlite:', 'sqlite:/'))):
+        options['pool_size'] = int(os.environ.get('DB_POOL_SIZE') or 5)
+        options['max_overflow'] = int(os.environ.get('DB_MAX_OVERFLOW') or 10)
+        options['pool_timeout'] = int(os.environ.get('DB_POOL_TIMEOUT') or 30)
+    return options
+
+
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'helloworld'
-    SQLALCHEMY_DATABASE_URI = 'sqlite:///site.db'
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///site.db'
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
-    LANGUAGES = ['en', 'es', 'sw']
\ No newline at end of file
+    # Optional separate pool (or replica) for read-only queries
+    DATABASE_READ_URL = os.environ.get('DATABASE_READ_URL')
+    SQLALCHEMY_BINDS = {'read': {'url': DATABASE_READ_URL, **engine_options(DATABASE_READ_URL)}} if DATABASE_READ_URL else {}
+
+    # SQLite connection pragmas, applied to every new connection
+    SQLITE_WAL = env_bool('SQLITE_WAL', True)
+    SQLITE_BUSY_TIMEOUT = int(os.environ.get('SQLITE_BUSY_TIMEOUT') or 5000)
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS') or 'NORMAL'
+
+    # Parsed quiz content cache: 'memory', 'null' or a dotted path to a backend class
+    QUIZ_CACHE_BACKEND = os.environ.get('QUIZ_CACHE_BACKEND') or 'memory'
+    QUIZ_CACHE_SIZE = int(os.environ.get('QUIZ_CACHE_SIZE') or 256)
+    QUIZ_CACHE_TTL = int(os.environ.get('QUIZ_CACHE_TTL') or 300)
+    FRAGMENT_CACHE_BACKEND = os.environ.get('FRAGMENT_CACHE_BACKEND') or 'memory'
+    FRAGMENT_CACHE_SIZE = int(os.environ.get('FRAGMENT_CACHE_SIZE') or 256)
+    FRAGMENT_CACHE_TTL = int(os.environ.get('FRAGMENT_CACHE_TTL') or 300)
+    # Part of listing ETags; defaults to a digest of the template files
+    RELEASE = os.environ.get('RELEASE')
+
+    # How long a sampled quiz attempt (its signed list of drawn questions) stays valid
+    QUIZ_ATTEMPT_MAX_AGE = int(os.environ.get('QUIZ_ATTEMPT_MAX_AGE') or 4 * 3600)
+
+    # 'sync' saves each quiz result in the request; 'async' grades, appends the
+    # result to a local journal and lets a background worker batch the inserts
+    SUBMISSION_MODE = os.environ.get('SUBMISSION_MODE') or 'sync'
+    SUBMISSION_JOURNAL = os.environ.get('SUBMISSION_JOURNAL')  # default: instance/submissions.db
+    SUBMISSION_WORKER = env_bool('SUBMISSION_WORKER', True)  # drain in-process; or run `flask submissions drain`
+    SUBMISSION_BATCH_SIZE = int(os.environ.get('SUBMISSION_BATCH_SIZE') or 500)
+    SUBMISSION_DRAIN_INTERVAL = float(os.environ.get('SUBMISSION_DRAIN_INTERVAL') or 0.5)
+    SUBMISSION_LEASE = int(os.environ.get('SUBMISSION_LEASE') or 60)
+    SUBMISSION_RETENTION = int(os.environ.get('SUBMISSION_RETENTION') or 86400)
+
+    # Per-request SQL/timing instrumentation, exposed at /metrics when enabled
+    INSTRUMENTATION_ENABLED = env_bool('INSTRUMENTATION_ENABLED')
+    SLOW_REQUEST_MS = int(os.environ.get('SLOW_REQUEST_MS') or 500)
+
+    # Password hashing, in werkzeug's full method form ('scrypt:N:r:p' or
+    # 'pbkdf2:sha256:iterations'). Stored hashes made with other parameters are
+    # upgraded on the next successful login.
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD') or 'scrypt:32768:8:1'
+    PASSWORD_SALT_LENGTH = int(os.environ.get('PASSWORD_SALT_LENGTH') or 16)
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS') or 2)
+    PASSWORD_HASH_QUEUE = int(os.environ.get('PASSWORD_HASH_QUEUE') or 32)
+
+    # Login attempts allowed per account, and failed attempts allowed per
+    # client IP (token buckets)
+    LOGIN_RATE_LIMIT = env_bool('LOGIN_RATE_LIMIT', True)
+    LOGIN_RATE_LIMIT_KEYS = int(os.environ.get('LOGIN_RATE_LIMIT_KEYS') or 10000)
+    LOGIN_IP_BURST = int(os.environ.get('LOGIN_IP_BURST') or 60)
+    LOGIN_IP_PER_MINUTE = float(os.environ.get('LOGIN_IP_PER_MINUTE') or 30)
+    LOGIN_ACCOUNT_BURST = int(os.environ.get('LOGIN_ACCOUNT_BURST') or 5)
+    LOGIN_ACCOUNT_PER_MINUTE = float(os.environ.get('LOGIN_ACCOUNT_PER_MINUTE') or 2)
+
+    # Reverse proxies in front of the app that append to X-Forwarded-For. The
+    # client address (used for rate limits) is read from that header; 0 trusts
+    # no header and uses the connecting address.
+    TRUSTED_PROXIES = int(os.environ.get('TRUSTED_PROXIES') or 0)
+
+    # Users looked up by the login manager on each authenticated request. With
+    # IDENTITY_SESSION_CLAIMS the user's id, name, email and role are also kept
+    # in the signed session cookie and trusted for IDENTITY_CLAIM_MAX_AGE seconds.
+    IDENTITY_CACHE_BACKEND = os.environ.get('IDENTITY_CACHE_BACKEND') or 'memory'
+    IDENTITY_CACHE_SIZE = int(os.environ.get('IDENTITY_CACHE_SIZE') or 4096)
+    IDENTITY_CACHE_TTL = int(os.environ.get('IDENTITY_CACHE_TTL') or 60)
+    IDENTITY_SESSION_CLAIMS = env_bool('IDENTITY_SESSION_CLAIMS')
+    IDENTITY_CLAIM_MAX_AGE = int(os.environ.get('IDENTITY_CLAIM_MAX_AGE') or 300)
+
+    # New and imported questions are refused when their estimated similarity
+    # (Jaccard over text shingles, options included in any order) to a question
+    # of the same quiz set reaches DUPLICATE_THRESHOLD, unless explicitly allowed
+    DUPLICATE_CHECK = env_bool('DUPLICATE_CHECK', True)
+    DUPLICATE_THRESHOLD = float(os.environ.get('DUPLICATE_THRESHOLD') or 0.7)
+
+    # Startup for short-lived, autoscaled workers. LAZY_STARTUP defers the
+    # migration tooling, forms, numpy-backed modules and message catalogs until
+    # first use; BLUEPRINTS picks what a worker serves ('main' pages, 'api').
+    # Compiled templates are cached as bytecode in TEMPLATE_CACHE_DIR, relative
+    # to the instance folder ('' disables it); `flask templates compile` fills it.
+    LAZY_STARTUP = env_bool('LAZY_STARTUP')
+    BLUEPRINTS = [name.strip() for name in (os.environ.get('BLUEPRINTS') or 'main,api').split(',')]
+    TEMPLATE_CACHE_DIR = os.environ.get('TEMPLATE_CACHE_DIR', 'template-cache' if LAZY_STARTUP else '')
+
+    # Supported languages; content is stored in the default locale and
+    # translated per quiz set through /api/quiz/<id>/translations/<locale>
+    LANGUAGES = ['en', 'es', 'sw']
+    BABEL_DEFAULT_LOCALE = 'en'
\ No newline at end of file
@@ -90,9 +90,15 @@ def run_migrations_online():
                 directives[:] = []
                 logger.info('No changes in schema detected.')
 
+    # the question_fts virtual table and its shadow tables are managed by
+    # hand (see app/search.py), so autogenerate must not try to drop them
+    def include_object(object, name, type_, reflected, compare_to):
+        return not (type_ == 'table' and reflected and name.startswith('question_fts'))
+
     conf_args = current_app.extensions['migrate'].configure_args
     if conf_args.get("process_revision_directives") is None:
         conf_args["process_revision_directives"] = process_revision_directives
+    conf_args.setdefault("include_object", include_object)
 
     connectable = get_engine()
 
@@ -0,0 +1,46 @@
+"""Add content translation tables
+
+Revision ID: 1b9f4c7e0d25
+Revises: e5d07a6b2f18
+Create Date: 2026-10-18 20:04:37.092514
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1b9f4c7e0d25'
+down_revision = 'e5d07a6b2f18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('quiz_set_translation',
+    sa.Column('quiz_set_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('locale', sa.String(length=16), nullable=False),
+    sa.Column('title', sa.String(length=128), nullable=False),
+    sa.ForeignKeyConstraint(['quiz_set_id'], ['quiz_set.id'], ),
+    sa.PrimaryKeyConstraint('quiz_set_id', 'locale')
+    )
+    op.create_table('question_translation',
+    sa.Column('question_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('locale', sa.String(length=16), nullable=False),
+    sa.Column('text', sa.String(length=256), nullable=False),
+    sa.ForeignKeyConstraint(['question_id'], ['question.id'], ),
+    sa.PrimaryKeyConstraint('question_id', 'locale')
+    )
+    op.create_table('option_translation',
+    sa.Column('option_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('locale', sa.String(length=16), nullable=False),
+    sa.Column('text', sa.String(length=256), nullable=False),
+    sa.ForeignKeyConstraint(['option_id'], ['option.id'], ),
+    sa.PrimaryKeyConstraint('option_id', 'locale')
+    )
+
+
+def downgrade():
+    op.drop_table('option_translation')
+    op.drop_table('question_translation')
+    op.drop_table('quiz_set_translation')
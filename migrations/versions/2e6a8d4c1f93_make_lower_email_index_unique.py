@@ -0,0 +1,29 @@
+"""Normalise stored emails and make the lower(email) index unique
+
+Revision ID: 2e6a8d4c1f93
+Revises: 9d4b7e2a6c51
+Create Date: 2026-10-18 23:05:41.207316
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2e6a8d4c1f93'
+down_revision = '9d4b7e2a6c51'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Fails if two accounts differ only in case or surrounding spaces; merge
+    # or rename those first
+    op.execute('UPDATE "user" SET email = lower(trim(email))')
+    op.drop_index('ix_user_email_lower', table_name='user')
+    op.create_index('ix_user_email_lower', 'user', [sa.text('lower(email)')], unique=True)
+
+
+def downgrade():
+    op.drop_index('ix_user_email_lower', table_name='user')
+    op.create_index('ix_user_email_lower', 'user', [sa.text('lower(email)')], unique=False)
@@ -0,0 +1,50 @@
+"""Add student and quiz set stats summary tables
+
+Revision ID: 3c9a1e52b7d4
+Revises: 0f754fd08357
+Create Date: 2026-10-18 09:12:41.204518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c9a1e52b7d4'
+down_revision = '0f754fd08357'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('student_stats',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('total_score', sa.Integer(), nullable=False),
+    sa.Column('last_attempt', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    op.create_table('quiz_set_stats',
+    sa.Column('quiz_set_id', sa.Integer(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('total_score', sa.Integer(), nullable=False),
+    sa.Column('last_attempt', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['quiz_set_id'], ['quiz_set.id'], ),
+    sa.PrimaryKeyConstraint('quiz_set_id')
+    )
+
+    # Backfill from the results recorded so far
+    op.execute(
+        'INSERT INTO student_stats (user_id, attempts, total_score, last_attempt) '
+        'SELECT user_id, COUNT(id), SUM(score), MAX(date_taken) FROM quiz_result GROUP BY user_id'
+    )
+    op.execute(
+        'INSERT INTO quiz_set_stats (quiz_set_id, attempts, total_score, last_attempt) '
+        'SELECT quiz_set_id, COUNT(id), SUM(score), MAX(date_taken) FROM quiz_result GROUP BY quiz_set_id'
+    )
+
+
+def downgrade():
+    op.drop_table('quiz_set_stats')
+    op.drop_table('student_stats')
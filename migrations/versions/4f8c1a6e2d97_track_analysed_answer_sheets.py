@@ -0,0 +1,46 @@
+"""Track analysed answer sheets instead of a result id watermark
+
+Revision ID: 4f8c1a6e2d97
+Revises: 2e6a8d4c1f93
+Create Date: 2026-10-18 23:31:17.654920
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4f8c1a6e2d97'
+down_revision = '2e6a8d4c1f93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('answer_sheet', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('analysed', sa.Boolean(), server_default='0', nullable=False))
+    # Sheets at or below the old watermark are already in the statistics. One
+    # committed late below it was skipped; `flask analytics recompute --full`
+    # picks it up.
+    op.execute('UPDATE answer_sheet SET analysed = true WHERE result_id <= ('
+               'SELECT last_result_id FROM item_analysis WHERE item_analysis.quiz_set_id = answer_sheet.quiz_set_id)')
+    op.execute('UPDATE item_analysis SET attempts = ('
+               'SELECT count(*) FROM answer_sheet WHERE answer_sheet.quiz_set_id = item_analysis.quiz_set_id '
+               'AND answer_sheet.analysed = true)')
+    op.drop_index('ix_answer_sheet_quiz_set_id_result_id', table_name='answer_sheet')
+    op.create_index('ix_answer_sheet_quiz_set_id_analysed', 'answer_sheet', ['quiz_set_id', 'analysed', 'result_id'],
+                    unique=False)
+    with op.batch_alter_table('item_analysis', schema=None) as batch_op:
+        batch_op.drop_column('last_result_id')
+
+
+def downgrade():
+    with op.batch_alter_table('item_analysis', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('last_result_id', sa.Integer(), server_default='0', nullable=False))
+    op.execute('UPDATE item_analysis SET last_result_id = coalesce(('
+               'SELECT max(result_id) FROM answer_sheet WHERE answer_sheet.quiz_set_id = item_analysis.quiz_set_id '
+               'AND answer_sheet.analysed = true), 0)')
+    op.drop_index('ix_answer_sheet_quiz_set_id_analysed', table_name='answer_sheet')
+    op.create_index('ix_answer_sheet_quiz_set_id_result_id', 'answer_sheet', ['quiz_set_id', 'result_id'], unique=False)
+    with op.batch_alter_table('answer_sheet', schema=None) as batch_op:
+        batch_op.drop_column('analysed')
@@ -0,0 +1,28 @@
+"""Add submission_id to quiz_result
+
+Revision ID: 5a0c2e9d7b41
+Revises: f19b6d3a0e57
+Create Date: 2026-10-18 15:58:22.094316
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5a0c2e9d7b41'
+down_revision = 'f19b6d3a0e57'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('quiz_result', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('submission_id', sa.String(length=32), nullable=True))
+        batch_op.create_unique_constraint('uq_quiz_result_submission_id', ['submission_id'])
+
+
+def downgrade():
+    with op.batch_alter_table('quiz_result', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_quiz_result_submission_id', type_='unique')
+        batch_op.drop_column('submission_id')
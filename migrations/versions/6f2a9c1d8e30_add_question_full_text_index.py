@@ -0,0 +1,39 @@
+"""Add question full-text index
+
+Revision ID: 6f2a9c1d8e30
+Revises: 1b9f4c7e0d25
+Create Date: 2026-10-18 21:12:48.530176
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6f2a9c1d8e30'
+down_revision = '1b9f4c7e0d25'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # FTS5 is SQLite only; other databases search with LIKE (see app/search.py)
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    op.execute(
+        "CREATE VIRTUAL TABLE question_fts USING fts5("
+        "text, options, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+    )
+    op.execute(
+        'INSERT INTO question_fts (rowid, text, options) '
+        'SELECT question.id, question.text, '
+        "(SELECT coalesce(group_concat(\"option\".text, ' '), '') FROM \"option\" "
+        ' WHERE "option".question_id = question.id) '
+        'FROM question'
+    )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    op.execute('DROP TABLE IF EXISTS question_fts')
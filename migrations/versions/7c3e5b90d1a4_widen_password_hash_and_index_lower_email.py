@@ -0,0 +1,34 @@
+"""Widen password_hash and index lower(email)
+
+Revision ID: 7c3e5b90d1a4
+Revises: 5a0c2e9d7b41
+Create Date: 2026-10-18 17:12:48.530917
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c3e5b90d1a4'
+down_revision = '5a0c2e9d7b41'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.alter_column('password_hash',
+               existing_type=sa.String(length=128),
+               type_=sa.String(length=256),
+               existing_nullable=False)
+    op.create_index('ix_user_email_lower', 'user', [sa.text('lower(email)')], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_user_email_lower', table_name='user')
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.alter_column('password_hash',
+               existing_type=sa.String(length=256),
+               type_=sa.String(length=128),
+               existing_nullable=False)
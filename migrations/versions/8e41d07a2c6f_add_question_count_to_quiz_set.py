@@ -0,0 +1,31 @@
+"""Add question_count to quiz_set
+
+Revision ID: 8e41d07a2c6f
+Revises: 3c9a1e52b7d4
+Create Date: 2026-10-18 10:02:17.551093
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8e41d07a2c6f'
+down_revision = '3c9a1e52b7d4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('quiz_set', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('question_count', sa.Integer(), server_default='0', nullable=False))
+
+    op.execute(
+        'UPDATE quiz_set SET question_count = '
+        '(SELECT COUNT(question.id) FROM question WHERE question.quiz_set_id = quiz_set.id)'
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('quiz_set', schema=None) as batch_op:
+        batch_op.drop_column('question_count')
@@ -0,0 +1,43 @@
+"""Add question MinHash signatures and LSH buckets
+
+Revision ID: 9d4b7e2a6c51
+Revises: 6f2a9c1d8e30
+Create Date: 2026-10-18 21:46:09.318245
+
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d4b7e2a6c51'
+down_revision = '6f2a9c1d8e30'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('question', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('minhash', sa.LargeBinary(), nullable=True))
+
+    op.create_table('question_bucket',
+    sa.Column('quiz_set_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('bucket', sa.BigInteger(), autoincrement=False, nullable=False),
+    sa.Column('question_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.ForeignKeyConstraint(['question_id'], ['question.id'], ),
+    sa.ForeignKeyConstraint(['quiz_set_id'], ['quiz_set.id'], ),
+    sa.PrimaryKeyConstraint('quiz_set_id', 'bucket', 'question_id'),
+    sqlite_with_rowid=False
+    )
+
+    # Sign existing questions, as `flask questions rebuild-signatures` does.
+    # Signatures need numpy, so this runs the app's code, not SQL.
+    if not context.is_offline_mode():
+        from app import duplicates
+        duplicates.rebuild(op.get_bind())
+
+
+def downgrade():
+    op.drop_table('question_bucket')
+    with op.batch_alter_table('question', schema=None) as batch_op:
+        batch_op.drop_column('minhash')
@@ -0,0 +1,60 @@
+"""Add leaderboard tables
+
+Revision ID: a46d1f83c2b5
+Revises: 7c3e5b90d1a4
+Create Date: 2026-10-18 17:58:20.774301
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a46d1f83c2b5'
+down_revision = '7c3e5b90d1a4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('leaderboard_entry',
+    sa.Column('quiz_set_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('best_score', sa.Integer(), nullable=False),
+    sa.Column('achieved_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['quiz_set_id'], ['quiz_set.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('quiz_set_id', 'user_id')
+    )
+    op.create_index('ix_leaderboard_entry_ranking', 'leaderboard_entry',
+                    ['quiz_set_id', sa.text('best_score DESC'), 'achieved_at'], unique=False)
+    op.create_table('score_bucket',
+    sa.Column('quiz_set_id', sa.Integer(), nullable=False),
+    sa.Column('score', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('students', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['quiz_set_id'], ['quiz_set.id'], ),
+    sa.PrimaryKeyConstraint('quiz_set_id', 'score')
+    )
+
+    # Backfill from the results recorded so far
+    op.execute(
+        'INSERT INTO leaderboard_entry (quiz_set_id, user_id, best_score, achieved_at) '
+        'SELECT r.quiz_set_id, r.user_id, r.score, MIN(r.date_taken) FROM quiz_result r '
+        'JOIN (SELECT quiz_set_id, user_id, MAX(score) AS best_score FROM quiz_result '
+        'GROUP BY quiz_set_id, user_id) b '
+        'ON r.quiz_set_id = b.quiz_set_id AND r.user_id = b.user_id AND r.score = b.best_score '
+        'GROUP BY r.quiz_set_id, r.user_id, r.score'
+    )
+    op.execute(
+        'INSERT INTO score_bucket (quiz_set_id, score, attempts, students) '
+        'SELECT r.quiz_set_id, r.score, COUNT(r.id), '
+        '(SELECT COUNT(*) FROM leaderboard_entry e WHERE e.quiz_set_id = r.quiz_set_id AND e.best_score = r.score) '
+        'FROM quiz_result r GROUP BY r.quiz_set_id, r.score'
+    )
+
+
+def downgrade():
+    op.drop_table('score_bucket')
+    op.drop_index('ix_leaderboard_entry_ranking', table_name='leaderboard_entry')
+    op.drop_table('leaderboard_entry')
@@ -0,0 +1,26 @@
+"""Add content_version to quiz_set
+
+Revision ID: b57f3e0c9a18
+Revises: 8e41d07a2c6f
+Create Date: 2026-10-18 11:20:54.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b57f3e0c9a18'
+down_revision = '8e41d07a2c6f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('quiz_set', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('content_version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('quiz_set', schema=None) as batch_op:
+        batch_op.drop_column('content_version')
@@ -0,0 +1,61 @@
+"""Add question positions and per-attempt sampling
+
+Revision ID: c8b2e4f7a913
+Revises: a46d1f83c2b5
+Create Date: 2026-10-18 18:40:12.318846
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c8b2e4f7a913'
+down_revision = 'a46d1f83c2b5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('question', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('position', sa.Integer(), nullable=True))
+
+    # Number existing questions 0..n-1 within each quiz set, in id order,
+    # and make question_count agree with the numbering
+    op.execute(
+        'UPDATE question SET position = '
+        '(SELECT COUNT(*) FROM question AS earlier '
+        'WHERE earlier.quiz_set_id = question.quiz_set_id AND earlier.id < question.id)'
+    )
+    op.execute(
+        'UPDATE quiz_set SET question_count = '
+        '(SELECT COUNT(question.id) FROM question WHERE question.quiz_set_id = quiz_set.id)'
+    )
+
+    with op.batch_alter_table('question', schema=None) as batch_op:
+        batch_op.alter_column('position', existing_type=sa.Integer(), nullable=False)
+        batch_op.drop_index('ix_question_quiz_set_id')
+        batch_op.create_index('ix_question_quiz_set_id_position', ['quiz_set_id', 'position'], unique=True)
+
+    with op.batch_alter_table('quiz_set', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('sample_size', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('sample_stratified', sa.Boolean(), server_default='0', nullable=False))
+
+    with op.batch_alter_table('quiz_result', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('question_ids', sa.JSON(), nullable=True))
+        batch_op.add_column(sa.Column('question_count', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('quiz_result', schema=None) as batch_op:
+        batch_op.drop_column('question_count')
+        batch_op.drop_column('question_ids')
+
+    with op.batch_alter_table('quiz_set', schema=None) as batch_op:
+        batch_op.drop_column('sample_stratified')
+        batch_op.drop_column('sample_size')
+
+    with op.batch_alter_table('question', schema=None) as batch_op:
+        batch_op.drop_index('ix_question_quiz_set_id_position')
+        batch_op.create_index('ix_question_quiz_set_id', ['quiz_set_id'], unique=False)
+        batch_op.drop_column('position')
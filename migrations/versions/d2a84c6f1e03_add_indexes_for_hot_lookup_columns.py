@@ -0,0 +1,34 @@
+"""Add indexes for hot lookup columns
+
+Revision ID: d2a84c6f1e03
+Revises: b57f3e0c9a18
+Create Date: 2026-10-18 13:05:39.870142
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2a84c6f1e03'
+down_revision = 'b57f3e0c9a18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(op.f('ix_user_role'), 'user', ['role'], unique=False)
+    op.create_index(op.f('ix_question_quiz_set_id'), 'question', ['quiz_set_id'], unique=False)
+    op.create_index(op.f('ix_quiz_result_user_id'), 'quiz_result', ['user_id'], unique=False)
+    op.create_index('ix_quiz_result_user_id_date_taken', 'quiz_result', ['user_id', 'date_taken'], unique=False)
+    op.create_index('ix_quiz_result_quiz_set_id_score', 'quiz_result', ['quiz_set_id', 'score'], unique=False)
+    op.create_index(op.f('ix_feedback_question_id'), 'feedback', ['question_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_feedback_question_id'), table_name='feedback')
+    op.drop_index('ix_quiz_result_quiz_set_id_score', table_name='quiz_result')
+    op.drop_index('ix_quiz_result_user_id_date_taken', table_name='quiz_result')
+    op.drop_index(op.f('ix_quiz_result_user_id'), table_name='quiz_result')
+    op.drop_index(op.f('ix_question_quiz_set_id'), table_name='question')
+    op.drop_index(op.f('ix_user_role'), table_name='user')
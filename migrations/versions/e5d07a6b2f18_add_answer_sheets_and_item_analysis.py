@@ -0,0 +1,72 @@
+"""Add answer sheets and item analysis tables
+
+Revision ID: e5d07a6b2f18
+Revises: c8b2e4f7a913
+Create Date: 2026-10-18 19:26:53.661902
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5d07a6b2f18'
+down_revision = 'c8b2e4f7a913'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('answer_sheet',
+    sa.Column('result_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('quiz_set_id', sa.Integer(), nullable=False),
+    sa.Column('question_ids', sa.LargeBinary(), nullable=False),
+    sa.Column('option_ids', sa.LargeBinary(), nullable=False),
+    sa.ForeignKeyConstraint(['quiz_set_id'], ['quiz_set.id'], ),
+    sa.ForeignKeyConstraint(['result_id'], ['quiz_result.id'], ),
+    sa.PrimaryKeyConstraint('result_id')
+    )
+    op.create_index('ix_answer_sheet_quiz_set_id_result_id', 'answer_sheet', ['quiz_set_id', 'result_id'], unique=False)
+    op.create_table('item_analysis',
+    sa.Column('quiz_set_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('last_result_id', sa.Integer(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('analysed_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['quiz_set_id'], ['quiz_set.id'], ),
+    sa.PrimaryKeyConstraint('quiz_set_id')
+    )
+    op.create_table('item_stats',
+    sa.Column('question_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('quiz_set_id', sa.Integer(), nullable=False),
+    sa.Column('responses', sa.Integer(), nullable=False),
+    sa.Column('skipped', sa.Integer(), nullable=False),
+    sa.Column('correct', sa.Integer(), nullable=False),
+    sa.Column('rest_sum', sa.BigInteger(), nullable=False),
+    sa.Column('rest_squares', sa.BigInteger(), nullable=False),
+    sa.Column('correct_rest_sum', sa.BigInteger(), nullable=False),
+    sa.Column('difficulty', sa.Float(), nullable=True),
+    sa.Column('discrimination', sa.Float(), nullable=True),
+    sa.ForeignKeyConstraint(['question_id'], ['question.id'], ),
+    sa.ForeignKeyConstraint(['quiz_set_id'], ['quiz_set.id'], ),
+    sa.PrimaryKeyConstraint('question_id')
+    )
+    op.create_index(op.f('ix_item_stats_quiz_set_id'), 'item_stats', ['quiz_set_id'], unique=False)
+    op.create_table('option_stats',
+    sa.Column('option_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('question_id', sa.Integer(), nullable=False),
+    sa.Column('picks', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['option_id'], ['option.id'], ),
+    sa.ForeignKeyConstraint(['question_id'], ['question.id'], ),
+    sa.PrimaryKeyConstraint('option_id')
+    )
+    op.create_index(op.f('ix_option_stats_question_id'), 'option_stats', ['question_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_option_stats_question_id'), table_name='option_stats')
+    op.drop_table('option_stats')
+    op.drop_index(op.f('ix_item_stats_quiz_set_id'), table_name='item_stats')
+    op.drop_table('item_stats')
+    op.drop_table('item_analysis')
+    op.drop_index('ix_answer_sheet_quiz_set_id_result_id', table_name='answer_sheet')
+    op.drop_table('answer_sheet')
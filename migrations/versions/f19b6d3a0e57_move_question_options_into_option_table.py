@@ -0,0 +1,85 @@
+"""Move question options into an option table
+
+Revision ID: f19b6d3a0e57
+Revises: d2a84c6f1e03
+Create Date: 2026-10-18 14:41:06.152737
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f19b6d3a0e57'
+down_revision = 'd2a84c6f1e03'
+branch_labels = None
+depends_on = None
+
+question = sa.table('question',
+    sa.column('id', sa.Integer),
+    sa.column('options', sa.String),
+    sa.column('correct_option', sa.String),
+)
+option = sa.table('option',
+    sa.column('question_id', sa.Integer),
+    sa.column('position', sa.Integer),
+    sa.column('text', sa.String),
+    sa.column('is_correct', sa.Boolean),
+)
+
+
+def upgrade():
+    op.create_table('option',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('question_id', sa.Integer(), nullable=False),
+    sa.Column('position', sa.Integer(), nullable=False),
+    sa.Column('text', sa.String(length=256), nullable=False),
+    sa.Column('is_correct', sa.Boolean(), nullable=False),
+    sa.ForeignKeyConstraint(['question_id'], ['question.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('option', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_option_question_id'), ['question_id'], unique=False)
+
+    # Split the legacy comma-joined options; the first option matching
+    # correct_option is flagged as the answer
+    connection = op.get_bind()
+    rows = []
+    for question_id, options, correct_option in connection.execute(
+            sa.select(question.c.id, question.c.options, question.c.correct_option)):
+        texts = [text.strip() for text in options.split(',') if text.strip()]
+        correct = texts.index(correct_option.strip()) if correct_option.strip() in texts else None
+        rows.extend({'question_id': question_id, 'position': position, 'text': text,
+                     'is_correct': position == correct} for position, text in enumerate(texts))
+    if rows:
+        op.bulk_insert(option, rows)
+
+    with op.batch_alter_table('question', schema=None) as batch_op:
+        batch_op.drop_column('correct_option')
+        batch_op.drop_column('options')
+
+
+def downgrade():
+    with op.batch_alter_table('question', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('options', sa.String(length=256), server_default='', nullable=False))
+        batch_op.add_column(sa.Column('correct_option', sa.String(length=64), server_default='', nullable=False))
+
+    connection = op.get_bind()
+    options = {}
+    correct = {}
+    for question_id, text, is_correct in connection.execute(
+            sa.select(option.c.question_id, option.c.text, option.c.is_correct)
+            .order_by(option.c.question_id, option.c.position)):
+        options.setdefault(question_id, []).append(text)
+        if is_correct:
+            correct[question_id] = text
+    for question_id, texts in options.items():
+        connection.execute(
+            question.update().where(question.c.id == question_id)
+            .values(options=','.join(texts), correct_option=correct.get(question_id, ''))
+        )
+
+    with op.batch_alter_table('option', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_option_question_id'))
+
+    op.drop_table('option')
@@ -0,0 +1,84 @@
+import os
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+
+# config.py reads the environment when it is first imported: every test app
+# gets its own in-memory database and cheap password hashes
+os.environ['DATABASE_URL'] = 'sqlite://'
+os.environ['PASSWORD_HASH_METHOD'] = 'pbkdf2:sha256:1000'
+os.environ['SUBMISSION_MODE'] = 'sync'
+os.environ['LOGIN_RATE_LIMIT'] = 'false'
+
+PASSWORD = 'secret'
+
+
+# A test app with its tables created, inside its app context. Tests that
+# need a second app, or different settings, call this directly.
+@contextmanager
+def running_app():
+    from app import create_app, db
+    app = create_app()
+    app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def app():
+    with running_app() as app:
+        yield app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def make_user(username, role='student'):
+    from app import db
+    from app.models import User
+    user = User(username=username, email=f'{username}@example.com', role=role)
+    user.set_password(PASSWORD)
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+# A quiz set of `questions` questions, each with options 'a' to 'd' and 'a' correct
+def make_quiz_set(title='Quiz', questions=3, author=None):
+    from app import db
+    from app.models import Question, QuizSet
+    author = author or make_user(f'author{title.replace(" ", "")}', role='admin')
+    quiz_set = QuizSet(title=title)
+    db.session.add(quiz_set)
+    db.session.flush()
+    for i in range(questions):
+        question = Question(text=f'{title} question {i}?', quiz_set_id=quiz_set.id, user_id=author.id,
+                            position=QuizSet.record_questions_added(quiz_set.id))
+        question.set_options(['a', 'b', 'c', 'd'], 'a')
+        db.session.add(question)
+    db.session.commit()
+    db.session.refresh(quiz_set)
+    return quiz_set
+
+
+# Save `count` results through the same path as a quiz submission
+def add_results(user, quiz_set, count, score=1):
+    from app import db, submissions
+    start = datetime(2024, 1, 1)
+    for i in range(count):
+        submissions.save_result({'user_id': user.id, 'quiz_set_id': quiz_set.id, 'score': score,
+                                 'date_taken': (start + timedelta(minutes=i)).isoformat(),
+                                 'question_ids': None, 'question_count': quiz_set.question_count,
+                                 'answers': []})
+    db.session.commit()
+
+
+def login(client, email):
+    response = client.post('/login', data={'email': email, 'password': PASSWORD})
+    assert response.status_code == 302, response.status_code
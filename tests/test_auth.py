@@ -0,0 +1,90 @@
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from app.ratelimit import RateLimiter
+from tests.conftest import PASSWORD, login, make_user, running_app
+
+
+def register(client, username, email):
+    return client.post('/register', data={'username': username, 'email': email, 'password': PASSWORD,
+                                           'confirm_password': PASSWORD, 'role': 'student'})
+
+
+def test_registration_stores_the_email_normalised(app, client):
+    from app.models import User
+    assert register(client, 'mixed', 'Mixed.Case@Example.COM').status_code == 302
+    assert User.query.filter_by(username='mixed').one().email == 'mixed.case@example.com'
+    login(client, 'MIXED.case@example.com')
+
+
+def test_email_is_unique_whatever_its_case(app):
+    from app import db
+    from app.models import User
+    make_user('first')
+    db.session.add(User(username='second', email='FIRST@example.com', role='student', password_hash='x'))
+    with pytest.raises(IntegrityError):
+        db.session.commit()
+    db.session.rollback()
+
+
+def test_login_rehashes_passwords_made_with_old_parameters(app, client):
+    from app import password_hasher
+    from app.models import User
+    user = make_user('student')
+    user_id, email = user.id, user.email
+    password_hasher.method = 'pbkdf2:sha256:2000'
+    try:
+        login(client, email)
+        assert User.query.get(user_id).password_hash.startswith('pbkdf2:sha256:2000$')
+    finally:
+        password_hasher.method = app.config['PASSWORD_HASH_METHOD']
+
+
+def test_rate_limiter_refuses_past_the_burst_until_reset():
+    limiter = RateLimiter()
+    limiter.enabled, limiter.max_keys = True, 10
+    limiter.limits = {'account': (2, 1 / 60)}
+    assert limiter.hit(account='a') == 0
+    assert limiter.hit(account='a') == 0
+    assert 0 < limiter.hit(account='a') <= 60
+    assert limiter.hit(account='b') == 0
+    limiter.reset(account='a')
+    assert limiter.hit(account='a') == 0
+
+
+def test_registering_a_taken_email_or_username_is_refused(app, client):
+    from app.models import User
+    make_user('first')
+    response = register(client, 'second', 'First@Example.com')
+    assert response.status_code == 200 and b'An account with that email already exists.' in response.data
+    response = register(client, 'first', 'other@example.com')
+    assert response.status_code == 200 and b'That username is taken.' in response.data
+    assert User.query.count() == 1
+
+
+def test_successful_logins_from_one_address_are_not_limited(app, client):
+    from app import rate_limiter
+    rate_limiter.enabled = True
+    try:
+        make_user('student')
+        for _ in range(app.config['LOGIN_IP_BURST'] + 5):
+            login(client, 'student@example.com')
+        for i in range(app.config['LOGIN_IP_BURST']):
+            client.post('/login', data={'email': f'nobody{i}@example.com', 'password': 'wrong'})
+        response = client.post('/login', data={'email': 'student@example.com', 'password': PASSWORD})
+        assert response.status_code == 429 and 'Retry-After' in response.headers
+    finally:
+        rate_limiter.enabled = app.config['LOGIN_RATE_LIMIT']
+        rate_limiter._buckets.clear()
+
+
+def test_client_address_comes_from_x_forwarded_for_behind_a_proxy(monkeypatch):
+    from flask import request
+    from config import Config
+    monkeypatch.setattr(Config, 'TRUSTED_PROXIES', 1)
+    with running_app() as app:
+        client = app.test_client()
+        seen = []
+        app.before_request(lambda: seen.append(request.remote_addr))
+        client.get('/login', environ_base={'REMOTE_ADDR': '10.0.0.1'}, headers={'X-Forwarded-For': '203.0.113.7'})
+        assert seen == ['203.0.113.7']
@@ -0,0 +1,72 @@
+from app.cache import MemoryBackend
+
+from tests.conftest import login, make_quiz_set, make_user
+
+
+def test_memory_backend_evicts_least_recently_used():
+    backend = MemoryBackend(max_entries=2, ttl=0)
+    backend.set((1, 'a'), 'a')
+    backend.set((2, 'b'), 'b')
+    backend.get((1, 'a'))
+    backend.set((3, 'c'), 'c')
+    assert backend.get((2, 'b')) is None
+    assert backend.get((1, 'a')) == 'a'
+    backend.delete_prefix((1,))
+    assert backend.get((1, 'a')) is None
+
+
+def test_quiz_payload_is_cached_until_the_content_version_changes(app):
+    from app import db, quiz_cache
+    from app.models import Question, QuizSet
+    quiz_set = make_quiz_set(questions=2)
+    first = quiz_cache.get_quiz(quiz_set)
+    assert quiz_cache.get_quiz(quiz_set) is first
+    assert len(first['questions']) == 2
+    assert set(first['answer_key'].values()) == {question['options'][0]['id'] for question in first['questions']}
+
+    question = Question(text='Another?', quiz_set_id=quiz_set.id, user_id=Question.query.first().user_id,
+                        position=QuizSet.record_questions_added(quiz_set.id))
+    question.set_options(['x', 'y'], 'y')
+    db.session.add(question)
+    db.session.commit()
+    db.session.refresh(quiz_set)
+    assert len(quiz_cache.get_quiz(quiz_set)['questions']) == 3
+
+
+def test_quiz_api_answers_304_for_the_current_version(app, client):
+    student = make_user('student')
+    quiz_set = make_quiz_set()
+    login(client, student.email)
+    response = client.get(f'/api/quiz/{quiz_set.id}/questions')
+    assert response.status_code == 200 and len(response.get_json()) == 3
+    etag = response.headers['ETag']
+    assert client.get(f'/api/quiz/{quiz_set.id}/questions', headers={'If-None-Match': etag}).status_code == 304
+
+
+def test_listing_etag_follows_catalog_and_locale(app, client):
+    from flask import g
+    from app.i18n import negotiate
+    assert negotiate('sw;q=0.9, es', ('en', 'es', 'sw')) == 'es'
+    student = make_user('student')
+    make_quiz_set('First')
+    login(client, student.email)
+    response = client.get('/available_tests')
+    assert response.status_code == 200 and b'First' in response.data
+    assert response.cache_control.private and response.cache_control.no_cache
+    etag = response.headers['ETag']
+    assert client.get('/available_tests', headers={'If-None-Match': etag}).status_code == 304
+    # Requests share the fixture's app context, where flask-babel caches the locale
+    g.pop('_flask_babel', None)
+    spanish = client.get('/available_tests', headers={'If-None-Match': etag, 'Accept-Language': 'es'})
+    assert spanish.status_code == 200 and spanish.headers['ETag'] != etag
+
+    g.pop('_flask_babel', None)
+    make_quiz_set('Second')
+    response = client.get('/available_tests', headers={'If-None-Match': etag})
+    assert response.status_code == 200 and b'Second' in response.data
+
+
+def test_home_page_is_public_for_anonymous_visitors(app, client):
+    response = client.get('/')
+    assert response.cache_control.public and response.cache_control.max_age == 60
+    assert client.get('/', headers={'If-None-Match': response.headers['ETag']}).status_code == 304
@@ -0,0 +1,49 @@
+import sqlite3
+
+import pytest
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import select
+
+from app.database import RoutingSession, _sqlite_pragmas
+
+
+def test_sqlite_pragmas(tmp_path):
+    connection = sqlite3.connect(tmp_path / 'pragmas.db')
+    _sqlite_pragmas({'SQLITE_WAL': True, 'SQLITE_BUSY_TIMEOUT': 1234, 'SQLITE_SYNCHRONOUS': 'normal'})(connection, None)
+    assert connection.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+    assert connection.execute('PRAGMA busy_timeout').fetchone()[0] == 1234
+    assert connection.execute('PRAGMA synchronous').fetchone()[0] == 1
+    with pytest.raises(ValueError):
+        _sqlite_pragmas({'SQLITE_SYNCHRONOUS': 'sometimes'})
+
+
+# A primary and a "replica" that hold different rows, to see where each read goes
+@pytest.fixture
+def routed(tmp_path):
+    app = Flask(__name__)
+    app.config.update(SQLALCHEMY_DATABASE_URI=f'sqlite:///{tmp_path / "primary.db"}',
+                      SQLALCHEMY_BINDS={'read': f'sqlite:///{tmp_path / "replica.db"}'})
+    db = SQLAlchemy(app, session_options={'class_': RoutingSession})
+
+    class Item(db.Model):
+        id = db.Column(db.Integer, primary_key=True)
+        name = db.Column(db.String(16))
+
+    with app.app_context():
+        db.create_all()
+        for engine, name in ((db.engine, 'primary'), (db.engines['read'], 'replica')):
+            with engine.begin() as connection:
+                Item.__table__.create(connection, checkfirst=True)
+                connection.execute(Item.__table__.insert(), {'id': 1, 'name': name})
+        yield db, Item
+
+
+def test_reads_go_to_the_replica_until_the_transaction_writes(routed):
+    db, Item = routed
+    assert db.session.scalar(select(Item.name)) == 'replica'
+    db.session.add(Item(id=2, name='new'))
+    db.session.flush()
+    assert db.session.scalars(select(Item.name).order_by(Item.id)).all() == ['primary', 'new']
+    db.session.commit()
+    assert db.session.scalar(select(Item.name)) == 'replica'
@@ -0,0 +1,72 @@
+from app.duplicates import normalize, shingles, signatures, similarity
+
+from tests.conftest import login, make_quiz_set, make_user
+
+CAPITAL = 'What is the capital city of France?'
+OPTIONS = 'Paris\nRome\nMadrid\nBerlin'
+
+
+def test_signatures_ignore_case_accents_punctuation_and_option_order():
+    assert normalize('  Qué   ÉS esto?! ') == 'que es esto'
+    assert shingles('Hi', ['b', 'a']) == shingles('hi!', ['A', 'B'])
+    same, reordered, other = signatures([(CAPITAL, ['Paris', 'Rome']), (CAPITAL.upper(), ['Rome', 'Paris']),
+                                         ('How many legs does a spider have?', ['6', '8'])])
+    assert similarity(same, reordered) == 1.0
+    assert similarity(same, other) < 0.2
+
+
+def test_add_question_warns_about_near_duplicates(app, client):
+    from app.models import Question
+    quiz_set_id = make_quiz_set(questions=0).id
+    make_user('admin', role='admin')
+    login(client, 'admin@example.com')
+    form = {'text': CAPITAL, 'options': OPTIONS, 'correct_option': 'Paris', 'quiz_set_id': quiz_set_id}
+    assert client.post('/admin/add_question', data=form).status_code == 302
+
+    near = dict(form, text='What is the capital city of France')
+    response = client.post('/admin/add_question', data=near)
+    assert response.status_code == 200 and b'Similar questions already exist' in response.data
+    assert Question.query.count() == 1
+    assert client.post('/admin/add_question', data=dict(near, allow_duplicate='1')).status_code == 302
+    assert Question.query.count() == 2
+
+    unrelated = dict(form, text='Which planet is known as the red planet?', options='Mars\nVenus',
+                     correct_option='Mars')
+    assert client.post('/admin/add_question', data=unrelated).status_code == 302
+
+
+def test_rebuild_signs_every_question_and_clusters_find_them(app):
+    from app import db, duplicates
+    quiz_set = make_quiz_set(questions=3)
+    other = make_quiz_set('Other', questions=1)
+    assert duplicates.clusters(quiz_set.id)['questions'] == 0
+    assert duplicates.rebuild() == 4
+    db.session.commit()
+    report = duplicates.clusters(quiz_set.id)
+    assert report['questions'] == 3
+    assert [len(cluster['questions']) for cluster in report['clusters']] == [3]
+    assert duplicates.clusters(other.id)['clusters'] == []
+
+
+def test_import_drops_rows_repeated_within_the_batch(app):
+    import json
+    from app import importer
+    quiz_set_id = make_quiz_set(questions=0).id
+    admin_id = make_user('admin', role='admin').id
+    row = {'text': CAPITAL, 'options': ['Paris', 'Rome'], 'correct_option': 'Paris', 'quiz_set_id': quiz_set_id}
+    lines = [json.dumps(row), json.dumps(dict(row, text=CAPITAL.lower()))]
+    report = importer.import_questions(lines, 'jsonl', admin_id)
+    assert (report.inserted, report.failed) == (1, 1)
+    assert 'near-duplicate of row 1' in report.errors[0]['error']
+    report = importer.import_questions(lines[:1], 'jsonl', admin_id)
+    assert report.inserted == 0 and 'near-duplicate of question' in report.errors[0]['error']
+
+
+# The migration that adds signatures signs existing questions on its own connection
+def test_rebuild_runs_on_a_plain_connection(app):
+    from app import db, duplicates
+    from app.models import Question, QuestionBucket
+    make_quiz_set(questions=2)
+    assert duplicates.rebuild(db.session.connection()) == 2
+    assert Question.query.filter(Question.minhash.is_(None)).count() == 0
+    assert QuestionBucket.query.count() == 2 * duplicates.BANDS
@@ -0,0 +1,54 @@
+import csv
+import io
+import json
+
+from tests.conftest import add_results, login, make_quiz_set, make_user
+
+
+def test_keyset_pages_walk_every_result_newest_first(app):
+    from app.models import QuizResult
+    from app.pagination import keyset_paginate
+    student = make_user('student')
+    add_results(student, make_quiz_set(), 7)
+    seen, before = [], None
+    while True:
+        page = keyset_paginate(QuizResult.query, QuizResult.id, before=before, per_page=3)
+        seen.extend(result.id for result in page.items)
+        if not page.has_next:
+            break
+        before = page.next_cursor
+    assert seen == list(range(7, 0, -1))
+
+
+def test_export_filters_by_quiz_set_and_date(app, client):
+    admin = make_user('admin', role='admin')
+    student = make_user('student')
+    first, second = make_quiz_set('First'), make_quiz_set('Second')
+    add_results(student, first, 3)  # 2024-01-01, one minute apart
+    add_results(student, second, 2)
+    login(client, admin.email)
+
+    response = client.get(f'/admin/results/export?format=csv&quiz_set_id={first.id}')
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert response.mimetype == 'text/csv'
+    assert [row['quiz_set_title'] for row in rows] == ['First'] * 3
+    assert rows[0]['username'] == 'student'
+
+    response = client.get('/admin/results/export?format=ndjson&start=2024-01-02')
+    assert response.get_data(as_text=True) == ''
+    response = client.get('/admin/results/export?format=ndjson&end=2024-01-01')
+    assert len([json.loads(line) for line in response.get_data(as_text=True).splitlines()]) == 5
+    assert client.get('/admin/results/export?format=xml').status_code == 400
+
+
+def test_export_reports_each_attempt_out_of_its_own_question_count(app):
+    from app import db, export, submissions
+    from app.models import QuizResult
+    quiz_set = make_quiz_set(questions=5)
+    student = make_user('student')
+    submissions.save_result({'user_id': student.id, 'quiz_set_id': quiz_set.id, 'score': 2,
+                             'date_taken': '2024-01-01T00:00:00', 'question_ids': [1, 2, 3], 'question_count': 3})
+    add_results(student, quiz_set, 1)
+    db.session.query(QuizResult).filter(QuizResult.id == 2).update({'question_count': None})
+    db.session.commit()
+    assert [row[6] for partition in export.result_rows() for row in partition] == [3, 5]
@@ -0,0 +1,41 @@
+import pytest
+from werkzeug.datastructures import MultiDict
+
+from app.grading import grade, read_answers
+from app.models import option_rows
+
+from tests.conftest import login, make_quiz_set, make_user
+
+
+def test_option_rows_mark_exactly_one_correct_option():
+    rows = option_rows([' Paris ', 'Rome', ''], 'Paris')
+    assert rows == [{'position': 0, 'text': 'Paris', 'is_correct': True},
+                    {'position': 1, 'text': 'Rome', 'is_correct': False}]
+    with pytest.raises(ValueError):
+        option_rows(['Paris'], 'Paris')
+    with pytest.raises(ValueError):
+        option_rows(['Paris', 'Rome'], 'Berlin')
+
+
+def test_grade_counts_matching_option_ids():
+    answers = read_answers(MultiDict({'question_1': '10', 'question_2': '21', 'question_3': 'x'}), [1, 2, 3])
+    assert answers == {1: 10, 2: 21, 3: None}
+    assert grade({1: 10, 2: 20, 3: 30, 4: None}, answers) == 1
+
+
+def test_quiz_submission_is_graded_and_saved(app, client):
+    from app import quiz_cache
+    from app.models import AnswerSheet, QuizResult
+    quiz_set = make_quiz_set(questions=3)
+    student = make_user('student')
+    first, second, third = quiz_cache.get_quiz(quiz_set)['questions']
+    right = first['correct_option_id']
+    wrong = next(option['id'] for option in second['options'] if option['id'] != second['correct_option_id'])
+    login(client, student.email)
+    response = client.post(f'/quiz/{quiz_set.id}', data={f'question_{first["id"]}': right,
+                                                         f'question_{second["id"]}': wrong})
+    assert response.status_code == 302
+    assert 'score=1' in response.location and 'total=3' in response.location
+    result = QuizResult.query.one()
+    assert (result.score, result.question_count) == (1, 3)
+    assert dict(AnswerSheet.query.one().answers) == {first['id']: right, second['id']: wrong, third['id']: 0}
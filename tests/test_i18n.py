@@ -0,0 +1,44 @@
+import pytest
+from flask import g
+
+from tests.conftest import login, make_quiz_set, make_user
+
+
+@pytest.fixture
+def admin_client(app, client):
+    make_user('admin', role='admin')
+    login(client, 'admin@example.com')
+    return client
+
+
+def test_translations_are_served_to_matching_browsers(app, admin_client):
+    from app import quiz_cache
+    quiz_set = make_quiz_set('Capitals', questions=1)
+    quiz_set_id = quiz_set.id
+    question = quiz_cache.get_quiz(quiz_set)['questions'][0]
+    body = {'title': 'Capitales', 'questions': [{'id': question['id'], 'text': '¿Capital?',
+                                                 'options': [{'id': question['options'][0]['id'], 'text': 'uno'}]}]}
+    response = admin_client.put(f'/api/quiz/{quiz_set_id}/translations/es', json=body)
+    assert response.status_code == 200 and response.get_json()['saved'] == 3
+
+    # Requests share the fixture's app context, where flask-babel caches the locale
+    g.pop('_flask_babel', None)
+    page = admin_client.get(f'/quiz/{quiz_set_id}', headers={'Accept-Language': 'es'}).get_data(as_text=True)
+    assert 'Capitales' in page and '¿Capital?' in page and 'uno' in page
+    g.pop('_flask_babel', None)
+    assert 'Capitales' not in admin_client.get(f'/quiz/{quiz_set_id}').get_data(as_text=True)
+
+
+@pytest.mark.parametrize('body', [
+    ['not', 'an', 'object'],
+    'a string',
+    {'questions': {'id': 1}},
+    {'questions': [{'id': 1, 'options': ['text']}]},
+    {'questions': [{'id': [1], 'text': 'x'}]},
+    {'questions': [{'id': 999, 'text': 'x'}]},
+])
+def test_malformed_translations_are_rejected(app, admin_client, body):
+    quiz_set_id = make_quiz_set(questions=1).id
+    response = admin_client.put(f'/api/quiz/{quiz_set_id}/translations/es', json=body)
+    assert response.status_code == 400
+    assert admin_client.put(f'/api/quiz/{quiz_set_id}/translations/fr', json={}).status_code == 400
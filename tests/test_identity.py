@@ -0,0 +1,41 @@
+from tests.conftest import make_user
+
+
+def counts():
+    from app import identity_cache
+    return dict(identity_cache.counts)
+
+
+def test_load_serves_repeat_lookups_from_the_cache(app):
+    from app import db, identity_cache
+    user_id = make_user('student').id
+    db.session.expunge_all()
+    before = counts()
+    assert identity_cache.load(user_id).username == 'student'
+    db.session.expunge_all()
+    assert identity_cache.load(user_id).role == 'student'
+    after = counts()
+    assert (after['database'] - before['database'], after['cache'] - before['cache']) == (1, 1)
+
+
+def test_updating_a_user_drops_the_cached_copy(app):
+    from app import db, identity_cache
+    from app.models import User
+    user_id = make_user('student').id
+    db.session.expunge_all()
+    identity_cache.load(user_id)
+    db.session.get(User, user_id).role = 'admin'
+    db.session.commit()
+    db.session.expunge_all()
+    before = counts()
+    assert identity_cache.load(user_id).role == 'admin'
+    assert counts()['database'] == before['database'] + 1
+
+
+def test_metrics_collector_is_registered_once_per_name(app):
+    from app import create_app, instrumentation
+    create_app()
+    create_app()
+    assert list(instrumentation._collectors) == ['identity_cache']
+    assert sum(line.startswith('# TYPE quiz_app_identity_lookups_total')
+               for line in instrumentation.metrics().splitlines()) == 1
@@ -0,0 +1,34 @@
+import json
+
+from tests.conftest import make_quiz_set, make_user
+
+
+def test_import_reports_invalid_rows_and_inserts_the_rest(app):
+    from app import importer
+    from app.models import Question
+    quiz_set = make_quiz_set(questions=0)
+    admin = make_user('admin', role='admin')
+    lines = [
+        json.dumps({'text': 'Capital of France?', 'options': ['Paris', 'Rome'], 'correct_option': 'Paris',
+                    'quiz_set_id': quiz_set.id}),
+        'not json',
+        json.dumps({'text': 'Largest ocean?', 'options': 'Pacific|Atlantic', 'correct_option': 'Pacific',
+                    'quiz_set_id': quiz_set.id}),
+        json.dumps({'text': 'No such set?', 'options': ['a', 'b'], 'correct_option': 'a', 'quiz_set_id': 999}),
+        json.dumps({'text': 'Bad answer?', 'options': ['a', 'b'], 'correct_option': 'c', 'quiz_set_id': quiz_set.id}),
+    ]
+    report = importer.import_questions(lines, 'jsonl', admin.id, chunk_size=1)
+    assert (report.rows, report.inserted, report.failed) == (5, 2, 3)
+    assert [error['row'] for error in report.errors] == [2, 4, 5]
+
+    questions = Question.query.order_by(Question.position).all()
+    assert [question.position for question in questions] == [0, 1]
+    assert [option.text for option in questions[1].options] == ['Pacific', 'Atlantic']
+    assert questions[1].options[0].is_correct
+
+
+def test_import_csv_requires_every_column(app):
+    from app import importer
+    report = importer.import_questions(['text,options\n', 'a,b|c\n'], 'csv', 1)
+    assert report.inserted == 0
+    assert 'missing CSV columns' in report.errors[0]['error']
@@ -0,0 +1,32 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from config import Config
+
+from tests.conftest import running_app
+
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.setattr(Config, 'INSTRUMENTATION_ENABLED', True)
+    with running_app() as app:
+        yield app
+
+
+def test_failed_statements_leave_no_timing_state(app):
+    from app import db
+    connection = db.session.connection()
+    before = repr(connection.info)
+    for _ in range(3):
+        with pytest.raises(OperationalError):
+            connection.execute(text('SELECT * FROM no_such_table'))
+    connection.execute(text('SELECT 1'))
+    assert repr(connection.info) == before
+
+
+def test_metrics_count_queries_per_endpoint(app, client):
+    assert client.get('/login').status_code == 200
+    body = client.get('/metrics').get_data(as_text=True)
+    assert 'quiz_app_requests_total{endpoint="main.login",method="GET"} 1' in body
+    assert 'quiz_app_identity_lookups_total{source="database"}' in body
@@ -0,0 +1,82 @@
+from datetime import datetime
+
+from tests.conftest import add_results, login, make_quiz_set, make_user
+
+
+def test_standings_rank_students_by_best_score(app):
+    from app import leaderboard
+    quiz_set = make_quiz_set()
+    alice, bob, carol = make_user('alice'), make_user('bob'), make_user('carol')
+    add_results(alice, quiz_set, 1, score=1)
+    add_results(alice, quiz_set, 1, score=3)
+    add_results(bob, quiz_set, 2, score=2)
+    add_results(carol, quiz_set, 1, score=3)
+
+    board = leaderboard.standings(quiz_set.id, user_id=bob.id)
+    assert (board['students'], board['attempts']) == (3, 5)
+    assert [(row['username'], row['rank']) for row in board['top']] == [('alice', 1), ('carol', 1), ('bob', 3)]
+    assert board['me'] == {'rank': 3, 'percentile': 33.3, 'best_score': 2}
+    assert board['histogram'] == [{'score': 1, 'attempts': 1, 'students': 0},
+                                  {'score': 2, 'attempts': 2, 'students': 1},
+                                  {'score': 3, 'attempts': 2, 'students': 2}]
+
+
+# An entry that appeared after the request started (another worker's first
+# attempt) is treated as an existing best, not inserted twice
+def test_record_keeps_an_entry_inserted_concurrently(app):
+    from app import db, leaderboard
+    from app.models import LeaderboardEntry, QuizResult, ScoreBucket
+    quiz_set = make_quiz_set()
+    student = make_user('student')
+    db.session.add(LeaderboardEntry(quiz_set_id=quiz_set.id, user_id=student.id, best_score=1,
+                                    achieved_at=datetime(2024, 1, 1)))
+    db.session.add(ScoreBucket(quiz_set_id=quiz_set.id, score=1, attempts=1, students=1))
+    db.session.commit()
+    leaderboard.record(QuizResult(quiz_set_id=quiz_set.id, user_id=student.id, score=2,
+                                  date_taken=datetime(2024, 1, 2)))
+    db.session.commit()
+    db.session.expire_all()
+    assert db.session.get(LeaderboardEntry, (quiz_set.id, student.id)).best_score == 2
+    assert [(row.score, row.attempts, row.students) for row in ScoreBucket.query.order_by(ScoreBucket.score)] \
+        == [(1, 1, 0), (2, 1, 1)]
+
+
+def test_rebuild_matches_the_incremental_rows(app, client):
+    from app import db, leaderboard
+    quiz_set = make_quiz_set()
+    quiz_set_id = quiz_set.id
+    for i, name in enumerate(('s1', 's2', 's3')):
+        add_results(make_user(name), quiz_set, i + 1, score=i % 2 + 1)
+    incremental = leaderboard.standings(quiz_set_id)
+    leaderboard.rebuild()
+    db.session.commit()
+    assert leaderboard.standings(quiz_set_id) == incremental
+
+    login(client, 's1@example.com')
+    response = client.get(f'/api/quiz/{quiz_set_id}/leaderboard')
+    assert response.status_code == 200 and response.get_json()['me']['best_score'] == 1
+
+
+# The stored best is read under a row lock (FOR UPDATE on PostgreSQL), so two
+# concurrent improvements cannot both compare against the same old best
+def test_improvements_read_the_best_score_under_a_lock(app):
+    from sqlalchemy import event
+    from app import db, leaderboard
+    from app.models import LeaderboardEntry, QuizResult
+    quiz_set = make_quiz_set()
+    student = make_user('student')
+    add_results(student, quiz_set, 1, score=1)
+    locked = []
+
+    def remember(state):
+        if state.is_select and state.statement._for_update_arg is not None:
+            locked.append(state.statement)
+    event.listen(db.session, 'do_orm_execute', remember)
+    try:
+        leaderboard.record(QuizResult(quiz_set_id=quiz_set.id, user_id=student.id, score=3,
+                                      date_taken=datetime(2024, 2, 1)))
+    finally:
+        event.remove(db.session, 'do_orm_execute', remember)
+    db.session.commit()
+    assert len(locked) == 1
+    assert db.session.get(LeaderboardEntry, (quiz_set.id, student.id)).best_score == 3
@@ -0,0 +1,62 @@
+import pytest
+from sqlalchemy import event
+
+from tests.conftest import add_results, login, make_quiz_set, make_user, running_app
+
+
+# Statements sent to the database, counted like benchmarks/harness.py:QueryCounter
+class QueryCounter:
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _count(self, *args):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._count)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._count)
+
+
+# Each student gets `results` results, each in a different quiz set, so a
+# lazy load per result would show up as one more query per result
+def view_queries(app, results):
+    from app import db
+    admin = make_user('admin', role='admin')
+    quiz_sets = [make_quiz_set(f'Quiz {i}', questions=1, author=admin) for i in range(results)]
+    students = [make_user(f'student{i}') for i in range(3)]
+    for student in students:
+        for quiz_set in quiz_sets:
+            add_results(student, quiz_set, 1)
+
+    student, admin = (students[0].id, students[0].email), admin.email
+
+    counts = {}
+    for name, email, path in (('student_dashboard', student[1], '/student_dashboard'),
+                              ('review_student', admin, f'/admin/review_student/{student[0]}'),
+                              ('view_feedback', admin, '/admin/view_feedback')):
+        client = app.test_client()
+        login(client, email)
+        client.get(path)  # fill the fragment and identity caches
+        db.session.remove()
+        with QueryCounter(db.engine) as counter:
+            assert client.get(path).status_code == 200
+        counts[name] = counter.count
+    return counts
+
+
+@pytest.fixture
+def other_app():
+    with running_app() as app:
+        yield app
+
+
+def test_views_issue_a_constant_number_of_queries(app, other_app):
+    with app.app_context():
+        few = view_queries(app, 1)
+    with other_app.app_context():
+        many = view_queries(other_app, 50)
+    assert few == many
@@ -0,0 +1,49 @@
+import random
+
+from app.sampling import draw_positions
+
+from tests.conftest import login, make_quiz_set, make_user
+
+
+def test_draw_positions_are_distinct_and_stratified_draws_cover_every_slice():
+    rng = random.Random(7)
+    positions = draw_positions(20, 5, rng=rng)
+    assert len(set(positions)) == 5 and all(0 <= position < 20 for position in positions)
+    assert sorted(draw_positions(3, 10, rng=rng)) == [0, 1, 2]
+    stratified = draw_positions(20, 4, stratified=True, rng=rng)
+    assert [position // 5 for position in stratified] == [0, 1, 2, 3]
+
+
+def test_attempt_token_is_bound_to_its_quiz_set(app):
+    from app import sampling
+    with app.test_request_context():
+        token = sampling.attempt_token(1, [3, 5])
+        assert sampling.read_attempt_token(token, 1) == [3, 5]
+        assert sampling.read_attempt_token(token, 2) is None
+        assert sampling.read_attempt_token(token[:-2] + 'xx', 1) is None
+        assert sampling.read_attempt_token(None, 1) is None
+
+
+def test_sampled_attempt_grades_only_the_drawn_questions(app, client):
+    from app import db, sampling
+    from app.models import QuizResult
+    quiz_set = make_quiz_set(questions=6)
+    quiz_set.sample_size = 2
+    db.session.commit()
+    quiz_set_id = quiz_set.id
+    student = make_user('student')
+    login(client, student.email)
+    assert client.get(f'/quiz/{quiz_set_id}').status_code == 200
+
+    question_ids = sampling.draw(db.session.get(type(quiz_set), quiz_set_id))
+    assert len(set(question_ids)) == 2
+    answer_key = sampling.sample_payload(question_ids)['answer_key']
+    form = {f'question_{question_id}': option_id for question_id, option_id in answer_key.items()}
+    response = client.post(f'/quiz/{quiz_set_id}', data=dict(form, attempt='forged'))
+    assert response.status_code == 302 and QuizResult.query.count() == 0
+
+    with app.test_request_context():
+        form['attempt'] = sampling.attempt_token(quiz_set_id, question_ids)
+    response = client.post(f'/quiz/{quiz_set_id}', data=form)
+    assert 'score=2' in response.location and 'total=2' in response.location
+    assert QuizResult.query.one().question_ids == question_ids
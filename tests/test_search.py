@@ -0,0 +1,49 @@
+from tests.conftest import make_quiz_set
+
+
+def add_question(quiz_set, text, options):
+    from app import db, search
+    from app.models import Question, QuizSet
+    question = Question(text=text, quiz_set_id=quiz_set.id, user_id=Question.query.first().user_id,
+                        position=QuizSet.record_questions_added(quiz_set.id))
+    question.set_options(options, options[0])
+    db.session.add(question)
+    db.session.flush()
+    search.index_questions([question.id])
+    db.session.commit()
+    return question
+
+
+def test_parse_terms_keeps_prefixes():
+    from app.search import fts_query, parse_terms
+    assert parse_terms('Photo* "synthesis", of') == ['Photo*', 'synthesis', 'of']
+    assert fts_query(['photo*', 'leaf']) == '"photo"* "leaf"'
+
+
+def test_like_fallback_before_the_index_exists(app):
+    from app import search
+    quiz_set = make_quiz_set(questions=1)
+    add_question(quiz_set, 'Where does photosynthesis happen?', ['Leaf', 'Root'])
+    assert not search.available()
+    results = search.search('photosynthesis')['results']
+    assert [result['text'] for result in results] == ['Where does photosynthesis happen?']
+    assert results[0]['score'] is None
+
+
+def test_index_is_used_once_it_appears(app):
+    from app import db, search
+    quiz_set = make_quiz_set(questions=1)
+    add_question(quiz_set, 'Where does photosynthesis happen?', ['Leaf', 'Root'])
+    assert not search.available()
+    # As if the migration or `flask search rebuild` ran in another process
+    db.session.execute(db.text(search.CREATE_FTS_TABLE))
+    db.session.commit()
+    assert search.available()
+
+    assert search.rebuild() == 2
+    db.session.commit()
+    add_question(quiz_set, 'Which part of a plant absorbs water?', ['Root', 'Leaf'])
+    assert len(search.search('root')['results']) == 2
+    assert [result['text'] for result in search.search('water')['results']] == ['Which part of a plant absorbs water?']
+    assert search.search('photo*')['results'][0]['highlight'] == 'Where does <mark>photosynthesis</mark> happen?'
+    assert search.search('root', quiz_set_id=quiz_set.id + 1)['results'] == []
@@ -0,0 +1,44 @@
+import json
+import os
+import subprocess
+import sys
+
+from config import Config
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = '''
+import json, sys
+from app import create_app
+from app.startup import DEFERRED_MODULES
+create_app()
+print(json.dumps([name for name in DEFERRED_MODULES + ('flask_migrate',) if name in sys.modules]))
+'''
+
+
+# Modules loaded by create_app() in a fresh interpreter
+def loaded_at_startup(**env):
+    done = subprocess.run([sys.executable, '-c', CHILD], cwd=ROOT, env=dict(os.environ, **env),
+                          capture_output=True, text=True, check=True)
+    return json.loads(done.stdout.strip().splitlines()[-1])
+
+
+def test_lazy_workers_defer_the_heavy_modules():
+    assert loaded_at_startup(LAZY_STARTUP='1', TEMPLATE_CACHE_DIR='') == []
+    assert 'app.analytics' in loaded_at_startup(LAZY_STARTUP='0')
+
+
+def test_api_only_workers_answer_401_without_a_login_page(monkeypatch):
+    from app import create_app
+    monkeypatch.setattr(Config, 'BLUEPRINTS', ['api'])
+    client = create_app().test_client()
+    assert client.get('/api/quiz/1/leaderboard').status_code == 401
+    assert client.get('/login').status_code == 404
+
+
+def test_compile_templates_fills_the_bytecode_cache(monkeypatch, tmp_path):
+    from app import create_app, startup
+    monkeypatch.setattr(Config, 'TEMPLATE_CACHE_DIR', str(tmp_path / 'cache'))
+    app = create_app()
+    compiled = startup.compile_templates(app)
+    assert compiled > 10 and len(os.listdir(tmp_path / 'cache')) == compiled
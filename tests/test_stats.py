@@ -0,0 +1,63 @@
+from datetime import datetime
+
+from tests.conftest import add_results, make_quiz_set, make_user
+
+
+def test_record_result_updates_the_summary_rows(app):
+    from app import db, stats
+    from app.models import QuizSetStats, StudentStats
+    quiz_set = make_quiz_set()
+    student = make_user('student')
+    add_results(student, quiz_set, 2, score=1)
+    add_results(student, quiz_set, 1, score=3)
+
+    row = db.session.get(StudentStats, student.id)
+    assert (row.attempts, row.total_score) == (3, 5)
+    assert db.session.get(QuizSetStats, quiz_set.id).attempts == 3
+    assert stats.overview() == (3, round(5 / 3, 2))
+
+
+def test_last_attempt_keeps_the_latest_date(app):
+    from app import db, submissions
+    from app.models import StudentStats
+    quiz_set = make_quiz_set()
+    student = make_user('student')
+    for taken in ('2024-03-01T00:00:00', '2024-01-01T00:00:00'):
+        submissions.save_result({'user_id': student.id, 'quiz_set_id': quiz_set.id, 'score': 1,
+                                 'date_taken': taken})
+    db.session.commit()
+    assert db.session.get(StudentStats, student.id).last_attempt == datetime(2024, 3, 1)
+
+
+# A summary row that appeared after the request started (another worker's
+# first attempt) is added to instead of inserted twice
+def test_bump_adds_to_a_row_inserted_concurrently(app):
+    from app import db, stats
+    from app.models import StudentStats
+    student = make_user('student')
+    db.session.add(StudentStats(user_id=student.id, attempts=1, total_score=2))
+    db.session.commit()
+    stats._bump(StudentStats, StudentStats.user_id, student.id, 3, datetime(2024, 1, 1))
+    db.session.commit()
+    row = db.session.get(StudentStats, student.id)
+    assert (row.attempts, row.total_score) == (2, 5)
+
+
+def test_rebuild_matches_the_incremental_rows(app):
+    from app import db, stats
+    from app.models import QuizSetStats, StudentStats
+    quiz_sets = [make_quiz_set('A'), make_quiz_set('B')]
+    students = [make_user('s1'), make_user('s2')]
+    for i, student in enumerate(students):
+        for quiz_set in quiz_sets:
+            add_results(student, quiz_set, i + 1, score=i + 2)
+
+    def snapshot():
+        return ([(row.user_id, row.attempts, row.total_score, row.last_attempt)
+                 for row in StudentStats.query.order_by(StudentStats.user_id)],
+                [(row.quiz_set_id, row.attempts, row.total_score, row.last_attempt)
+                 for row in QuizSetStats.query.order_by(QuizSetStats.quiz_set_id)])
+    incremental = snapshot()
+    db.session.expire_all()
+    assert stats.rebuild() == 2
+    assert snapshot() == incremental
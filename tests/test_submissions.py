@@ -0,0 +1,44 @@
+from app.submissions import FAILED, PENDING, PERSISTED, SubmissionJournal, drain
+
+from tests.conftest import make_quiz_set, make_user
+
+
+def submission(user, quiz_set, score=1, **fields):
+    return dict({'user_id': user.id, 'quiz_set_id': quiz_set.id, 'score': score,
+                 'date_taken': '2024-01-01T00:00:00', 'question_count': quiz_set.question_count}, **fields)
+
+
+def test_drain_saves_each_submission_once(app, tmp_path):
+    from app.models import QuizResult, StudentStats
+    journal = SubmissionJournal(str(tmp_path / 'journal.db'))
+    student, quiz_set = make_user('student'), make_quiz_set()
+    ids = [journal.append(submission(student, quiz_set, score)) for score in (1, 2)]
+    assert drain(journal) == 2
+    assert drain(journal) == 0
+    assert [journal.get(submission_id)['status'] for submission_id in ids] == [PERSISTED, PERSISTED]
+    assert sorted(result.score for result in QuizResult.query) == [1, 2]
+
+    # A drain that died after committing but before marking: the replay only marks
+    with journal._connect() as connection:
+        connection.execute('UPDATE submission SET status = ?, claimed_at = NULL', (PENDING,))
+    assert drain(journal) == 2
+    assert QuizResult.query.count() == 2
+    assert StudentStats.query.one().attempts == 2
+
+
+def test_a_bad_submission_does_not_hold_up_the_batch(app, tmp_path):
+    from app.models import QuizResult
+    journal = SubmissionJournal(str(tmp_path / 'journal.db'))
+    student, quiz_set = make_user('student'), make_quiz_set()
+    good = journal.append(submission(student, quiz_set))
+    bad = journal.append(submission(student, quiz_set, date_taken='yesterday'))
+    also_good = journal.append(submission(student, quiz_set, score=3))
+
+    assert drain(journal) == 3
+    assert journal.get(good)['status'] == journal.get(also_good)['status'] == PERSISTED
+    assert journal.get(bad)['status'] == FAILED
+    assert journal.get(bad)['error'].startswith('ValueError')
+    assert sorted(result.score for result in QuizResult.query) == [1, 3]
+    # Failed submissions are not claimed again
+    assert journal.claim(10) == []
+    assert (journal.pending_count(), journal.count(FAILED)) == (0, 1)